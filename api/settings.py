@@ -53,6 +53,24 @@ LOGIX_APPS = [
 
 INSTALLED_APPS = LIBS_APPS + DJANGO_APPS + LOGIX_APPS
 
+# Modo somente API: sem o admin, o unfold e o import_export, que nem chegam
+# a ser importados pelos workers que só atendem a API
+SOMENTE_API = os.environ.get("LOGIX_SOMENTE_API", "False") == "True"
+
+# E-mail do usuário que recebe os registros do financeiro criados antes do
+# tenant (migração 0004); sem ele, o primeiro superusuário
+CRIADOR_PADRAO = os.environ.get("LOGIX_CRIADOR_PADRAO")
+
+ADMIN_APPS = [
+    "unfold",
+    "unfold.contrib.import_export",
+    "import_export",
+    "django.contrib.admin",
+]
+
+if SOMENTE_API:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ADMIN_APPS]
+
 
 DJANGO_MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
@@ -68,12 +86,28 @@ LIBS_MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
 ]
 
-LOGIX_MIDDLEWARE = []
+LOGIX_MIDDLEWARE = [
+    "apps.system.core.middlewares.ReplicaMiddleware",
+]
 
-if DEBUG:
-    LOGIX_MIDDLEWARE.append("apps.system.core.middlewares.DevMiddleware")
+# primeiro da lista para que o tempo medido inclua os demais middlewares
+MIDDLEWARE = (
+    ["apps.system.core.middlewares.InstrumentacaoMiddleware"]
+    + DJANGO_MIDDLEWARE
+    + LIBS_MIDDLEWARE
+    + LOGIX_MIDDLEWARE
+)
 
-MIDDLEWARE = DJANGO_MIDDLEWARE + LIBS_MIDDLEWARE + LOGIX_MIDDLEWARE
+# Fração das requisições medidas pelo InstrumentacaoMiddleware (0 desativa);
+# as amostras vão ao cabeçalho Server-Timing e aos histogramas por endpoint,
+# enviados ao cache a cada INSTRUMENTACAO_INTERVALO segundos
+INSTRUMENTACAO_AMOSTRAGEM = float(
+    os.environ.get("INSTRUMENTACAO_AMOSTRAGEM", "1" if DEBUG else "0.05")
+)
+
+INSTRUMENTACAO_SERVER_TIMING = os.environ.get("INSTRUMENTACAO_SERVER_TIMING", "True") == "True"
+
+INSTRUMENTACAO_INTERVALO = 10
 
 
 ROOT_URLCONF = "api.urls"
@@ -97,13 +131,107 @@ TEMPLATES = [
 WSGI_APPLICATION = "api.wsgi.application"
 
 
-DATABASES = {
-    "default": {
+# Com POSTGRES_HOST o banco é o PostgreSQL, com conexões persistentes por
+# DATABASE_CONN_MAX_AGE segundos, conferidas antes de serem reutilizadas
+POSTGRES_HOST = os.environ.get("POSTGRES_HOST")
+
+if POSTGRES_HOST:
+    BANCO_PRIMARIO = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ.get("POSTGRES_DB", "logix"),
+        "USER": os.environ.get("POSTGRES_USER", "logix"),
+        "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+        "HOST": POSTGRES_HOST,
+        "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+        "CONN_MAX_AGE": int(os.environ.get("DATABASE_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+    }
+else:
+    BANCO_PRIMARIO = {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
-    },
+    }
+
+DATABASES = {
+    "default": BANCO_PRIMARIO,
 }
 
+# Perfil de desempenho do SQLite (WAL, mmap, cache, busy_timeout), aplicado
+# em cada conexão; os pragmas podem ser alterados em SQLITE_PRAGMAS
+SQLITE_OTIMIZADO = os.environ.get("SQLITE_OTIMIZADO", "False") == "True"
+
+SQLITE_PRAGMAS = {}
+
+# Réplica de leitura, usada pelas viewsets com `ReplicaLeituraMixin`. Com
+# DATABASE_REPLICA_LOCAL a réplica é um segundo alias para o mesmo banco,
+# para testar o roteamento sem um servidor de réplica
+POSTGRES_REPLICA_HOST = os.environ.get("POSTGRES_REPLICA_HOST")
+
+BANCO_REPLICA = None
+
+if POSTGRES_HOST and POSTGRES_REPLICA_HOST:
+    BANCO_REPLICA = "replica"
+    DATABASES[BANCO_REPLICA] = {
+        **BANCO_PRIMARIO,
+        "HOST": POSTGRES_REPLICA_HOST,
+        "PORT": os.environ.get("POSTGRES_REPLICA_PORT", BANCO_PRIMARIO["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+elif os.environ.get("DATABASE_REPLICA_LOCAL") == "True":
+    BANCO_REPLICA = "replica"
+    DATABASES[BANCO_REPLICA] = {**BANCO_PRIMARIO, "TEST": {"MIRROR": "default"}}
+
+DATABASE_ROUTERS = ["apps.system.core.routers.ReplicaRouter"]
+
+# Segundos em que as leituras de quem acabou de gravar vão ao primário
+REPLICA_FIXACAO = 10
+
+
+REDIS_URL = os.environ.get("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+
+# Backend das tarefas de segundo plano: "banco" grava na tabela executada
+# pelo comando `worker` e "eager" executa na hora, para os testes
+TAREFAS_BACKEND = os.environ.get("TAREFAS_BACKEND", "banco")
+
+# Espera, em segundos, antes da segunda tentativa de uma tarefa com falha,
+# dobrada a cada nova tentativa até o máximo
+TAREFAS_ESPERA_BASE = 10
+
+TAREFAS_ESPERA_MAXIMA = 60 * 60
+
+# Segundos sem sinal do worker após os quais uma tarefa em execução volta
+# para a fila, ou falha se já esgotou as tentativas
+TAREFAS_TEMPO_LIMITE = 60
+
+# Segundos em que cada processo usa suas configurações em memória antes de
+# conferir no cache compartilhado se alguma foi alterada
+CONFIGURACAO_INTERVALO_VERIFICACAO = int(
+    os.environ.get("CONFIGURACAO_INTERVALO_VERIFICACAO", 5)
+)
+
+# Segundos em que o usuário autenticado pelo JWT fica no cache do processo
+# e no cache compartilhado, sem consultar o banco
+AUTENTICACAO_CACHE_LOCAL = 5
+
+AUTENTICACAO_CACHE_TTL = 60 * 5
+
+# Monta o usuário somente com as claims do token, sem cache nem banco
+JWT_USUARIO_SEM_ESTADO = os.environ.get("JWT_USUARIO_SEM_ESTADO", "False") == "True"
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -173,6 +301,11 @@ UNFOLD = {
 
 REST_FRAMEWORK = {
     "PAGE_SIZE": 12,
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "apps.users.authentication.CachedJWTAuthentication",
+        "rest_framework.authentication.SessionAuthentication",
+        "rest_framework.authentication.BasicAuthentication",
+    ],
     "DEFAULT_PAGINATION_CLASS": "apps.system.core.pagination.CustomPagination",
     "DEFAULT_FILTER_BACKENDS": [
         "rest_framework.filters.SearchFilter",
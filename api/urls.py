@@ -1,4 +1,3 @@
-from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
@@ -12,8 +11,14 @@ from rest_framework_simplejwt.views import (
 
 apps_urls = [path("api/v1/", include(app + ".urls")) for app in settings.LOGIX_APPS]
 
+admin_urls = []
+if not settings.SOMENTE_API:
+    from django.contrib import admin
+
+    admin_urls.append(path("admin/", admin.site.urls))
+
 urlpatterns = [
-    path("admin/", admin.site.urls),
+    *admin_urls,
 
     path("api/token/obtain/", token_obtain, name="token_obtain"),
     path("api/token/refresh/", token_refresh, name="token_refresh"),
@@ -2,11 +2,16 @@ from django.db.models.aggregates import Sum
 from django.utils.translation import gettext_lazy as _
 from django.contrib import messages
 from django.contrib import admin
+from django.http import HttpResponseRedirect
+from django.urls import reverse
 
 from import_export.admin import ImportExportModelAdmin
+from import_export.formats import base_formats
 from unfold.admin import ModelAdmin
 from unfold.contrib.import_export.forms import ExportForm, ImportForm
 
+from apps.system.base.admin import ExportacaoEmTarefaAdminMixin, MultiTenantAdminMixin
+from apps.system.core.tarefas import enfileirar, salvar_arquivo
 from apps.financeiro.models import (
     EntradaDinheiro,
     SaidaDinheiro,
@@ -17,7 +22,7 @@ from apps.financeiro.models import (
 
 
 @admin.register(EntradaDinheiro)
-class EntradaDinheiroAdmin(ModelAdmin):
+class EntradaDinheiroAdmin(MultiTenantAdminMixin, ModelAdmin):
     list_display = ("origem", "valor", "data_entrada")
     search_fields = ("origem",)
     ordering = ("-id",)
@@ -26,9 +31,12 @@ class EntradaDinheiroAdmin(ModelAdmin):
 
 
 @admin.register(SaidaDinheiro)
-class SaidaDinheiroAdmin(ModelAdmin, ImportExportModelAdmin):
+class SaidaDinheiroAdmin(
+    MultiTenantAdminMixin, ExportacaoEmTarefaAdminMixin, ModelAdmin, ImportExportModelAdmin
+):
     import_form_class = ImportForm
     export_form_class = ExportForm
+    import_formats = (base_formats.CSV, base_formats.XLSX)
 
     list_per_page = 15
 
@@ -103,28 +111,69 @@ class SaidaDinheiroAdmin(ModelAdmin, ImportExportModelAdmin):
         "duplicar_saida",
     )
 
+    def import_action(self, request, *args, **kwargs):
+        """
+        Substitui a importação linha a linha do import_export por uma tarefa
+        de segundo plano com o `ImportadorSaidas`, que grava a planilha em
+        lotes numa única etapa.
+        """
+        if request.method != "POST" or not self.has_import_permission(request):
+            return super().import_action(request, *args, **kwargs)
+
+        import_formats = self.get_import_formats()
+        form = self.get_import_form_class(request)(
+            import_formats,
+            request.POST,
+            request.FILES,
+            resources=self.get_import_resource_classes(),
+        )
+        if not form.is_valid():
+            return super().import_action(request, *args, **kwargs)
+
+        formato = import_formats[int(form.cleaned_data["input_format"])]
+        formato = "csv" if formato is base_formats.CSV else "xlsx"
+
+        salvo = salvar_arquivo(
+            "importacoes", f"saidas.{formato}", form.cleaned_data["import_file"]
+        )
+
+        tarefa = enfileirar(
+            "financeiro.importar_saidas",
+            criador=request.user,
+            usuario_id=request.user.pk,
+            arquivo=salvo["arquivo"],
+            formato=formato,
+        )
+        messages.add_message(
+            request,
+            messages.INFO,
+            f"Importação enfileirada na tarefa #{tarefa.pk}, o resultado ficará disponível nela.",
+        )
+
+        return HttpResponseRedirect(
+            reverse(f"admin:{self.opts.app_label}_{self.opts.model_name}_changelist")
+        )
+
     @admin.action(description=_("Marcar como paga"))
     def marcar_como_paga(cls, request, queryset):
-        for saida in queryset:
-            saida.paga = True
-            saida.save()
+        atualizadas = queryset.marcar_paga(True)
+        messages.add_message(
+            request, messages.INFO, f"{atualizadas} saída(s) marcada(s) como paga(s)."
+        )
 
     @admin.action(description=_("Marcar como não paga"))
     def marcar_como_nao_paga(cls, request, queryset):
-        for saida in queryset:
-            saida.paga = False
-            saida.save()
+        atualizadas = queryset.marcar_paga(False)
+        messages.add_message(
+            request, messages.INFO, f"{atualizadas} saída(s) marcada(s) como não paga(s)."
+        )
 
     @admin.action(description=_("Duplicar saída"))
     def duplicar_saida(cls, request, queryset):
-        for saida in queryset:
-            saida.pk = None
-            saida.paga = False
-
-            if saida.parcela and saida.parcela < saida.total_parcelas:
-                saida.parcela += 1
-
-            saida.save()
+        duplicadas = queryset.duplicar()
+        messages.add_message(
+            request, messages.INFO, f"{duplicadas} saída(s) duplicada(s)."
+        )
 
     @admin.action(description=_("Calcular total dos gastos"))
     def calcular_total_gastos(cls, request, queryset):
@@ -140,7 +189,9 @@ class SaidaDinheiroAdmin(ModelAdmin, ImportExportModelAdmin):
 
 
 @admin.register(MotivoGasto)
-class MotivoGastoAdmin(ModelAdmin, ImportExportModelAdmin):
+class MotivoGastoAdmin(
+    MultiTenantAdminMixin, ExportacaoEmTarefaAdminMixin, ModelAdmin, ImportExportModelAdmin
+):
     import_form_class = ImportForm
     export_form_class = ExportForm
     list_display = ("nome",)
@@ -150,7 +201,9 @@ class MotivoGastoAdmin(ModelAdmin, ImportExportModelAdmin):
 
 
 @admin.register(ItemListaDesejo)
-class ItemListaDesejoAdmin(ModelAdmin, ImportExportModelAdmin):
+class ItemListaDesejoAdmin(
+    MultiTenantAdminMixin, ExportacaoEmTarefaAdminMixin, ModelAdmin, ImportExportModelAdmin
+):
     import_form_class = ImportForm
     export_form_class = ExportForm
     list_display = ("nome", "tipo", "valor", "comprado")
@@ -161,7 +214,9 @@ class ItemListaDesejoAdmin(ModelAdmin, ImportExportModelAdmin):
 
 
 @admin.register(DestinoGasto)
-class DestinoGastoAdmin(ModelAdmin, ImportExportModelAdmin):
+class DestinoGastoAdmin(
+    MultiTenantAdminMixin, ExportacaoEmTarefaAdminMixin, ModelAdmin, ImportExportModelAdmin
+):
     import_form_class = ImportForm
     export_form_class = ExportForm
     list_display = ("nome",)
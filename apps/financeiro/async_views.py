@@ -0,0 +1,189 @@
+import asyncio
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Sum
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import APIException, NotAuthenticated, ValidationError
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from apps.system.base.views import SerializacaoRapidaMixin
+from apps.system.core.routers import aget_banco_leitura, banco_leitura
+from apps.users.authentication import autenticar_async
+
+from .models import ResumoGastoDiario
+from .serializers import SaidaDinheiro, SaidaDinheiroSerializer
+from .views import PeriodoMixin, SaidaDinheiroViewSet
+
+
+class BaseAsyncView(View):
+    """
+    View assíncrona, servida sem ocupar uma thread pelo ASGI enquanto
+    espera o banco. Autentica e lê da réplica como as viewsets e responde
+    os erros do DRF no mesmo formato que elas.
+    """
+
+    http_method_names = ["get"]
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or handler is None:
+            return await self.http_method_not_allowed(request, *args, **kwargs)
+
+        token = banco_leitura.set(None)
+        try:
+            self.usuario = await autenticar_async(request)
+            if self.usuario is None:
+                raise NotAuthenticated()
+
+            # as consultas do sync_to_async herdam o contexto com o banco
+            banco_leitura.set(await aget_banco_leitura(self.usuario))
+
+            self.requisicao = Request(request)
+            return await handler(request, *args, **kwargs)
+        except APIException as erro:
+            return JsonResponse(
+                erro.detail if isinstance(erro.detail, (dict, list)) else {"detail": erro.detail},
+                status=erro.status_code,
+                safe=False,
+            )
+        finally:
+            banco_leitura.reset(token)
+
+    def responder(self, dados):
+        return JsonResponse(dados, encoder=DjangoJSONEncoder, safe=False)
+
+
+class DashboardAsyncView(PeriodoMixin, BaseAsyncView):
+    """
+    Gasto por dia, por categoria, por classe e o total do mês em uma única
+    resposta. As quatro consultas são independentes, mas o `asyncio.gather`
+    não as executa ao mesmo tempo: no Django 4.2 o ORM assíncrono passa cada
+    consulta pelo mesmo executor `sync_to_async` sensível à thread, então
+    elas rodam uma após a outra. O ganho é não ocupar uma thread do ASGI
+    durante a espera.
+    """
+
+    async def get(self, request):
+        primeiro_dia, ultimo_dia = self.get_periodo_mes(self.requisicao)
+        resumos = ResumoGastoDiario.objects.filter(
+            criador_id=self.usuario.pk, dia__range=[primeiro_dia, ultimo_dia]
+        )
+
+        por_dia, por_categoria, kpis, total = await asyncio.gather(
+            self.get_por_dia(resumos, primeiro_dia, ultimo_dia),
+            self.listar(
+                resumos.values("destino__nome").annotate(total=Sum("total")).order_by("destino")
+            ),
+            self.listar(
+                resumos.values("classe")
+                .annotate(total=Sum("total"), quantidade=Sum("quantidade"))
+                .order_by("classe")
+            ),
+            resumos.aaggregate(total=Sum("total"), quantidade=Sum("quantidade")),
+        )
+
+        return self.responder(
+            {
+                "por_dia": por_dia,
+                "por_categoria": por_categoria,
+                "kpis": kpis,
+                "total": {
+                    "total": total["total"] or 0,
+                    "quantidade": total["quantidade"] or 0,
+                },
+            }
+        )
+
+    async def get_por_dia(self, resumos, inicio, fim):
+        truncar = SaidaDinheiroViewSet.GRANULARIDADES["dia"]
+        totais = {
+            linha["periodo"]: linha["total"]
+            for linha in await self.listar(
+                resumos.annotate(periodo=truncar("dia"))
+                .values("periodo")
+                .annotate(total=Sum("total"))
+                .order_by("periodo")
+            )
+        }
+
+        return [
+            {"data": periodo, "total": totais.get(periodo, 0)}
+            for periodo in self.get_periodos(inicio, fim, "dia")
+        ]
+
+    async def listar(self, queryset):
+        return [linha async for linha in queryset.aiterator()]
+
+
+class SaidaDinheiroAsyncView(SerializacaoRapidaMixin, BaseAsyncView):
+    """
+    Listagem de saídas com os mesmos filtros, busca, ordenação, campos e
+    formato de paginação de `SaidaDinheiroViewSet`, usando o caminho rápido
+    de serialização. A página e o total são consultados um após o outro,
+    pelo mesmo motivo descrito em `DashboardAsyncView`.
+    """
+
+    serializer_class = SaidaDinheiroSerializer
+    tamanho_pagina = 12
+    tamanho_maximo_pagina = 1000
+
+    async def get(self, request):
+        queryset = self.filtrar(SaidaDinheiro.objects.from_user(self.usuario))
+        nos, caminhos = self.get_plano_serializacao(self.serializer_class, SaidaDinheiro)
+        montar = self.get_montador(nos)
+
+        pagina, tamanho = self.get_pagina()
+        inicio = (pagina - 1) * tamanho
+        linhas = queryset.values(*caminhos)[inicio : inicio + tamanho]
+
+        total, resultados = await asyncio.gather(
+            queryset.acount(),
+            self.montar_linhas(linhas, montar),
+        )
+        if pagina > 1 and not resultados:
+            return JsonResponse({"detail": "Página inválida."}, status=404)
+
+        return self.responder(
+            {
+                "total": total,
+                "links_paginas": {
+                    "proxima": self.get_link(pagina + 1) if inicio + tamanho < total else None,
+                    "anterior": self.get_link(pagina - 1) if pagina > 1 else None,
+                },
+                "resultados": resultados,
+            }
+        )
+
+    def filtrar(self, queryset):
+        """
+        Aplica os filter backends da viewset (`?data_gasto__*`, `?search=` e
+        `?ordering=`). Eles só montam o queryset, sem consultar o banco.
+        """
+        viewset = SaidaDinheiroViewSet(
+            request=self.requisicao, format_kwarg=None, action="list", args=(), kwargs={}
+        )
+        for backend in viewset.filter_backends:
+            queryset = backend().filter_queryset(self.requisicao, queryset, viewset)
+
+        return queryset
+
+    async def montar_linhas(self, linhas, montar):
+        return [montar(linha) async for linha in linhas.aiterator()]
+
+    def get_pagina(self):
+        try:
+            pagina = max(int(self.requisicao.query_params.get("page", 1)), 1)
+            tamanho = int(self.requisicao.query_params.get("size", self.tamanho_pagina))
+        except ValueError:
+            raise ValidationError({"page": "Informe números inteiros em `page` e `size`."})
+
+        return pagina, min(max(tamanho, 1), self.tamanho_maximo_pagina)
+
+    def get_link(self, pagina):
+        url = self.request.build_absolute_uri()
+        if pagina == 1:
+            return remove_query_param(url, "page")
+
+        return replace_query_param(url, "page", pagina)
@@ -0,0 +1,62 @@
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.system.core.benchmarks import benchmark, medir
+
+from .models import DestinoGasto, EntradaDinheiro, SaidaDinheiro
+from .views import SaidaDinheiroViewSet
+
+
+@benchmark("serializacao")
+def benchmark_serializacao(comando, tamanhos=(12, 500, 10000)):
+    """
+    Compara a listagem de saídas pelo serializer e pelo caminho rápido com
+    `.values()`, conferindo que as duas respostas são idênticas.
+    """
+    usuario = get_user_model().objects.create_user(
+        email="benchmark@logix.local", nome="Benchmark"
+    )
+    entrada = EntradaDinheiro.objects.create(
+        valor=5000, data_entrada=date(2020, 1, 5), criador=usuario
+    )
+    destino = DestinoGasto.objects.create(nome="Benchmark", criador=usuario)
+    SaidaDinheiro.objects.bulk_create(
+        (
+            SaidaDinheiro(
+                descricao=f"Saída {i}",
+                valor_total=10 + i % 100,
+                classe=SaidaDinheiro.CLASSES[i % len(SaidaDinheiro.CLASSES)][0],
+                entrada=entrada,
+                destino=destino,
+                data_gasto=date(2020, 1, 1) + timedelta(days=i % 1500),
+                criador=usuario,
+            )
+            for i in range(max(tamanhos))
+        ),
+        batch_size=1000,
+    )
+
+    fabrica = APIRequestFactory(HTTP_HOST="localhost")
+
+    for tamanho in tamanhos:
+        respostas = {}
+
+        def listar(rapida):
+            view = SaidaDinheiroViewSet.as_view({"get": "list"}, serializacao_rapida=rapida)
+            request = fabrica.get("/", {"size": tamanho})
+            force_authenticate(request, user=usuario)
+            response = view(request)
+            response.render()
+            respostas[rapida] = response.content
+
+        repeticoes = 3 if tamanho > 1000 else 10
+        serializer = medir(lambda: listar(False), repeticoes)
+        rapida = medir(lambda: listar(True), repeticoes)
+
+        identicas = "idênticas" if respostas[False] == respostas[True] else "DIFERENTES"
+        print(
+            f"[x] {tamanho:>6} linhas: serializer {serializer * 1000:8.2f} ms | "
+            f"values() {rapida * 1000:8.2f} ms | {serializer / rapida:5.1f}x | respostas {identicas}"
+        )
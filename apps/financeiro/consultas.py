@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from apps.system.core.consultas import consulta_critica, get_usuario_exemplo
+
+from .models import ResumoGastoDiario, SaidaDinheiro
+
+
+def _get_mes():
+    primeiro_dia = date.today().replace(day=1)
+    proximo_mes = (primeiro_dia + timedelta(days=32)).replace(day=1)
+    return primeiro_dia, proximo_mes
+
+
+def _get_saidas():
+    return SaidaDinheiro.objects.from_user(get_usuario_exemplo())
+
+
+def _get_resumos():
+    return ResumoGastoDiario.objects.filter(criador=get_usuario_exemplo())
+
+
+@consulta_critica("despesas.list")
+def consulta_listagem_despesas():
+    return _get_saidas().order_by("-id")[:12]
+
+
+@consulta_critica("despesas.list.intervalo")
+def consulta_listagem_despesas_intervalo():
+    primeiro_dia, proximo_mes = _get_mes()
+    return _get_saidas().filter(
+        data_gasto__gte=primeiro_dia, data_gasto__lt=proximo_mes
+    ).order_by("-id")[:12]
+
+
+@consulta_critica("despesas.list.cursor")
+def consulta_listagem_despesas_cursor():
+    primeiro_dia, _ = _get_mes()
+    return _get_saidas().filter(data_gasto__lt=primeiro_dia).order_by(
+        "-data_gasto", "-id"
+    )[:13]
+
+
+@consulta_critica("despesas.fixas")
+def consulta_despesas_fixas():
+    return _get_saidas().filter(despesa=True).order_by("-id")[:12]
+
+
+@consulta_critica("entradas.gastos")
+def consulta_gastos_entrada():
+    return _get_saidas().filter(entrada_id=1).order_by("-id")[:12]
+
+
+@consulta_critica("despesas.total_gasto_por_dia")
+def consulta_total_gasto_por_dia():
+    primeiro_dia, proximo_mes = _get_mes()
+    return (
+        _get_resumos()
+        .filter(dia__gte=primeiro_dia, dia__lt=proximo_mes)
+        .values("dia")
+        .annotate(total=Sum("total"))
+        .order_by("dia")
+    )
+
+
+@consulta_critica("despesas.total_gasto_por_categoria")
+def consulta_total_gasto_por_categoria():
+    primeiro_dia, proximo_mes = _get_mes()
+    return (
+        _get_resumos()
+        .filter(dia__gte=primeiro_dia, dia__lt=proximo_mes)
+        .values("destino__nome")
+        .annotate(total=Sum("total"))
+        .order_by("destino")
+    )
+
+
+@consulta_critica("despesas.serie_temporal")
+def consulta_serie_temporal():
+    return (
+        _get_resumos()
+        .filter(dia__gte=date(date.today().year - 5, 1, 1))
+        .annotate(periodo=TruncMonth("dia"))
+        .values("periodo")
+        .annotate(total=Sum("total"))
+        .order_by("periodo")
+    )
@@ -0,0 +1,268 @@
+import csv
+import codecs
+
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+
+from .models import (
+    DestinoGasto,
+    EntradaDinheiro,
+    ResumoGastoDiario,
+    SaidaDinheiro,
+    invalidar_cache_criadores,
+)
+
+
+# colunas aceitas na planilha, com os mesmos nomes dos campos do model
+CAMPOS_IMPORTACAO = (
+    "descricao",
+    "valor_total",
+    "classe",
+    "entrada",
+    "destino",
+    "despesa",
+    "parcela",
+    "total_parcelas",
+    "data_gasto",
+    "paga",
+    "parcial",
+)
+
+FORMATOS_IMPORTACAO = ("csv", "xlsx")
+
+VERDADEIROS = frozenset(("s", "sim", "1", "true", "t", "x"))
+FALSOS = frozenset(("n", "nao", "não", "0", "false", "f"))
+
+
+class ResultadoImportacao:
+    def __init__(self):
+        self.importadas = 0
+        self.lotes = 0
+        self.erros = []
+
+    def adicionar_erro(self, linha, mensagem):
+        self.erros.append((linha, mensagem))
+
+    def __str__(self):
+        return (
+            f"{self.importadas} saída(s) importada(s) em {self.lotes} lote(s), "
+            f"{len(self.erros)} linha(s) com erro"
+        )
+
+
+class ImportadorSaidas:
+    """
+    Importa saídas de uma planilha CSV ou XLSX sem passar pelo `save()` de
+    cada linha. O arquivo é lido em streaming, as entradas e os destinos do
+    tenant são carregados uma única vez em dicionários e as saídas válidas
+    são gravadas com `bulk_create` em lotes, todos na mesma transação.
+
+    Como o `bulk_create` não dispara sinais, a data do gasto vem da entrada
+    já carregada e os resumos diários e o cache são atualizados por lote.
+    Linhas inválidas, ou de um lote recusado pelo banco, viram erros no
+    resultado sem interromper o restante do arquivo.
+    """
+
+    def __init__(self, criador, tamanho_lote=500, progresso=None):
+        self.criador = criador
+        self.tamanho_lote = tamanho_lote
+        self.progresso = progresso
+
+        self.campos = {nome: SaidaDinheiro._meta.get_field(nome) for nome in CAMPOS_IMPORTACAO}
+        # os campos com escolhas, como a classe, também aceitam o nome
+        # exibido e ignoram maiúsculas e minúsculas
+        self.escolhas_por_nome = {
+            nome: {
+                chave.strip().lower(): valor
+                for valor, rotulo in campo.flatchoices
+                for chave in (str(valor), str(rotulo))
+            }
+            for nome, campo in self.campos.items()
+            if campo.choices
+        }
+
+    def importar(self, arquivo, formato):
+        if formato not in FORMATOS_IMPORTACAO:
+            raise ValueError(f"Formato de importação inválido: {formato}")
+
+        resultado = ResultadoImportacao()
+        self.carregar_relacionados()
+
+        with transaction.atomic():
+            lote = []
+            for numero, linha in self.ler_linhas(arquivo, formato):
+                try:
+                    lote.append((numero, self.montar_saida(linha)))
+                except ValidationError as erro:
+                    resultado.adicionar_erro(numero, self.formatar_erro(erro))
+                    continue
+
+                if len(lote) >= self.tamanho_lote:
+                    self.gravar_lote(lote, resultado)
+                    lote = []
+
+            if lote:
+                self.gravar_lote(lote, resultado)
+
+        if resultado.importadas:
+            invalidar_cache_criadores([self.criador.pk])
+
+        return resultado
+
+    def carregar_relacionados(self):
+        self.entradas = dict(
+            EntradaDinheiro.objects.from_user(self.criador)
+            .order_by()
+            .values_list("pk", "data_entrada")
+        )
+
+        self.destinos = {}
+        self.destinos_por_nome = {}
+        for pk, nome in (
+            DestinoGasto.objects.from_user(self.criador).order_by("pk").values_list("pk", "nome")
+        ):
+            self.destinos[pk] = pk
+            self.destinos_por_nome.setdefault(nome.strip().lower(), pk)
+
+    def ler_linhas(self, arquivo, formato):
+        """
+        Gera `(número da linha, dicionário da linha)` a partir do cabeçalho
+        do arquivo, sem carregá-lo inteiro na memória.
+        """
+        if formato == "csv":
+            amostra = arquivo.read(4096).decode("utf-8-sig", errors="ignore")
+            arquivo.seek(0)
+            try:
+                dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+            except csv.Error:
+                dialeto = csv.excel
+
+            leitor = csv.reader(codecs.iterdecode(arquivo, "utf-8-sig"), dialeto)
+        else:
+            from openpyxl import load_workbook
+
+            planilha = load_workbook(arquivo, read_only=True, data_only=True)
+            leitor = planilha.worksheets[0].iter_rows(values_only=True)
+
+        cabecalho = None
+        for numero, valores in enumerate(leitor, start=1):
+            if cabecalho is None:
+                cabecalho = [str(valor or "").strip().lower() for valor in valores]
+                continue
+
+            if not any(valor not in (None, "") for valor in valores):
+                continue
+
+            yield numero, dict(zip(cabecalho, valores))
+
+    def montar_saida(self, linha):
+        valores = {}
+        erros = {}
+
+        for nome, campo in self.campos.items():
+            valor = linha.get(nome)
+            if isinstance(valor, str):
+                valor = valor.strip()
+
+            try:
+                if nome == "entrada":
+                    valores["entrada_id"] = self.get_entrada(valor)
+                elif nome == "destino":
+                    valores["destino_id"] = self.get_destino(valor)
+                elif valor in (None, "") and campo.has_default():
+                    valores[nome] = campo.get_default()
+                else:
+                    valores[nome] = campo.clean(self.normalizar(campo, valor), None)
+            except ValidationError as erro:
+                erros[nome] = erro.messages
+
+        if erros:
+            raise ValidationError(erros)
+
+        if not valores["data_gasto"]:
+            valores["data_gasto"] = self.entradas[valores["entrada_id"]]
+
+        return SaidaDinheiro(criador=self.criador, **valores)
+
+    def normalizar(self, campo, valor):
+        if valor in (None, ""):
+            return None if campo.null else valor
+
+        if campo.name in self.escolhas_por_nome and isinstance(valor, str):
+            valor = self.escolhas_por_nome[campo.name].get(valor.lower(), valor)
+
+        tipo = campo.get_internal_type()
+        if tipo == "BooleanField" and isinstance(valor, str):
+            if valor.lower() in VERDADEIROS:
+                return True
+            if valor.lower() in FALSOS:
+                return False
+
+        if tipo == "FloatField" and isinstance(valor, str) and "," in valor:
+            # formato brasileiro: 1.234,56
+            return valor.replace(".", "").replace(",", ".")
+
+        if tipo == "DateField":
+            if isinstance(valor, datetime):
+                return valor.date()
+            if isinstance(valor, str) and "/" in valor:
+                try:
+                    return datetime.strptime(valor, "%d/%m/%Y").date()
+                except ValueError:
+                    pass
+
+        if tipo == "PositiveIntegerField" and isinstance(valor, float) and valor.is_integer():
+            return int(valor)
+
+        return valor
+
+    def get_entrada(self, valor):
+        try:
+            pk = int(valor)
+        except (TypeError, ValueError):
+            pk = None
+
+        if pk not in self.entradas:
+            raise ValidationError(f"Entrada não encontrada: {valor}")
+
+        return pk
+
+    def get_destino(self, valor):
+        try:
+            pk = self.destinos.get(int(valor))
+        except (TypeError, ValueError):
+            pk = self.destinos_por_nome.get(str(valor or "").lower())
+
+        if pk is None:
+            raise ValidationError(f"Destino não encontrado: {valor}")
+
+        return pk
+
+    def gravar_lote(self, lote, resultado):
+        resultado.lotes += 1
+        saidas = [saida for _, saida in lote]
+
+        try:
+            with transaction.atomic():
+                SaidaDinheiro.objects.bulk_create(saidas)
+                ResumoGastoDiario.objects.aplicar(
+                    ResumoGastoDiario.objects.contribuicao(saida) for saida in saidas
+                )
+        except DatabaseError as erro:
+            for numero, _ in lote:
+                resultado.adicionar_erro(numero, f"Lote {resultado.lotes} recusado pelo banco: {erro}")
+        else:
+            resultado.importadas += len(saidas)
+
+        if self.progresso is not None:
+            self.progresso(resultado)
+
+    def formatar_erro(self, erro):
+        if hasattr(erro, "message_dict"):
+            return "; ".join(
+                f"{campo}: {' '.join(mensagens)}" for campo, mensagens in erro.message_dict.items()
+            )
+
+        return " ".join(erro.messages)
@@ -0,0 +1,144 @@
+import sys
+import time
+import socket
+import itertools
+import subprocess
+import http.client
+
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.serializers import CustomTokenObtainPairSerializer
+
+SERVIDORES = {
+    'wsgi': ['api.wsgi:application'],
+    'asgi': ['api.asgi:application', '--worker-class', 'uvicorn.workers.UvicornWorker'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Compara a vazão com clientes concorrentes do gunicorn com WSGI e com ASGI (uvicorn)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', required=True, help='Email do usuário cujos dados serão consultados')
+        parser.add_argument('--clientes', type=int, default=20, help='Clientes fazendo requisições ao mesmo tempo')
+        parser.add_argument('--requisicoes', type=int, default=400, help='Total de acessos por cenário')
+        parser.add_argument('--workers', type=int, default=2, help='Processos do gunicorn em cada servidor')
+        parser.add_argument('--mes', type=int, default=date.today().month, help='Mês consultado no dashboard')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = get_user_model().objects.get(email=options['usuario'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'Usuário "{options["usuario"]}" não encontrado')
+
+        token = str(CustomTokenObtainPairSerializer.get_token(usuario).access_token)
+        self.headers = {'Authorization': f'Bearer {token}', 'Host': 'localhost'}
+        self.contador = itertools.count()
+
+        mes = options['mes']
+        # o cliente síncrono monta o dashboard com as três actions, o
+        # assíncrono com uma única requisição
+        cenarios = {
+            'dashboard': {
+                'wsgi': [
+                    f'/api/v1/despesas/total_gasto_por_dia/?data_gasto__month={mes}',
+                    f'/api/v1/despesas/total_gasto_por_categoria/?data_gasto__month={mes}',
+                    f'/api/v1/despesas/kpis/?data_gasto__month={mes}',
+                ],
+                'asgi': [f'/api/v1/async/despesas/dashboard/?data_gasto__month={mes}'],
+            },
+            'listagem': {
+                'wsgi': ['/api/v1/despesas/?size=100'],
+                'asgi': ['/api/v1/async/despesas/?size=100'],
+            },
+        }
+
+        for servidor in SERVIDORES:
+            porta = self.get_porta_livre()
+            processo = self.iniciar_servidor(servidor, porta, options['workers'])
+            try:
+                for nome, urls in cenarios.items():
+                    self.executar_cenario(
+                        servidor, nome, porta, urls[servidor], options['clientes'], options['requisicoes']
+                    )
+            finally:
+                processo.terminate()
+                processo.wait()
+
+        print(f'[x] Process finished...')
+
+    def get_porta_livre(self):
+        with socket.socket() as livre:
+            livre.bind(('127.0.0.1', 0))
+            return livre.getsockname()[1]
+
+    def iniciar_servidor(self, servidor, porta, workers):
+        comando = [
+            sys.executable, '-m', 'gunicorn', *SERVIDORES[servidor],
+            '--bind', f'127.0.0.1:{porta}', '--workers', str(workers), '--log-level', 'warning',
+        ]
+        processo = subprocess.Popen(comando, cwd=settings.BASE_DIR)
+
+        for _ in range(100):
+            if processo.poll() is not None:
+                raise CommandError(f'O servidor {servidor} terminou ao iniciar')
+
+            try:
+                socket.create_connection(('127.0.0.1', porta), timeout=0.1).close()
+                return processo
+            except OSError:
+                time.sleep(0.1)
+
+        processo.terminate()
+        raise CommandError(f'O servidor {servidor} não respondeu na porta {porta}')
+
+    def executar_cenario(self, servidor, nome, porta, urls, clientes, requisicoes):
+        # aquece os workers, o cache da autenticação e as conexões com o banco
+        self.executar_cliente(porta, urls, clientes)
+
+        por_cliente = max(requisicoes // clientes, 1)
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clientes) as executor:
+            resultados = list(
+                executor.map(lambda _: self.executar_cliente(porta, urls, por_cliente), range(clientes))
+            )
+        duracao = time.perf_counter() - inicio
+
+        latencias = sorted(latencia for tempos, _ in resultados for latencia in tempos)
+        erros = sum(erros for _, erros in resultados)
+        p50 = latencias[len(latencias) // 2] * 1000
+        p95 = latencias[int(len(latencias) * 0.95)] * 1000
+
+        print(
+            f'[x] {nome:<10} {servidor}: {len(latencias) / duracao:8.1f} acessos/s | '
+            f'p50 {p50:8.2f} ms | p95 {p95:8.2f} ms | {len(urls)} requisição(ões) por acesso | '
+            f'{erros} erro(s)'
+        )
+
+    def executar_cliente(self, porta, urls, acessos):
+        """
+        Faz os acessos em sequência por uma conexão keep-alive. O parâmetro
+        `_` muda a cada requisição para que o cache das respostas não seja
+        usado.
+        """
+        conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+        tempos, erros = [], 0
+        try:
+            for _ in range(acessos):
+                inicio = time.perf_counter()
+                for url in urls:
+                    conexao.request('GET', f'{url}&_={next(self.contador)}', headers=self.headers)
+                    resposta = conexao.getresponse()
+                    resposta.read()
+                    if resposta.status != 200:
+                        erros += 1
+                tempos.append(time.perf_counter() - inicio)
+        finally:
+            conexao.close()
+
+        return tempos, erros
@@ -0,0 +1,40 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.financeiro.importacao import FORMATOS_IMPORTACAO, ImportadorSaidas
+
+
+class Command(BaseCommand):
+    help = 'Importa saídas de uma planilha CSV ou XLSX em lotes com bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho da planilha')
+        parser.add_argument('--usuario', required=True, help='E-mail do usuário dono das saídas')
+        parser.add_argument('--lote', type=int, default=500, help='Quantidade de linhas por lote')
+        parser.add_argument('--formato', choices=FORMATOS_IMPORTACAO, help='Formato do arquivo (padrão: pela extensão)')
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or os.path.splitext(options['arquivo'])[1].lstrip('.').lower()
+        if formato not in FORMATOS_IMPORTACAO:
+            raise CommandError(f'Formato "{formato}" não suportado')
+
+        try:
+            usuario = get_user_model().objects.get(email=options['usuario'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'Usuário "{options["usuario"]}" não encontrado')
+
+        def progresso(resultado):
+            print(f'[x] Batch {resultado.lotes}: {resultado.importadas} rows imported, {len(resultado.erros)} errors...')
+
+        print(f'[x] Importing {options["arquivo"]}...')
+        importador = ImportadorSaidas(usuario, tamanho_lote=options['lote'], progresso=progresso)
+        with open(options['arquivo'], 'rb') as arquivo:
+            resultado = importador.importar(arquivo, formato)
+
+        for linha, mensagem in resultado.erros:
+            print(f'[!] Line {linha}: {mensagem}')
+
+        print(f'[x] {resultado}...')
+        print(f'[x] Process finished...')
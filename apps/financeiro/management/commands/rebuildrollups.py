@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.financeiro.models import ResumoGastoDiario
+
+
+class Command(BaseCommand):
+    help = 'Recalcula do zero os resumos diários de gastos a partir das saídas'
+
+    def handle(self, *args, **options):
+        print(f'[x] Rebuilding daily spending rollups...')
+        total = ResumoGastoDiario.objects.reconstruir()
+        print(f'[x] {total} rollup rows created...')
+        print(f'[x] Process finished...')
@@ -0,0 +1,135 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:50
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DestinoGasto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ativo', models.BooleanField(default=True, help_text='Se o registro está ativo ou não', verbose_name='ativo')),
+                ('data_hora_criacao', models.DateTimeField(auto_now_add=True, help_text='Data e hora da criação do registro', verbose_name='data e hora de criação')),
+                ('data_hora_ultima_alteracao', models.DateTimeField(auto_now=True, help_text='Data e hora da última alteração', verbose_name='data e hora da última alteração')),
+                ('nome', models.CharField(help_text='Nome do destino', max_length=50, verbose_name='nome')),
+            ],
+            options={
+                'verbose_name': 'Destino do gasto',
+                'verbose_name_plural': 'Destinos dos gastos',
+                'db_table': 'destino',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EntradaDinheiro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ativo', models.BooleanField(default=True, help_text='Se o registro está ativo ou não', verbose_name='ativo')),
+                ('data_hora_criacao', models.DateTimeField(auto_now_add=True, help_text='Data e hora da criação do registro', verbose_name='data e hora de criação')),
+                ('data_hora_ultima_alteracao', models.DateTimeField(auto_now=True, help_text='Data e hora da última alteração', verbose_name='data e hora da última alteração')),
+                ('origem', models.CharField(choices=[('SAL', 'Salário'), ('DEC', 'Décimo terceiro'), ('FER', 'Férias'), ('PRO', 'Projeto'), ('MAN', 'Manutenção'), ('OUT', 'Outros')], default='SAL', max_length=3, verbose_name='tipo')),
+                ('valor', models.FloatField(help_text='Valor da entrada', validators=[django.core.validators.MinValueValidator(0.01, message='O valor da entrada deve ser maior que zero.')], verbose_name='valor')),
+                ('data_entrada', models.DateField(default=django.utils.timezone.now, verbose_name='data da entrada')),
+            ],
+            options={
+                'verbose_name': 'Entrada de dinheiro',
+                'verbose_name_plural': 'Entradas de dinheiro',
+                'db_table': 'entrada_dinheiro',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemListaDesejo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ativo', models.BooleanField(default=True, help_text='Se o registro está ativo ou não', verbose_name='ativo')),
+                ('data_hora_criacao', models.DateTimeField(auto_now_add=True, help_text='Data e hora da criação do registro', verbose_name='data e hora de criação')),
+                ('data_hora_ultima_alteracao', models.DateTimeField(auto_now=True, help_text='Data e hora da última alteração', verbose_name='data e hora da última alteração')),
+                ('nome', models.CharField(help_text='Nome', max_length=50, verbose_name='nome')),
+                ('tipo', models.CharField(choices=[('LIV', 'Livro'), ('SON', 'Sonho/Objetivo'), ('ROP', 'Roupa'), ('TEN', 'Tênis'), ('PER', 'Perfume'), ('OUT', 'Outros')], default='LIV', max_length=3, verbose_name='tipo')),
+                ('valor', models.FloatField(help_text='Valor do desejo', validators=[django.core.validators.MinValueValidator(0.01, message='O valor do desejo deve ser maior que zero.')], verbose_name='valor')),
+                ('link', models.URLField(blank=True, verbose_name='link')),
+                ('comprado', models.BooleanField(default=False, verbose_name='comprado')),
+            ],
+            options={
+                'verbose_name': 'Item da lista de desejos',
+                'verbose_name_plural': 'Lista de desejos',
+                'db_table': 'item_lista_desejo',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MotivoGasto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ativo', models.BooleanField(default=True, help_text='Se o registro está ativo ou não', verbose_name='ativo')),
+                ('data_hora_criacao', models.DateTimeField(auto_now_add=True, help_text='Data e hora da criação do registro', verbose_name='data e hora de criação')),
+                ('data_hora_ultima_alteracao', models.DateTimeField(auto_now=True, help_text='Data e hora da última alteração', verbose_name='data e hora da última alteração')),
+                ('nome', models.CharField(max_length=50, verbose_name='nome')),
+            ],
+            options={
+                'verbose_name': 'Motivo do gasto',
+                'verbose_name_plural': 'Motivos dos gastos',
+                'db_table': 'motivo_gasto',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaidaDinheiro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ativo', models.BooleanField(default=True, help_text='Se o registro está ativo ou não', verbose_name='ativo')),
+                ('data_hora_criacao', models.DateTimeField(auto_now_add=True, help_text='Data e hora da criação do registro', verbose_name='data e hora de criação')),
+                ('data_hora_ultima_alteracao', models.DateTimeField(auto_now=True, help_text='Data e hora da última alteração', verbose_name='data e hora da última alteração')),
+                ('descricao', models.TextField(verbose_name='descrição')),
+                ('valor_total', models.FloatField(help_text='Valor do pagamento', validators=[django.core.validators.MinValueValidator(0.01, message='O valor do pagamento deve ser maior que zero.')], verbose_name='valor')),
+                ('classe', models.CharField(choices=[('DES', 'Despesas/Necessidade'), ('LAZ', 'Lazer/Diversão'), ('ECO', 'Economizar '), ('INV', 'Investimentos'), ('CRE', 'Crescimento Pessoal'), ('IMP', 'Imprevistos')], default='LAZ', max_length=3, verbose_name='classe')),
+                ('despesa', models.BooleanField(default=False, help_text='Informa se a saída é algo essencial e indispensável ao longo do mês', verbose_name='despesa')),
+                ('parcela', models.PositiveIntegerField(blank=True, null=True, verbose_name='parcela')),
+                ('total_parcelas', models.PositiveIntegerField(blank=True, null=True, verbose_name='total de parcelas')),
+                ('data_gasto', models.DateField(blank=True, null=True, verbose_name='data do gasto')),
+                ('paga', models.BooleanField(default=False, verbose_name='paga')),
+                ('parcial', models.BooleanField(default=False, help_text='Informa se a saída é uma parte de um pagamento com várias saídas, porque o dinheiro utilizado se originou de mais de uma entrada', verbose_name='parcial')),
+                ('destino', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saidas', to='financeiro.destinogasto', verbose_name='destino')),
+                ('entrada', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saidas', to='financeiro.entradadinheiro', verbose_name='entrada')),
+                ('saida', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='financeiro.saidadinheiro', verbose_name='saída')),
+            ],
+            options={
+                'verbose_name': 'Saída de dinheiro',
+                'verbose_name_plural': 'Gastos e despesas',
+                'db_table': 'saida_dinheiro',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoGastoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='dia')),
+                ('classe', models.CharField(choices=[('DES', 'Despesas/Necessidade'), ('LAZ', 'Lazer/Diversão'), ('ECO', 'Economizar '), ('INV', 'Investimentos'), ('CRE', 'Crescimento Pessoal'), ('IMP', 'Imprevistos')], max_length=3, verbose_name='classe')),
+                ('total', models.FloatField(default=0, verbose_name='total')),
+                ('quantidade', models.IntegerField(default=0, verbose_name='quantidade')),
+                ('destino', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos', to='financeiro.destinogasto', verbose_name='destino')),
+            ],
+            options={
+                'verbose_name': 'Resumo diário de gastos',
+                'verbose_name_plural': 'Resumos diários de gastos',
+                'db_table': 'resumo_gasto_diario',
+                'ordering': ['dia'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='resumogastodiario',
+            constraint=models.UniqueConstraint(fields=('dia', 'classe', 'destino'), name='resumo_gasto_diario_unico'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entradadinheiro',
+            index=models.Index(fields=['origem', 'id'], name='entrada_origem_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemlistadesejo',
+            index=models.Index(condition=models.Q(('comprado', True)), fields=['id'], name='item_desejo_comprado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemlistadesejo',
+            index=models.Index(condition=models.Q(('comprado', False)), fields=['id'], name='item_desejo_pendente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemlistadesejo',
+            index=models.Index(fields=['tipo', 'id'], name='item_desejo_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidadinheiro',
+            index=models.Index(fields=['data_gasto', 'id'], name='saida_data_gasto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidadinheiro',
+            index=models.Index(fields=['classe', 'id'], name='saida_classe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidadinheiro',
+            index=models.Index(fields=['entrada', 'id'], name='saida_entrada_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidadinheiro',
+            index=models.Index(condition=models.Q(('paga', True)), fields=['id'], name='saida_paga_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidadinheiro',
+            index=models.Index(condition=models.Q(('paga', False)), fields=['id'], name='saida_nao_paga_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidadinheiro',
+            index=models.Index(condition=models.Q(('despesa', True)), fields=['id'], name='saida_despesa_idx'),
+        ),
+    ]
@@ -0,0 +1,154 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('financeiro', '0002_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='resumogastodiario',
+            name='resumo_gasto_diario_unico',
+        ),
+        migrations.RemoveIndex(
+            model_name='entradadinheiro',
+            name='entrada_origem_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='itemlistadesejo',
+            name='item_desejo_comprado_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='itemlistadesejo',
+            name='item_desejo_pendente_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='itemlistadesejo',
+            name='item_desejo_tipo_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='saidadinheiro',
+            name='saida_data_gasto_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='saidadinheiro',
+            name='saida_classe_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='saidadinheiro',
+            name='saida_entrada_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='saidadinheiro',
+            name='saida_paga_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='saidadinheiro',
+            name='saida_nao_paga_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='saidadinheiro',
+            name='saida_despesa_idx',
+        ),
+        migrations.AddField(
+            model_name='destinogasto',
+            name='criador',
+            field=models.ForeignKey(db_index=False, editable=False, help_text='Usuário que criou o registro', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='criador do registro'),
+        ),
+        migrations.AddField(
+            model_name='entradadinheiro',
+            name='criador',
+            field=models.ForeignKey(db_index=False, editable=False, help_text='Usuário que criou o registro', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='criador do registro'),
+        ),
+        migrations.AddField(
+            model_name='itemlistadesejo',
+            name='criador',
+            field=models.ForeignKey(db_index=False, editable=False, help_text='Usuário que criou o registro', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='criador do registro'),
+        ),
+        migrations.AddField(
+            model_name='motivogasto',
+            name='criador',
+            field=models.ForeignKey(db_index=False, editable=False, help_text='Usuário que criou o registro', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='criador do registro'),
+        ),
+        migrations.AddField(
+            model_name='resumogastodiario',
+            name='criador',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='criador do registro'),
+        ),
+        migrations.AddField(
+            model_name='saidadinheiro',
+            name='criador',
+            field=models.ForeignKey(db_index=False, editable=False, help_text='Usuário que criou o registro', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='criador do registro'),
+        ),
+        migrations.AddIndex(
+            model_name='destinogasto',
+            index=models.Index(fields=['criador', 'id'], name='destino_criador_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entradadinheiro',
+            index=models.Index(fields=['criador', 'id'], name='entrada_criador_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entradadinheiro',
+            index=models.Index(fields=['criador', 'origem', 'id'], name='entrada_origem_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemlistadesejo',
+            index=models.Index(fields=['criador', 'id'], name='item_desejo_criador_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemlistadesejo',
+            index=models.Index(condition=models.Q(('comprado', True)), fields=['criador', 'id'], name='item_desejo_comprado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemlistadesejo',
+            index=models.Index(condition=models.Q(('comprado', False)), fields=['criador', 'id'], name='item_desejo_pendente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemlistadesejo',
+            index=models.Index(fields=['criador', 'tipo', 'id'], name='item_desejo_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='motivogasto',
+            index=models.Index(fields=['criador', 'id'], name='motivo_gasto_criador_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidadinheiro',
+            index=models.Index(fields=['criador', 'id'], name='saida_criador_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidadinheiro',
+            index=models.Index(fields=['criador', 'data_gasto', 'id'], name='saida_data_gasto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidadinheiro',
+            index=models.Index(fields=['criador', 'classe', 'id'], name='saida_classe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidadinheiro',
+            index=models.Index(fields=['criador', 'entrada', 'id'], name='saida_entrada_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidadinheiro',
+            index=models.Index(condition=models.Q(('paga', True)), fields=['criador', 'id'], name='saida_paga_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidadinheiro',
+            index=models.Index(condition=models.Q(('paga', False)), fields=['criador', 'id'], name='saida_nao_paga_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidadinheiro',
+            index=models.Index(condition=models.Q(('despesa', True)), fields=['criador', 'id'], name='saida_despesa_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumogastodiario',
+            constraint=models.UniqueConstraint(fields=('criador', 'dia', 'classe', 'destino'), name='resumo_gasto_diario_unico'),
+        ),
+    ]
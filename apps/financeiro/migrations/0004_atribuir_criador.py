@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Sum
+
+MODELS_TENANT = ("EntradaDinheiro", "SaidaDinheiro", "DestinoGasto", "MotivoGasto", "ItemListaDesejo")
+
+
+def get_criador_padrao(apps):
+    """
+    Dono dos registros criados antes do tenant: o usuário com o e-mail de
+    `CRIADOR_PADRAO` ou, sem ele, o primeiro superusuário.
+    """
+    Usuario = apps.get_model(settings.AUTH_USER_MODEL)
+    email = getattr(settings, "CRIADOR_PADRAO", None)
+    if email:
+        return Usuario.objects.get(email=email)
+
+    return Usuario.objects.filter(is_superuser=True).order_by("id").first()
+
+
+def atribuir_criador(apps, schema_editor):
+    SaidaDinheiro = apps.get_model("financeiro", "SaidaDinheiro")
+    ResumoGastoDiario = apps.get_model("financeiro", "ResumoGastoDiario")
+
+    modelos = [apps.get_model("financeiro", nome) for nome in MODELS_TENANT]
+    sem_criador = [modelo for modelo in modelos if modelo.objects.filter(criador__isnull=True).exists()]
+    if not sem_criador and not ResumoGastoDiario.objects.filter(criador__isnull=True).exists():
+        return
+
+    if sem_criador:
+        criador = get_criador_padrao(apps)
+        if criador is None:
+            raise RuntimeError(
+                "Existem registros do financeiro sem criador e nenhum dono para eles: "
+                "crie um superusuário ou defina LOGIX_CRIADOR_PADRAO e rode o migrate novamente."
+            )
+
+        for modelo in sem_criador:
+            modelo.objects.filter(criador__isnull=True).update(criador=criador)
+
+    # os resumos antigos não têm dono; são recalculados por tenant a partir
+    # das saídas, como no comando rebuildrollups
+    linhas = (
+        SaidaDinheiro.objects.filter(data_gasto__isnull=False)
+        .order_by()
+        .values("criador_id", "data_gasto", "classe", "destino_id")
+        .annotate(soma=Sum("valor_total"), itens=Count("id"))
+    )
+
+    ResumoGastoDiario.objects.all().delete()
+    ResumoGastoDiario.objects.bulk_create(
+        (
+            ResumoGastoDiario(
+                criador_id=linha["criador_id"],
+                dia=linha["data_gasto"],
+                classe=linha["classe"],
+                destino_id=linha["destino_id"],
+                total=linha["soma"],
+                quantidade=linha["itens"],
+            )
+            for linha in linhas.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('financeiro', '0003_criador_tenant'),
+    ]
+
+    operations = [
+        migrations.RunPython(atribuir_criador, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,21 @@
-from django.db import models
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import models, transaction, IntegrityError
 from django.dispatch import receiver
-from django.db.models.signals import pre_save, post_save
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Count
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.core.validators import MinValueValidator
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone as django_timezone
 
-from apps.system.base.models import Base
+from apps.system.base.models import Base, MultitenantManager, MultitenantQuerySet
+from apps.system.core.cache import get_namespace_usuario, invalidar_apos_commit
+
+
+def invalidar_cache_criadores(criadores):
+    for criador_id in set(criadores):
+        invalidar_apos_commit(get_namespace_usuario("financeiro", criador_id))
 
 
 class EntradaDinheiro(Base):
@@ -49,11 +59,105 @@ class EntradaDinheiro(Base):
 
         return f'{origem} | {self.data_entrada.strftime("%m/%y")}'
 
+    def save(self, *args, **kwargs):
+        # a propagação da data para as saídas roda no post_save e precisa
+        # acontecer na mesma transação do salvamento da entrada
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         db_table = "entrada_dinheiro"
         ordering = ["-id"]
         verbose_name = _("Entrada de dinheiro")
         verbose_name_plural = _("Entradas de dinheiro")
+        indexes = [
+            models.Index(fields=["criador", "id"], name="entrada_criador_idx"),
+            models.Index(fields=["criador", "origem", "id"], name="entrada_origem_idx"),
+        ]
+
+
+class SaidaDinheiroQuerySet(MultitenantQuerySet):
+    """
+    Operações em massa sobre saídas. Elas não disparam os sinais de
+    `pre_save`/`post_save`, então aplicam por conta própria os mesmos efeitos:
+    data do gasto herdada da entrada, resumos diários e invalidação do cache.
+    """
+
+    def marcar_paga(self, paga=True):
+        with transaction.atomic():
+            self.preencher_data_gasto()
+            criadores = self.order_by().values_list("criador_id", flat=True).distinct()
+            invalidar_cache_criadores(criadores)
+            atualizados = self.update(
+                paga=paga, data_hora_ultima_alteracao=django_timezone.now()
+            )
+
+        return atualizados
+
+    def preencher_data_gasto(self):
+        """
+        Faz em lote o que o `pre_save` faz para cada saída: as saídas sem
+        data do gasto recebem a data da sua entrada.
+        """
+        sem_data = list(
+            self.filter(data_gasto__isnull=True)
+            .order_by()
+            .values_list(
+                "pk", "criador_id", "classe", "destino_id", "valor_total", "entrada__data_entrada"
+            )
+        )
+        if not sem_data:
+            return 0
+
+        with transaction.atomic():
+            # um único UPDATE, com a data lida da entrada de cada saída
+            SaidaDinheiro.objects.filter(pk__in=[linha[0] for linha in sem_data]).update(
+                data_gasto=Subquery(
+                    EntradaDinheiro.objects.filter(pk=OuterRef("entrada_id")).values(
+                        "data_entrada"
+                    )[:1]
+                )
+            )
+
+            ResumoGastoDiario.objects.aplicar(
+                (criador_id, data_entrada, classe, destino_id, valor_total, 1)
+                for _, criador_id, classe, destino_id, valor_total, data_entrada in sem_data
+            )
+
+        return len(sem_data)
+
+    def duplicar(self, batch_size=500):
+        """
+        Cria uma cópia não paga de cada saída, avançando a parcela quando
+        ainda houver parcelas restantes.
+        """
+        campos = [
+            campo.attname
+            for campo in self.model._meta.concrete_fields
+            if not campo.primary_key
+        ]
+
+        copias = []
+        for saida in self.order_by("pk").select_related("entrada"):
+            copia = self.model(**{campo: getattr(saida, campo) for campo in campos})
+            copia.paga = False
+
+            if not copia.data_gasto:
+                copia.data_gasto = saida.entrada.data_entrada
+
+            if copia.parcela and copia.total_parcelas and copia.parcela < copia.total_parcelas:
+                copia.parcela += 1
+
+            copias.append(copia)
+
+        with transaction.atomic():
+            self.model.objects.bulk_create(copias, batch_size=batch_size)
+            ResumoGastoDiario.objects.aplicar(
+                ResumoGastoDiario.objects.contribuicao(copia) for copia in copias
+            )
+
+        invalidar_cache_criadores(copia.criador_id for copia in copias)
+        return len(copias)
 
 
 class SaidaDinheiro(Base):
@@ -136,6 +240,8 @@ class SaidaDinheiro(Base):
         ),
     )
 
+    objects = MultitenantManager.from_queryset(SaidaDinheiroQuerySet)()
+
     @property
     def valor_total_parcelas(self):
         return self.valor_total * self.total_parcelas
@@ -148,6 +254,27 @@ class SaidaDinheiro(Base):
         ordering = ["-id"]
         verbose_name = _("Saída de dinheiro")
         verbose_name_plural = _("Gastos e despesas")
+        # todas as consultas da API são por tenant, então os índices começam
+        # pelo criador
+        indexes = [
+            models.Index(fields=["criador", "id"], name="saida_criador_idx"),
+            # intervalos de data e paginação por cursor (-data_gasto, -id)
+            models.Index(fields=["criador", "data_gasto", "id"], name="saida_data_gasto_idx"),
+            # filtros do admin e da action fixas, sempre ordenados por -id
+            models.Index(fields=["criador", "classe", "id"], name="saida_classe_idx"),
+            models.Index(fields=["criador", "entrada", "id"], name="saida_entrada_idx"),
+            # filtros booleanos viram `WHERE "campo"` no SQLite, que só
+            # consegue usar índices parciais com a mesma condição
+            models.Index(
+                fields=["criador", "id"], condition=Q(paga=True), name="saida_paga_idx"
+            ),
+            models.Index(
+                fields=["criador", "id"], condition=Q(paga=False), name="saida_nao_paga_idx"
+            ),
+            models.Index(
+                fields=["criador", "id"], condition=Q(despesa=True), name="saida_despesa_idx"
+            ),
+        ]
 
 
 class DestinoGasto(Base):
@@ -161,6 +288,9 @@ class DestinoGasto(Base):
         ordering = ["-id"]
         verbose_name = _("Destino do gasto")
         verbose_name_plural = _("Destinos dos gastos")
+        indexes = [
+            models.Index(fields=["criador", "id"], name="destino_criador_idx"),
+        ]
 
 
 class MotivoGasto(Base):
@@ -174,6 +304,9 @@ class MotivoGasto(Base):
         ordering = ["-id"]
         verbose_name = _("Motivo do gasto")
         verbose_name_plural = _("Motivos dos gastos")
+        indexes = [
+            models.Index(fields=["criador", "id"], name="motivo_gasto_criador_idx"),
+        ]
 
 
 class ItemListaDesejo(Base):
@@ -220,6 +353,163 @@ class ItemListaDesejo(Base):
         ordering = ["-id"]
         verbose_name = _("Item da lista de desejos")
         verbose_name_plural = _("Lista de desejos")
+        indexes = [
+            models.Index(fields=["criador", "id"], name="item_desejo_criador_idx"),
+            models.Index(
+                fields=["criador", "id"],
+                condition=Q(comprado=True),
+                name="item_desejo_comprado_idx",
+            ),
+            models.Index(
+                fields=["criador", "id"],
+                condition=Q(comprado=False),
+                name="item_desejo_pendente_idx",
+            ),
+            models.Index(fields=["criador", "tipo", "id"], name="item_desejo_tipo_idx"),
+        ]
+
+
+class ResumoGastoDiarioManager(models.Manager):
+    """
+    Mantém os totais pré-agregados das saídas. As contribuições são tuplas
+    `(criador_id, dia, classe, destino_id, total, quantidade)` já com o sinal
+    aplicado,
+    então uma alteração é representada pela remoção da contribuição antiga
+    somada à inclusão da nova.
+    """
+
+    def contribuicao(self, saida, sinal=1):
+        return (
+            saida.criador_id,
+            saida.data_gasto,
+            saida.classe,
+            saida.destino_id,
+            saida.valor_total * sinal,
+            sinal,
+        )
+
+    def aplicar(self, contribuicoes):
+        agregado = defaultdict(lambda: [0.0, 0])
+        for criador_id, dia, classe, destino_id, total, quantidade in contribuicoes:
+            if dia is None:
+                continue
+
+            item = agregado[(criador_id, dia, classe, destino_id)]
+            item[0] += total
+            item[1] += quantidade
+
+        with transaction.atomic():
+            for (criador_id, dia, classe, destino_id), (total, quantidade) in agregado.items():
+                if not total and not quantidade:
+                    continue
+
+                chave = {
+                    "criador_id": criador_id,
+                    "dia": dia,
+                    "classe": classe,
+                    "destino_id": destino_id,
+                }
+                if not self._somar(chave, total, quantidade):
+                    try:
+                        with transaction.atomic():
+                            self.create(**chave, total=total, quantidade=quantidade)
+                    except IntegrityError:
+                        # outra requisição criou a linha entre o update e o create
+                        self._somar(chave, total, quantidade)
+
+                # só uma remoção pode zerar a linha; apaga pela chave, sem
+                # percorrer a tabela
+                if quantidade < 0:
+                    self.filter(**chave, quantidade__lte=0).delete()
+
+    def reconstruir(self):
+        linhas = (
+            SaidaDinheiro.objects.filter(data_gasto__isnull=False)
+            .order_by()
+            .values("criador_id", "data_gasto", "classe", "destino_id")
+            .annotate(soma=Sum("valor_total"), itens=Count("id"))
+        )
+
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                (
+                    self.model(
+                        criador_id=linha["criador_id"],
+                        dia=linha["data_gasto"],
+                        classe=linha["classe"],
+                        destino_id=linha["destino_id"],
+                        total=linha["soma"],
+                        quantidade=linha["itens"],
+                    )
+                    for linha in linhas.iterator()
+                ),
+                batch_size=1000,
+            )
+
+        return self.count()
+
+    def _somar(self, chave, total, quantidade):
+        return self.filter(**chave).update(
+            total=F("total") + total,
+            quantidade=F("quantidade") + quantidade,
+        )
+
+
+class ResumoGastoDiario(models.Model):
+    """
+    Total gasto por tenant, dia, classe e destino, mantido incrementalmente pelos
+    sinais de `SaidaDinheiro`. Atualizações em massa (`queryset.update`,
+    `bulk_create`) não disparam sinais e devem chamar
+    `ResumoGastoDiario.objects.aplicar` por conta própria ou, em último caso,
+    o comando `rebuildrollups`.
+    """
+
+    criador = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name=_("criador do registro"),
+        on_delete=models.CASCADE,
+        related_name="+",
+        null=True,
+        db_index=False,
+    )
+
+    dia = models.DateField(_("dia"))
+
+    classe = models.CharField(_("classe"), choices=SaidaDinheiro.CLASSES, max_length=3)
+
+    destino = models.ForeignKey(
+        "DestinoGasto",
+        verbose_name=_("destino"),
+        on_delete=models.CASCADE,
+        related_name="resumos",
+    )
+
+    total = models.FloatField(_("total"), default=0)
+
+    quantidade = models.IntegerField(_("quantidade"), default=0)
+
+    objects = ResumoGastoDiarioManager()
+
+    def __str__(self):
+        return f"{self.dia} | {self.classe} | {self.total}"
+
+    class Meta:
+        db_table = "resumo_gasto_diario"
+        ordering = ["dia"]
+        verbose_name = _("Resumo diário de gastos")
+        verbose_name_plural = _("Resumos diários de gastos")
+        constraints = [
+            # começa pelo tenant, então também atende às consultas por período
+            models.UniqueConstraint(
+                fields=["criador", "dia", "classe", "destino"],
+                name="resumo_gasto_diario_unico",
+            ),
+        ]
+
+
+# campos da saída que alteram os resumos diários
+CAMPOS_RESUMO = frozenset(("criador", "data_gasto", "classe", "destino", "valor_total"))
 
 
 @receiver(pre_save, sender=SaidaDinheiro)
@@ -228,8 +518,123 @@ def set_gasto_date(sender, instance, **kwargs):
         instance.data_gasto = instance.entrada.data_entrada
 
 
+@receiver(pre_save, sender=SaidaDinheiro)
+def guardar_resumo_anterior(sender, instance, **kwargs):
+    instance._resumo_anterior = None
+    if instance.pk is None or CAMPOS_RESUMO.isdisjoint(instance.changed_fields):
+        return
+
+    originais = instance.get_valores_originais(*CAMPOS_RESUMO)
+    if originais is not None:
+        instance._resumo_anterior = (
+            originais["criador"],
+            originais["data_gasto"],
+            originais["classe"],
+            originais["destino"],
+            -originais["valor_total"],
+            -1,
+        )
+        return
+
+    # registro criado manualmente ou com campos adiados: consulta o banco
+    anterior = (
+        SaidaDinheiro.objects.filter(pk=instance.pk)
+        .only("criador_id", "data_gasto", "classe", "destino_id", "valor_total")
+        .first()
+    )
+    if anterior is not None:
+        instance._resumo_anterior = ResumoGastoDiario.objects.contribuicao(
+            anterior, sinal=-1
+        )
+
+
+@receiver(post_save, sender=SaidaDinheiro)
+def atualizar_resumo_saida(sender, instance, created, **kwargs):
+    if not created and CAMPOS_RESUMO.isdisjoint(instance.changed_fields):
+        return
+
+    contribuicoes = [ResumoGastoDiario.objects.contribuicao(instance)]
+
+    anterior = getattr(instance, "_resumo_anterior", None)
+    if anterior is not None:
+        if anterior[:4] == contribuicoes[0][:4] and -anterior[4] == contribuicoes[0][4]:
+            return
+
+        contribuicoes.append(anterior)
+
+    ResumoGastoDiario.objects.aplicar(contribuicoes)
+
+
+@receiver(post_delete, sender=SaidaDinheiro)
+def remover_resumo_saida(sender, instance, **kwargs):
+    ResumoGastoDiario.objects.aplicar(
+        [ResumoGastoDiario.objects.contribuicao(instance, sinal=-1)]
+    )
+
+
+@receiver(pre_save, sender=EntradaDinheiro)
+def guardar_data_entrada_anterior(sender, instance, **kwargs):
+    instance._data_entrada_anterior = None
+    if instance.pk is None or not instance.has_changed("data_entrada"):
+        return
+
+    originais = instance.get_valores_originais("data_entrada")
+    if originais is not None:
+        instance._data_entrada_anterior = originais["data_entrada"]
+        return
+
+    instance._data_entrada_anterior = (
+        EntradaDinheiro.objects.filter(pk=instance.pk)
+        .values_list("data_entrada", flat=True)
+        .first()
+    )
+
+
 @receiver(post_save, sender=EntradaDinheiro)
-def set_gasto_date(sender, instance, **kwargs):
-    for saida in instance.saidas.all():
-        saida.data_gasto = instance.data_entrada
-        saida.save()
+def propagar_data_entrada(sender, instance, created, **kwargs):
+    """
+    Quando a data da entrada muda, as saídas que herdaram a data antiga passam
+    a usar a nova com um único UPDATE, movendo junto os resumos diários.
+    Saídas com data própria não são alteradas.
+    """
+    anterior = getattr(instance, "_data_entrada_anterior", None)
+    if created or anterior is None or anterior == instance.data_entrada:
+        return
+
+    herdadas = SaidaDinheiro.objects.filter(entrada=instance, data_gasto=anterior)
+
+    with transaction.atomic():
+        totais = list(
+            herdadas.order_by()
+            .values("criador_id", "classe", "destino_id")
+            .annotate(soma=Sum("valor_total"), itens=Count("id"))
+        )
+        if not totais:
+            return
+
+        herdadas.update(
+            data_gasto=instance.data_entrada,
+            data_hora_ultima_alteracao=django_timezone.now(),
+        )
+
+        contribuicoes = []
+        for linha in totais:
+            criador_id, chave = linha["criador_id"], (linha["classe"], linha["destino_id"])
+            contribuicoes.append(
+                (criador_id, anterior, *chave, -linha["soma"], -linha["itens"])
+            )
+            contribuicoes.append(
+                (criador_id, instance.data_entrada, *chave, linha["soma"], linha["itens"])
+            )
+
+        ResumoGastoDiario.objects.aplicar(contribuicoes)
+
+
+@receiver(post_save, sender=SaidaDinheiro)
+@receiver(post_delete, sender=SaidaDinheiro)
+@receiver(post_save, sender=EntradaDinheiro)
+@receiver(post_delete, sender=EntradaDinheiro)
+@receiver(post_save, sender=DestinoGasto)
+@receiver(post_delete, sender=DestinoGasto)
+def invalidar_cache_financeiro(sender, instance, **kwargs):
+    invalidar_cache_criadores([instance.criador_id])
@@ -1,22 +1,22 @@
 from rest_framework import serializers
-from .models import SaidaDinheiro, EntradaDinheiro, CategoriaGasto
+from .models import SaidaDinheiro, EntradaDinheiro, DestinoGasto
 
 
 class SaidaDinheiroSerializer(serializers.ModelSerializer):
     class Meta:
         model = SaidaDinheiro
-        fields = "__all__"
+        exclude = ("criador",)
         depth = 1
 
 
 class EntradaDinheiroSerializer(serializers.ModelSerializer):
     class Meta:
         model = EntradaDinheiro
-        fields = "__all__"
+        exclude = ("criador",)
         depth = 1
 
 
-class CategoriaGastoSerializer(serializers.ModelSerializer):
+class DestinoGastoSerializer(serializers.ModelSerializer):
     class Meta:
-        model = CategoriaGasto
-        fields = "__all__"
+        model = DestinoGasto
+        exclude = ("criador",)
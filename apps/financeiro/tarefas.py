@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+
+from apps.system.core.tarefas import tarefa
+
+from .importacao import ImportadorSaidas
+
+# quantidade máxima de erros de linha guardados no resultado da tarefa
+MAXIMO_ERROS_RESULTADO = 100
+
+
+@tarefa("financeiro.importar_saidas")
+def importar_saidas(usuario_id, arquivo, formato, tamanho_lote=500):
+    """
+    Importa uma planilha gravada no storage. A importação roda em uma única
+    transação, então uma nova tentativa após uma falha começa do zero.
+    """
+    usuario = get_user_model().objects.get(pk=usuario_id)
+
+    with default_storage.open(arquivo, "rb") as conteudo:
+        resultado = ImportadorSaidas(usuario, tamanho_lote=tamanho_lote).importar(
+            conteudo, formato
+        )
+
+    default_storage.delete(arquivo)
+
+    return {
+        "importadas": resultado.importadas,
+        "lotes": resultado.lotes,
+        "total_erros": len(resultado.erros),
+        "erros": [
+            {"linha": linha, "mensagem": mensagem}
+            for linha, mensagem in resultado.erros[:MAXIMO_ERROS_RESULTADO]
+        ],
+    }
@@ -1,3 +1,1130 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
 
-# Create your tests here.
+from base64 import b64encode
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.system.base.testes import DesempenhoMixin, ReplicaTesteMixin, get_changelists
+from apps.system.core import consultas as consultas_sistema
+from apps.system.core.tarefas import exportar_admin
+
+from .models import (
+    DestinoGasto,
+    EntradaDinheiro,
+    ItemListaDesejo,
+    MotivoGasto,
+    ResumoGastoDiario,
+    SaidaDinheiro,
+)
+from .importacao import ImportadorSaidas
+from .serializers import EntradaDinheiroSerializer, SaidaDinheiroSerializer
+from .views import SaidaDinheiroViewSet
+
+
+def semear_financeiro(usuario, entradas=12, saidas_por_entrada=50, destinos=15):
+    """
+    Um ano de movimentação: uma entrada por mês do ano atual, gastos
+    espalhados pelos dias do mês, em várias classes e destinos, com
+    despesas fixas, parcelas e saídas pagas.
+    """
+    ano = date.today().year
+    destinos = DestinoGasto.objects.bulk_create(
+        DestinoGasto(nome=f"Destino {i}", criador=usuario) for i in range(destinos)
+    )
+    entradas = EntradaDinheiro.objects.bulk_create(
+        EntradaDinheiro(
+            origem=EntradaDinheiro.ORIGENS[mes % len(EntradaDinheiro.ORIGENS)][0],
+            valor=5000 + mes * 10,
+            data_entrada=date(ano, mes + 1, 5),
+            criador=usuario,
+        )
+        for mes in range(entradas)
+    )
+    SaidaDinheiro.objects.bulk_create(
+        (
+            SaidaDinheiro(
+                descricao=f"Gasto {i} de {entrada.data_entrada:%m/%Y}",
+                valor_total=10 + i * 7 % 300,
+                classe=SaidaDinheiro.CLASSES[i % len(SaidaDinheiro.CLASSES)][0],
+                entrada=entrada,
+                destino=destinos[i % len(destinos)],
+                despesa=i % 5 == 0,
+                paga=i % 3 != 0,
+                parcela=1 + i % 4,
+                total_parcelas=4,
+                data_gasto=entrada.data_entrada + timedelta(days=i % 23),
+                criador=usuario,
+            )
+            for entrada in entradas
+            for i in range(saidas_por_entrada)
+        ),
+        batch_size=1000,
+    )
+    MotivoGasto.objects.bulk_create(MotivoGasto(nome=f"Motivo {i}", criador=usuario) for i in range(10))
+    ItemListaDesejo.objects.bulk_create(
+        ItemListaDesejo(nome=f"Desejo {i}", valor=50 + i, criador=usuario) for i in range(10)
+    )
+    return entradas
+
+
+class FinanceiroDesempenhoTestCase(DesempenhoMixin, TestCase):
+    """Orçamento de consultas e tempo de referência das rotas do financeiro."""
+
+    arquivo_referencias = os.path.join(os.path.dirname(__file__), "desempenho.json")
+
+    # as views assíncronas e o admin incluem as consultas da sessão e do usuário
+    orcamentos = {
+        "despesas-list": 2,
+        "despesas-detail": 1,
+        "despesas-exportar": 1,
+        "despesas-fixas": 2,
+        "despesas-kpis": 1,
+        "despesas-serie-temporal": 1,
+        "despesas-total-gasto-por-categoria": 1,
+        "despesas-total-gasto-por-dia": 1,
+        "despesas-async": 4,
+        "despesas-dashboard-async": 6,
+        "entradas-list": 2,
+        "entradas-detail": 1,
+        "entradas-exportar": 1,
+        "entradas-gastos": 3,
+        "admin:financeiro_entradadinheiro_changelist": 5,
+        "admin:financeiro_saidadinheiro_changelist": 6,
+        "admin:financeiro_motivogasto_changelist": 5,
+        "admin:financeiro_itemlistadesejo_changelist": 5,
+        "admin:financeiro_destinogasto_changelist": 5,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(
+            email="financeiro@teste.com", nome="Financeiro", is_staff=True, is_superuser=True
+        )
+        cls.entradas = semear_financeiro(cls.usuario)
+
+        # dados de outro tenant, que não podem aparecer nem pesar nas consultas
+        semear_financeiro(
+            get_user_model().objects.create_user(email="outro@teste.com", nome="Outro")
+        )
+        ResumoGastoDiario.objects.reconstruir()
+
+        cls.saida = SaidaDinheiro.objects.from_user(cls.usuario).first()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+        # as views assíncronas autenticam pela sessão
+        self.cliente_sessao = APIClient()
+        self.cliente_sessao.force_login(self.usuario)
+
+    def test_rotas_com_orcamento(self):
+        self.assertRotasComOrcamento("apps.financeiro.urls", get_changelists("financeiro"))
+
+    def test_despesas_listagem(self):
+        self.medir_rota("despesas-list", reverse("despesas-list"))
+        # o orçamento vale para qualquer tamanho de página
+        self.medir_rota("despesas-list", reverse("despesas-list"), {"size": 200}, chave="despesas-list-200")
+        self.medir_rota(
+            "despesas-list",
+            reverse("despesas-list"),
+            {"paginacao": "cursor", "size": 200},
+            chave="despesas-list-cursor",
+        )
+
+    def test_despesas_detalhe(self):
+        self.medir_rota("despesas-detail", reverse("despesas-detail", args=[self.saida.pk]))
+
+    def test_despesas_exportar(self):
+        self.medir_rota("despesas-exportar", reverse("despesas-exportar"))
+        self.medir_rota(
+            "despesas-exportar", reverse("despesas-exportar"), {"formato": "csv"}, chave="despesas-exportar-csv"
+        )
+
+    def test_despesas_fixas(self):
+        self.medir_rota("despesas-fixas", reverse("despesas-fixas"), {"size": 200})
+
+    def test_despesas_kpis(self):
+        self.medir_rota("despesas-kpis", reverse("despesas-kpis"), {"data_gasto__month": 3})
+
+    def test_despesas_serie_temporal(self):
+        ano = date.today().year
+        self.medir_rota(
+            "despesas-serie-temporal",
+            reverse("despesas-serie-temporal"),
+            {"inicio": f"{ano}-01-01", "fim": f"{ano}-12-31", "granularidade": "dia"},
+        )
+
+    def test_despesas_total_por_categoria(self):
+        self.medir_rota(
+            "despesas-total-gasto-por-categoria",
+            reverse("despesas-total-gasto-por-categoria"),
+            {"data_gasto__month": 3},
+        )
+
+    def test_despesas_total_por_dia(self):
+        self.medir_rota(
+            "despesas-total-gasto-por-dia",
+            reverse("despesas-total-gasto-por-dia"),
+            {"data_gasto__month": 3},
+        )
+
+    def test_despesas_async(self):
+        self.medir_rota("despesas-async", reverse("despesas-async"), {"size": 200}, cliente=self.cliente_sessao)
+
+    def test_despesas_dashboard_async(self):
+        self.medir_rota(
+            "despesas-dashboard-async",
+            reverse("despesas-dashboard-async"),
+            {"data_gasto__month": 3},
+            cliente=self.cliente_sessao,
+        )
+
+    def test_entradas_listagem(self):
+        self.medir_rota("entradas-list", reverse("entradas-list"), {"size": 200})
+
+    def test_entradas_detalhe(self):
+        self.medir_rota("entradas-detail", reverse("entradas-detail", args=[self.entradas[0].pk]))
+
+    def test_entradas_exportar(self):
+        self.medir_rota("entradas-exportar", reverse("entradas-exportar"))
+
+    def test_entradas_gastos(self):
+        self.medir_rota(
+            "entradas-gastos", reverse("entradas-gastos", args=[self.entradas[0].pk]), {"size": 200}
+        )
+
+    @skipIf(settings.SOMENTE_API, "admin desativado no modo somente API")
+    def test_admin_listagens(self):
+        for nome in sorted(get_changelists("financeiro")):
+            with self.subTest(nome):
+                self.medir_rota(nome, reverse(nome), cliente=self.cliente_sessao)
+
+
+class SerieTemporalTestCase(ReplicaTesteMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(email="serie@teste.com", nome="Série")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def get_serie(self, inicio, fim, granularidade):
+        return self.client.get(
+            reverse("despesas-serie-temporal"),
+            {"inicio": inicio, "fim": fim, "granularidade": granularidade},
+            HTTP_HOST="localhost",
+        )
+
+    def test_periodos_ate_a_ultima_data(self):
+        quantidades = {"dia": 365, "semana": 53, "mes": 12, "ano": 1}
+        for granularidade, quantidade in quantidades.items():
+            with self.subTest(granularidade):
+                response = self.get_serie("9999-01-01", "9999-12-31", granularidade)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()["resultados"]), quantidade)
+
+    def test_intervalo_grande_recusado_sem_gerar_os_periodos(self):
+        with mock.patch.object(SaidaDinheiroViewSet, "get_periodos") as get_periodos:
+            response = self.get_serie("2000-01-01", "9999-12-31", "dia")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("granularidade", response.json())
+        get_periodos.assert_not_called()
+
+    def test_contagem_igual_aos_periodos_gerados(self):
+        view = SaidaDinheiroViewSet()
+        intervalos = [
+            (date(2023, 1, 31), date(2024, 3, 1)),
+            (date(2024, 2, 29), date(2024, 2, 29)),
+            (date(2021, 12, 27), date(2023, 1, 2)),
+        ]
+        for inicio, fim in intervalos:
+            for granularidade in SaidaDinheiroViewSet.GRANULARIDADES:
+                with self.subTest(inicio=inicio, fim=fim, granularidade=granularidade):
+                    self.assertEqual(
+                        view.contar_periodos(inicio, fim, granularidade),
+                        len(view.get_periodos(inicio, fim, granularidade)),
+                    )
+
+
+class SaidaDinheiroAsyncTestCase(ReplicaTesteMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(email="async@teste.com", nome="Async")
+        semear_financeiro(cls.usuario, entradas=2, saidas_por_entrada=20, destinos=3)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_login(self.usuario)
+
+    def listar(self, nome, parametros):
+        response = self.client.get(reverse(nome), parametros, HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return response.json()
+
+    def test_mesmos_resultados_da_viewset(self):
+        ano = date.today().year
+        consultas = [
+            {"ordering": "valor_total"},
+            {"ordering": "-data_gasto,id", "size": 5, "page": 2},
+            {"data_gasto__gte": f"{ano}-02-01", "ordering": "classe"},
+        ]
+        for parametros in consultas:
+            with self.subTest(parametros):
+                esperado = self.listar("despesas-list", parametros)
+                obtido = self.listar("despesas-async", parametros)
+
+                self.assertEqual(obtido["total"], esperado["total"])
+                self.assertEqual(
+                    [linha["id"] for linha in obtido["resultados"]],
+                    [linha["id"] for linha in esperado["resultados"]],
+                )
+
+    def test_filtro_invalido(self):
+        response = self.client.get(
+            reverse("despesas-async"), {"data_gasto__gte": "ontem"}, HTTP_HOST="localhost"
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("data_gasto__gte", response.json())
+
+
+class ExportacaoTestCase(ReplicaTesteMixin, TestCase):
+    CAMPOS = [campo.attname for campo in SaidaDinheiro._meta.concrete_fields]
+
+    @classmethod
+    def setUpTestData(cls):
+        Usuario = get_user_model()
+        cls.usuario = Usuario.objects.create_user(
+            email="exportacao@teste.com", nome="Exportação", is_staff=True
+        )
+        cls.outro = Usuario.objects.create_user(email="alheio@teste.com", nome="Alheio")
+        cls.entradas = semear_financeiro(cls.usuario, entradas=2, saidas_por_entrada=5, destinos=2)
+        semear_financeiro(cls.outro, entradas=2, saidas_por_entrada=3, destinos=1)
+        cls.ano = date.today().year
+
+    def exportar(self, formato, **parametros):
+        cliente = APIClient()
+        cliente.force_authenticate(self.usuario)
+        response = cliente.get(
+            reverse("despesas-exportar"), {"formato": formato, **parametros}, HTTP_HOST="localhost"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response["Content-Disposition"],
+            f'attachment; filename="{SaidaDinheiro._meta.db_table}.{formato}"',
+        )
+        return response, b"".join(response.streaming_content).decode("utf-8")
+
+    def get_linhas(self, queryset):
+        return {
+            str(linha[0]): linha
+            for linha in queryset.values_list(*self.CAMPOS)
+        }
+
+    def test_csv(self):
+        response, conteudo = self.exportar("csv")
+        cabecalho, *linhas = csv.reader(io.StringIO(conteudo))
+
+        self.assertTrue(response["Content-Type"].startswith("text/csv"))
+        self.assertEqual(cabecalho, self.CAMPOS)
+
+        esperadas = self.get_linhas(SaidaDinheiro.objects.from_user(self.usuario))
+        self.assertEqual(len(linhas), len(esperadas))
+        for linha in linhas:
+            esperada = esperadas[linha[0]]
+            self.assertEqual(
+                linha, ["" if valor is None else str(valor) for valor in esperada]
+            )
+
+    def test_ndjson(self):
+        response, conteudo = self.exportar("ndjson")
+        linhas = [json.loads(linha) for linha in conteudo.splitlines()]
+
+        self.assertTrue(response["Content-Type"].startswith("application/x-ndjson"))
+        esperadas = self.get_linhas(SaidaDinheiro.objects.from_user(self.usuario))
+        self.assertEqual(len(linhas), len(esperadas))
+        for linha in linhas:
+            self.assertEqual(list(linha), self.CAMPOS)
+            esperada = esperadas[str(linha["id"])]
+            self.assertEqual(linha["descricao"], esperada[self.CAMPOS.index("descricao")])
+            self.assertEqual(linha["criador_id"], self.usuario.pk)
+            self.assertEqual(
+                linha["data_gasto"], esperada[self.CAMPOS.index("data_gasto")].isoformat()
+            )
+
+    def test_respeita_os_filtros(self):
+        fevereiro = date(self.ano, 2, 1)
+        for formato in ("csv", "ndjson"):
+            with self.subTest(formato):
+                _, conteudo = self.exportar(formato, data_gasto__gte=fevereiro.isoformat())
+
+                if formato == "csv":
+                    ids = [linha[0] for linha in list(csv.reader(io.StringIO(conteudo)))[1:]]
+                else:
+                    ids = [str(json.loads(linha)["id"]) for linha in conteudo.splitlines()]
+
+                esperados = SaidaDinheiro.objects.from_user(self.usuario).filter(
+                    data_gasto__gte=fevereiro
+                )
+                self.assertTrue(ids)
+                self.assertCountEqual(ids, [str(pk) for pk in esperados.values_list("pk", flat=True)])
+
+    def test_somente_registros_do_tenant(self):
+        _, conteudo = self.exportar("ndjson")
+        criadores = {json.loads(linha)["criador_id"] for linha in conteudo.splitlines()}
+
+        self.assertEqual(criadores, {self.usuario.pk})
+
+    def test_formato_invalido(self):
+        cliente = APIClient()
+        cliente.force_authenticate(self.usuario)
+        response = cliente.get(
+            reverse("despesas-exportar"), {"formato": "xml"}, HTTP_HOST="localhost"
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("formato", response.json())
+
+    @skipIf(settings.SOMENTE_API, "admin desativado no modo somente API")
+    def test_xlsx_do_admin(self):
+        from django.contrib import admin
+        from import_export.formats import base_formats
+        from openpyxl import load_workbook
+
+        model_admin = admin.site._registry[SaidaDinheiro]
+        formato = next(
+            i
+            for i, classe in enumerate(model_admin.get_export_formats())
+            if classe is base_formats.XLSX
+        )
+
+        salvo = exportar_admin(
+            SaidaDinheiro._meta.label,
+            self.usuario.pk,
+            reverse("admin:financeiro_saidadinheiro_changelist"),
+            {"entrada__id__exact": [str(self.entradas[1].pk)]},
+            formato,
+        )
+        self.addCleanup(default_storage.delete, salvo["arquivo"])
+
+        with default_storage.open(salvo["arquivo"]) as arquivo:
+            planilha = load_workbook(io.BytesIO(arquivo.read())).active
+        cabecalho, *linhas = planilha.iter_rows(values_only=True)
+
+        self.assertIn("id", cabecalho)
+        self.assertIn("descricao", cabecalho)
+        ids = [linha[cabecalho.index("id")] for linha in linhas]
+        descricoes = {linha[cabecalho.index("descricao")] for linha in linhas}
+
+        # somente as saídas da entrada filtrada e do próprio tenant
+        esperadas = SaidaDinheiro.objects.from_user(self.usuario).filter(entrada=self.entradas[1])
+        self.assertCountEqual(ids, list(esperadas.values_list("pk", flat=True)))
+        self.assertEqual(descricoes, set(esperadas.values_list("descricao", flat=True)))
+
+
+class CacheRespostaTestCase(ReplicaTesteMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Usuario = get_user_model()
+        cls.usuario = Usuario.objects.create_user(
+            email="cache@teste.com", nome="Cache", is_staff=True, is_superuser=True
+        )
+        cls.outro = Usuario.objects.create_user(email="outro@teste.com", nome="Outro")
+        cls.destino = DestinoGasto.objects.create(nome="Mercado", criador=cls.usuario)
+        cls.entrada = EntradaDinheiro.objects.create(
+            valor=1000, data_entrada=date(date.today().year, 1, 5), criador=cls.usuario
+        )
+        cls.saida = cls.criar_saida(10)
+
+    @classmethod
+    def criar_saida(cls, valor):
+        return SaidaDinheiro.objects.create(
+            descricao="Compra",
+            valor_total=valor,
+            classe="DES",
+            entrada=cls.entrada,
+            destino=cls.destino,
+            criador=cls.usuario,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, usuario, url, parametros=None):
+        cliente = APIClient()
+        cliente.force_authenticate(usuario)
+        response = cliente.get(url, parametros, HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return response.json()
+
+    def get_gastos(self, usuario=None):
+        url = reverse("entradas-gastos", args=[self.entrada.pk])
+        return self.get(usuario or self.usuario, url)["resultados"]
+
+    def get_total(self, mes=1, usuario=None):
+        kpis = self.get(usuario or self.usuario, reverse("despesas-kpis"), {"data_gasto__month": mes})
+        return sum(linha["total"] for linha in kpis["resultados"])
+
+    def test_reutiliza_a_resposta(self):
+        self.get_total()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_total(), 10)
+
+    def test_chave_por_usuario(self):
+        self.assertEqual(self.get_total(), 10)
+        self.assertEqual(self.get_total(usuario=self.outro), 0)
+
+    def test_chave_pela_query(self):
+        url = reverse("despesas-kpis")
+        self.assertEqual(self.get_total(mes=1), 10)
+        self.assertEqual(self.get_total(mes=2), 0)
+
+        # a ordem dos parâmetros não muda a chave
+        self.get(self.usuario, f"{url}?data_gasto__month=1&size=5")
+        with self.assertNumQueries(0):
+            self.get(self.usuario, f"{url}?size=5&data_gasto__month=1")
+
+    def test_invalidado_pelo_save_e_pelo_delete(self):
+        self.assertEqual(self.get_total(), 10)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            saida = self.criar_saida(5)
+        self.assertEqual(self.get_total(), 15)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            saida.delete()
+        self.assertEqual(self.get_total(), 10)
+
+    def test_invalida_somente_o_usuario_alterado(self):
+        self.get_total()
+        self.get_total(usuario=self.outro)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.criar_saida(5)
+
+        with self.assertNumQueries(0):
+            self.get_total(usuario=self.outro)
+
+    def test_invalidado_pelas_operacoes_do_queryset(self):
+        self.assertEqual([gasto["paga"] for gasto in self.get_gastos()], [False])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SaidaDinheiro.objects.filter(pk=self.saida.pk).marcar_paga()
+        self.assertEqual([gasto["paga"] for gasto in self.get_gastos()], [True])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SaidaDinheiro.objects.filter(pk=self.saida.pk).duplicar()
+        self.assertEqual(len(self.get_gastos()), 2)
+        self.assertEqual(self.get_total(), 20)
+
+    @skipIf(settings.SOMENTE_API, "admin desativado no modo somente API")
+    def test_invalidado_pela_acao_do_admin(self):
+        self.assertEqual([gasto["paga"] for gasto in self.get_gastos()], [False])
+
+        cliente = APIClient()
+        cliente.force_login(self.usuario)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = cliente.post(
+                reverse("admin:financeiro_saidadinheiro_changelist"),
+                {"action": "marcar_como_paga", "_selected_action": [self.saida.pk]},
+                HTTP_HOST="localhost",
+            )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual([gasto["paga"] for gasto in self.get_gastos()], [True])
+
+
+class PaginacaoCursorTestCase(ReplicaTesteMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(email="cursor@teste.com", nome="Cursor")
+        destino = DestinoGasto.objects.create(nome="Mercado", criador=cls.usuario)
+        entrada = EntradaDinheiro.objects.create(valor=100, criador=cls.usuario)
+        # empates na data do gasto e saídas sem data, que ficam no fim
+        datas = [date(2023, 1, 1 + i % 3) if i % 4 else None for i in range(11)]
+        SaidaDinheiro.objects.bulk_create(
+            SaidaDinheiro(
+                descricao=f"Gasto {i}",
+                valor_total=10,
+                entrada=entrada,
+                destino=destino,
+                data_gasto=data,
+                criador=cls.usuario,
+            )
+            for i, data in enumerate(datas)
+        )
+
+        def ordem(saida):
+            data, pk = saida
+            return (data is None, -(data or date.min).toordinal(), -pk)
+
+        saidas = SaidaDinheiro.objects.values_list("data_gasto", "id")
+        cls.esperado = [pk for _, pk in sorted(saidas, key=ordem)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def get(self, url, parametros=None):
+        response = self.client.get(url, parametros, HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return response.json()
+
+    def test_navega_para_frente_e_para_tras(self):
+        pagina = self.get(reverse("despesas-list"), {"paginacao": "cursor", "size": 3})
+        self.assertIsNone(pagina["links_paginas"]["anterior"])
+
+        paginas = [pagina]
+        while pagina["links_paginas"]["proxima"]:
+            pagina = self.get(pagina["links_paginas"]["proxima"])
+            paginas.append(pagina)
+
+        ids = [linha["id"] for pagina in paginas for linha in pagina["resultados"]]
+        self.assertEqual(ids, self.esperado)
+        self.assertEqual([len(pagina["resultados"]) for pagina in paginas], [3, 3, 3, 2])
+
+        # de volta a partir da última página, passando pelas mesmas páginas
+        voltando = []
+        while pagina["links_paginas"]["anterior"]:
+            pagina = self.get(pagina["links_paginas"]["anterior"])
+            voltando.append([linha["id"] for linha in pagina["resultados"]])
+
+        self.assertEqual(
+            voltando[::-1], [[linha["id"] for linha in pagina["resultados"]] for pagina in paginas[:-1]]
+        )
+
+    def test_total_somente_quando_pedido(self):
+        url = reverse("despesas-list")
+        self.assertIsNone(self.get(url, {"paginacao": "cursor", "size": 3})["total"])
+        self.assertEqual(self.get(url, {"paginacao": "cursor", "size": 3, "total": "true"})["total"], 11)
+
+    def test_cursor_invalido(self):
+        cursores = [
+            "não é base64",
+            "!!!",
+            b64encode(b"nao e json").decode(),
+            b64encode(b'{"p": [1]}').decode(),
+            b64encode(b'{"p": 5}').decode(),
+            b64encode(b'{"p": ["ontem", "abc"]}').decode(),
+            b64encode(b'{"p": [{"a": 1}, 1]}').decode(),
+        ]
+        for cursor in cursores:
+            with self.subTest(cursor):
+                response = self.client.get(
+                    reverse("despesas-list"),
+                    {"paginacao": "cursor", "cursor": cursor},
+                    HTTP_HOST="localhost",
+                )
+                self.assertEqual(response.status_code, 404)
+
+
+class SaidaDecimalSerializer(SaidaDinheiroSerializer):
+    valor_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class SerializacaoRapidaTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        usuario = get_user_model().objects.create_user(email="rapida@teste.com", nome="Rápida")
+        destino = DestinoGasto.objects.create(nome="Mercado", criador=usuario)
+        entradas = [
+            EntradaDinheiro.objects.create(valor=1500.75, data_entrada=date(2023, 1, 5), criador=usuario),
+            EntradaDinheiro.objects.create(valor=0.1, origem="PRO", criador=usuario),
+        ]
+        primeira = SaidaDinheiro.objects.create(
+            descricao="Parcelada",
+            valor_total=10.1,
+            classe="ECO",
+            entrada=entradas[0],
+            destino=destino,
+            parcela=1,
+            total_parcelas=3,
+            criador=usuario,
+        )
+        # com a saída de origem preenchida e a data do gasto vazia
+        SaidaDinheiro.objects.bulk_create(
+            [
+                SaidaDinheiro(
+                    descricao="Parcela 2",
+                    valor_total=1234.567,
+                    entrada=entradas[1],
+                    destino=destino,
+                    saida=primeira,
+                    paga=True,
+                    criador=usuario,
+                )
+            ]
+        )
+
+    def assertMesmaSaida(self, serializer_class, queryset):
+        view = SaidaDinheiroViewSet()
+        plano = view.get_plano_serializacao(serializer_class, queryset.model)
+        self.assertIsNotNone(plano, "o serializer deveria usar o caminho rápido")
+
+        nos, caminhos = plano
+        montar = view.get_montador(nos)
+        rapido = [montar(linha) for linha in queryset.values(*caminhos)]
+        padrao = serializer_class(queryset, many=True).data
+
+        # mesmos valores, tipos e ordem dos campos
+        self.assertEqual(rapido, padrao)
+        self.assertEqual(JSONRenderer().render(rapido), JSONRenderer().render(padrao))
+
+    def test_despesas(self):
+        queryset = SaidaDinheiro.objects.order_by("pk")
+        self.assertIsNone(queryset.first().saida_id)
+        self.assertIsNone(queryset.last().data_gasto)
+
+        self.assertMesmaSaida(SaidaDinheiroSerializer, queryset)
+
+    def test_entradas(self):
+        self.assertMesmaSaida(EntradaDinheiroSerializer, EntradaDinheiro.objects.order_by("pk"))
+
+    def test_decimais(self):
+        self.assertMesmaSaida(SaidaDecimalSerializer, SaidaDinheiro.objects.order_by("pk"))
+
+
+class ResumoGastoDiarioTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(email="resumo@teste.com", nome="Resumo")
+        cls.destino = DestinoGasto.objects.create(nome="Mercado", criador=cls.usuario)
+        cls.entrada = EntradaDinheiro.objects.create(
+            valor=1000, data_entrada=date(2023, 1, 5), criador=cls.usuario
+        )
+
+    def criar_saida(self, valor):
+        return SaidaDinheiro.objects.create(
+            descricao="Compra",
+            valor_total=valor,
+            classe="DES",
+            entrada=self.entrada,
+            destino=self.destino,
+            data_gasto=date(2023, 1, 10),
+            criador=self.usuario,
+        )
+
+    def test_remocao_mantem_a_linha_com_saidas(self):
+        self.criar_saida(10)
+        self.criar_saida(30).delete()
+
+        resumo = ResumoGastoDiario.objects.get()
+        self.assertEqual((resumo.total, resumo.quantidade), (10, 1))
+
+    def test_apaga_somente_a_linha_zerada(self):
+        # linha zerada de outra chave, que a remoção não deve percorrer
+        outra = ResumoGastoDiario.objects.create(
+            criador=self.usuario,
+            dia=date(2023, 2, 1),
+            classe="LAZ",
+            destino=self.destino,
+            total=0,
+            quantidade=0,
+        )
+        saida = self.criar_saida(10)
+
+        with CaptureQueriesContext(connection) as consultas:
+            saida.delete()
+
+        self.assertEqual(list(ResumoGastoDiario.objects.all()), [outra])
+        remocoes = [
+            consulta["sql"]
+            for consulta in consultas
+            if consulta["sql"].startswith('DELETE FROM "resumo_gasto_diario"')
+        ]
+        self.assertEqual(len(remocoes), 1)
+        self.assertIn('"dia"', remocoes[0])
+
+    def test_preencher_data_gasto_em_um_update(self):
+        outra_entrada = EntradaDinheiro.objects.create(
+            valor=1000, data_entrada=date(2023, 2, 5), criador=self.usuario
+        )
+        SaidaDinheiro.objects.bulk_create(
+            SaidaDinheiro(
+                descricao="Sem data",
+                valor_total=10,
+                classe="DES",
+                entrada=entrada,
+                destino=self.destino,
+                criador=self.usuario,
+            )
+            for entrada in (self.entrada, outra_entrada, outra_entrada)
+        )
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(SaidaDinheiro.objects.all().preencher_data_gasto(), 3)
+
+        atualizacoes = [c for c in consultas if c["sql"].startswith('UPDATE "saida_dinheiro"')]
+        self.assertEqual(len(atualizacoes), 1)
+        self.assertEqual(
+            sorted(SaidaDinheiro.objects.values_list("data_gasto", flat=True)),
+            [date(2023, 1, 5), date(2023, 2, 5), date(2023, 2, 5)],
+        )
+        self.assertEqual(
+            dict(ResumoGastoDiario.objects.values_list("dia", "quantidade")),
+            {date(2023, 1, 5): 1, date(2023, 2, 5): 2},
+        )
+
+    def test_inclusao_nao_apaga(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.criar_saida(10)
+
+        self.assertFalse(
+            [c for c in consultas if c["sql"].startswith('DELETE FROM "resumo_gasto_diario"')]
+        )
+
+
+class PropagarDataEntradaTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(email="propagar@teste.com", nome="Propagar")
+        cls.destino = DestinoGasto.objects.create(nome="Mercado", criador=cls.usuario)
+        cls.entrada = EntradaDinheiro.objects.create(
+            valor=1000, data_entrada=date(2023, 1, 5), criador=cls.usuario
+        )
+        cls.outra_entrada = EntradaDinheiro.objects.create(
+            valor=1000, data_entrada=date(2023, 1, 5), criador=cls.usuario
+        )
+
+    def criar_saida(self, entrada, data_gasto=None):
+        return SaidaDinheiro.objects.create(
+            descricao="Compra",
+            valor_total=10,
+            classe="DES",
+            entrada=entrada,
+            destino=self.destino,
+            data_gasto=data_gasto,
+            criador=self.usuario,
+        )
+
+    def get_data(self, saida):
+        return SaidaDinheiro.objects.values_list("data_gasto", flat=True).get(pk=saida.pk)
+
+    def test_somente_datas_herdadas_mudam(self):
+        herdada = self.criar_saida(self.entrada)
+        informada = self.criar_saida(self.entrada, data_gasto=date(2023, 1, 20))
+        # mesma data da entrada, informada explicitamente: não há como
+        # distinguir de uma herdada, então também acompanha a entrada
+        igual = self.criar_saida(self.entrada, data_gasto=date(2023, 1, 5))
+        de_outra_entrada = self.criar_saida(self.outra_entrada)
+
+        entrada = EntradaDinheiro.objects.get(pk=self.entrada.pk)
+        entrada.data_entrada = date(2023, 2, 5)
+        with CaptureQueriesContext(connection) as consultas:
+            entrada.save()
+
+        self.assertEqual(self.get_data(herdada), date(2023, 2, 5))
+        self.assertEqual(self.get_data(igual), date(2023, 2, 5))
+        self.assertEqual(self.get_data(informada), date(2023, 1, 20))
+        self.assertEqual(self.get_data(de_outra_entrada), date(2023, 1, 5))
+
+        atualizacoes = [c for c in consultas if c["sql"].startswith('UPDATE "saida_dinheiro"')]
+        self.assertEqual(len(atualizacoes), 1)
+        self.assertEqual(
+            dict(ResumoGastoDiario.objects.values_list("dia", "quantidade")),
+            {date(2023, 1, 5): 1, date(2023, 1, 20): 1, date(2023, 2, 5): 2},
+        )
+
+    def test_data_anterior_adiada(self):
+        herdada = self.criar_saida(self.entrada)
+        informada = self.criar_saida(self.entrada, data_gasto=date(2023, 1, 20))
+
+        # sem a data original carregada, a anterior é consultada no banco
+        entrada = EntradaDinheiro.objects.only("valor").get(pk=self.entrada.pk)
+        entrada.data_entrada = date(2023, 3, 5)
+        entrada.save()
+
+        self.assertEqual(self.get_data(herdada), date(2023, 3, 5))
+        self.assertEqual(self.get_data(informada), date(2023, 1, 20))
+
+    def test_outros_campos_nao_tocam_as_saidas(self):
+        saida = self.criar_saida(self.entrada)
+
+        entrada = EntradaDinheiro.objects.get(pk=self.entrada.pk)
+        entrada.valor = 2000
+        with CaptureQueriesContext(connection) as consultas:
+            entrada.save()
+
+        self.assertFalse([c for c in consultas if '"saida_dinheiro"' in c["sql"]])
+        self.assertEqual(self.get_data(saida), date(2023, 1, 5))
+
+
+class ImportadorSaidasTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(email="importa@teste.com", nome="Importa")
+        cls.entrada = EntradaDinheiro.objects.create(
+            valor=5000, data_entrada=date(2023, 3, 5), criador=cls.usuario
+        )
+        cls.mercado = DestinoGasto.objects.create(nome="Mercado", criador=cls.usuario)
+        cls.farmacia = DestinoGasto.objects.create(nome="Farmácia", criador=cls.usuario)
+
+        # mesmo nome em outro tenant, que não pode ser usado
+        outro = get_user_model().objects.create_user(email="outro@teste.com", nome="Outro")
+        cls.destino_outro = DestinoGasto.objects.create(nome="Padaria", criador=outro)
+
+    def importar(self, conteudo, formato="csv", **kwargs):
+        if isinstance(conteudo, str):
+            conteudo = conteudo.encode("utf-8")
+
+        return ImportadorSaidas(self.usuario, **kwargs).importar(io.BytesIO(conteudo), formato)
+
+    def test_csv(self):
+        resultado = self.importar(
+            "descricao;valor_total;classe;entrada;destino;data_gasto;paga\n"
+            f"Arroz;1.234,50;Despesas/Necessidade;{self.entrada.pk};mercado;10/03/2023;sim\n"
+            f"Remédio;20;IMP;{self.entrada.pk};{self.farmacia.pk};;n\n"
+        )
+
+        self.assertEqual((resultado.importadas, resultado.lotes, resultado.erros), (2, 1, []))
+        arroz, remedio = SaidaDinheiro.objects.order_by("pk")
+        self.assertEqual(
+            (arroz.valor_total, arroz.classe, arroz.destino_id, arroz.data_gasto, arroz.paga),
+            (1234.5, "DES", self.mercado.pk, date(2023, 3, 10), True),
+        )
+        # sem data do gasto, vale a da entrada
+        self.assertEqual(
+            (remedio.classe, remedio.destino_id, remedio.data_gasto, remedio.paga),
+            ("IMP", self.farmacia.pk, date(2023, 3, 5), False),
+        )
+        self.assertEqual({saida.criador_id for saida in (arroz, remedio)}, {self.usuario.pk})
+
+    def test_xlsx(self):
+        from openpyxl import Workbook
+
+        planilha = Workbook()
+        folha = planilha.active
+        folha.append(["Descricao", "Valor_Total", "Classe", "Entrada", "Destino", "Data_Gasto", "Parcela"])
+        folha.append(["Arroz", 12.5, "laz", self.entrada.pk, "Mercado", datetime(2023, 3, 12), 2.0])
+        folha.append([None] * 7)
+        conteudo = io.BytesIO()
+        planilha.save(conteudo)
+
+        resultado = self.importar(conteudo.getvalue(), "xlsx")
+
+        self.assertEqual((resultado.importadas, resultado.erros), (1, []))
+        saida = SaidaDinheiro.objects.get()
+        self.assertEqual(
+            (saida.valor_total, saida.classe, saida.data_gasto, saida.parcela),
+            (12.5, "LAZ", date(2023, 3, 12), 2),
+        )
+
+    def test_erros_por_linha(self):
+        resultado = self.importar(
+            "descricao,valor_total,classe,entrada,destino\n"
+            f"Válida,10,DES,{self.entrada.pk},Mercado\n"
+            f"Valor inválido,dez,DES,{self.entrada.pk},Mercado\n"
+            f"Destino de outro tenant,10,DES,{self.entrada.pk},Padaria\n"
+            f"Classe inválida,10,XYZ,{self.entrada.pk},Mercado\n"
+            "Entrada inexistente,10,DES,0,Mercado\n"
+        )
+
+        self.assertEqual(resultado.importadas, 1)
+        erros = dict(resultado.erros)
+        self.assertEqual(sorted(erros), [3, 4, 5, 6])
+        self.assertIn("valor_total", erros[3])
+        self.assertIn("Destino não encontrado: Padaria", erros[4])
+        self.assertIn("classe", erros[5])
+        self.assertIn("Entrada não encontrada: 0", erros[6])
+        self.assertEqual(list(SaidaDinheiro.objects.values_list("descricao", flat=True)), ["Válida"])
+
+    def test_erro_por_lote(self):
+        linhas = "".join(f"Gasto {i},10,DES,{self.entrada.pk},Mercado\n" for i in range(5))
+        bulk_create = SaidaDinheiro.objects.bulk_create
+        chamadas = []
+
+        def recusar_segundo_lote(saidas, *args, **kwargs):
+            chamadas.append(len(saidas))
+            if len(chamadas) == 2:
+                raise DatabaseError("recusado")
+            return bulk_create(saidas, *args, **kwargs)
+
+        with mock.patch.object(SaidaDinheiro.objects, "bulk_create", side_effect=recusar_segundo_lote):
+            resultado = self.importar(
+                "descricao,valor_total,classe,entrada,destino\n" + linhas, tamanho_lote=2
+            )
+
+        self.assertEqual(chamadas, [2, 2, 1])
+        self.assertEqual((resultado.importadas, resultado.lotes), (3, 3))
+        self.assertEqual([numero for numero, _ in resultado.erros], [4, 5])
+        self.assertIn("Lote 2 recusado pelo banco", resultado.erros[0][1])
+        self.assertEqual(
+            sorted(SaidaDinheiro.objects.values_list("descricao", flat=True)),
+            ["Gasto 0", "Gasto 1", "Gasto 4"],
+        )
+        # o lote recusado também não altera os resumos
+        self.assertEqual(ResumoGastoDiario.objects.get().quantidade, 3)
+
+    def test_atualiza_resumos(self):
+        SaidaDinheiro.objects.create(
+            descricao="Anterior",
+            valor_total=5,
+            classe="DES",
+            entrada=self.entrada,
+            destino=self.mercado,
+            data_gasto=date(2023, 3, 10),
+            criador=self.usuario,
+        )
+
+        self.importar(
+            "descricao,valor_total,classe,entrada,destino,data_gasto\n"
+            + "".join(
+                f"Gasto {i},{i + 1},DES,{self.entrada.pk},Mercado,2023-03-{10 + i % 2}\n"
+                for i in range(6)
+            ),
+            tamanho_lote=4,
+        )
+
+        resumos = {
+            resumo.dia: (resumo.total, resumo.quantidade) for resumo in ResumoGastoDiario.objects.all()
+        }
+        self.assertEqual(resumos, {date(2023, 3, 10): (5 + 1 + 3 + 5, 4), date(2023, 3, 11): (2 + 4 + 6, 3)})
+
+        # os mesmos totais de uma reconstrução a partir das saídas
+        ResumoGastoDiario.objects.reconstruir()
+        self.assertEqual(
+            {resumo.dia: (resumo.total, resumo.quantidade) for resumo in ResumoGastoDiario.objects.all()},
+            resumos,
+        )
+
+
+class IndexAdvisorTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(email="advisor@teste.com", nome="Advisor")
+        cls.entradas = semear_financeiro(cls.usuario, entradas=2, saidas_por_entrada=10, destinos=2)
+        ResumoGastoDiario.objects.reconstruir()
+
+    def analisar(self, *nomes, consultas=None, falhar=False):
+        # registra as consultas dos apps antes, para o patch não desfazê-las
+        consultas_sistema.get_consultas()
+
+        saida = io.StringIO()
+        with mock.patch.dict(consultas_sistema._consultas, consultas or {}):
+            with redirect_stdout(saida):
+                call_command("indexadvisor", *nomes, falhar=falhar)
+
+        return saida.getvalue().splitlines()
+
+    def test_consulta_repetida_por_linha_sem_indice(self):
+        # a consulta que um N+1 repete para cada linha listada, buscando as
+        # saídas por uma coluna sem índice: cada repetição lê a tabela toda
+        def gastos_da_entrada():
+            return SaidaDinheiro.objects.filter(descricao="Gasto 1")
+
+        linhas = self.analisar("teste.", consultas={"teste.n_mais_um": gastos_da_entrada})
+
+        self.assertIn("[!] teste.n_mais_um: full scan on saida_dinheiro", linhas)
+        self.assertIn("[x] 1 queries analyzed, 1 with full scans...", linhas)
+        with self.assertRaises(CommandError):
+            self.analisar("teste.", consultas={"teste.n_mais_um": gastos_da_entrada}, falhar=True)
+
+    def test_consulta_ja_otimizada(self):
+        # a mesma listagem resolvida em uma consulta, pelo índice do tenant
+        def gastos_otimizados():
+            return (
+                SaidaDinheiro.objects.from_user(self.usuario)
+                .select_related("entrada", "destino")
+                .order_by("-id")[:12]
+            )
+
+        linhas = self.analisar("teste.", consultas={"teste.otimizada": gastos_otimizados})
+
+        self.assertEqual(
+            linhas, ["[x] teste.otimizada", "[x] 1 queries analyzed, 0 with full scans..."]
+        )
+
+    def test_consultas_do_financeiro_sem_varreduras(self):
+        linhas = self.analisar("despesas.", "entradas.", falhar=True)
+
+        self.assertFalse([linha for linha in linhas if linha.startswith("[!]")])
+        self.assertIn("[x] entradas.gastos", linhas)
+        self.assertIn("[x] despesas.list.cursor", linhas)
+
+
+class AtribuirCriadorMigrationTestCase(TransactionTestCase):
+    """Registros anteriores ao tenant recebem um dono e os resumos são refeitos."""
+
+    anterior = [("financeiro", "0003_criador_tenant")]
+    migracao = [("financeiro", "0004_atribuir_criador")]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.anterior)
+        apps = executor.loader.project_state(self.anterior).apps
+
+        Usuario = apps.get_model(settings.AUTH_USER_MODEL)
+        Usuario.objects.create(email="comum@teste.com", nome="Comum")
+        self.dono = Usuario.objects.create(email="dono@teste.com", nome="Dono", is_superuser=True)
+        self.configurado = Usuario.objects.create(email="configurado@teste.com", nome="Configurado")
+
+        entrada = apps.get_model("financeiro", "EntradaDinheiro").objects.create(
+            valor=1000, data_entrada=date(2020, 1, 5)
+        )
+        destino = apps.get_model("financeiro", "DestinoGasto").objects.create(nome="Mercado")
+        for valor in (10, 20):
+            apps.get_model("financeiro", "SaidaDinheiro").objects.create(
+                descricao="Compra",
+                valor_total=valor,
+                classe="DES",
+                entrada=entrada,
+                destino=destino,
+                data_gasto=date(2020, 1, 5),
+            )
+
+        # resumo sem dono, como os gravados antes da migração 0003
+        apps.get_model("financeiro", "ResumoGastoDiario").objects.create(
+            dia=date(2020, 1, 5), classe="DES", destino=destino, total=30, quantidade=2
+        )
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrar(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migracao)
+
+    def test_atribui_ao_primeiro_superusuario(self):
+        self.migrar()
+
+        for modelo in (EntradaDinheiro, SaidaDinheiro, DestinoGasto):
+            self.assertFalse(modelo.objects.filter(criador__isnull=True).exists())
+            self.assertEqual(modelo.objects.values("criador_id").distinct().get()["criador_id"], self.dono.pk)
+
+        resumo = ResumoGastoDiario.objects.get()
+        self.assertEqual(resumo.criador_id, self.dono.pk)
+        self.assertEqual((resumo.total, resumo.quantidade), (30, 2))
+
+    @override_settings(CRIADOR_PADRAO="configurado@teste.com")
+    def test_atribui_ao_criador_configurado(self):
+        self.migrar()
+
+        self.assertEqual(
+            set(SaidaDinheiro.objects.values_list("criador_id", flat=True)), {self.configurado.pk}
+        )
+        self.assertEqual(ResumoGastoDiario.objects.get().criador_id, self.configurado.pk)
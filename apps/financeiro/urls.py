@@ -1,11 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-# from .views import SaidaDinheiroViewSet, EntradaDinheiroViewSet
+from .async_views import DashboardAsyncView, SaidaDinheiroAsyncView
+from .views import SaidaDinheiroViewSet, EntradaDinheiroViewSet
 
 router = DefaultRouter()
-# router.register('despesas', SaidaDinheiroViewSet, basename='despesas')
-# router.register('entradas', EntradaDinheiroViewSet, basename='entradas')
+router.register('despesas', SaidaDinheiroViewSet, basename='despesas')
+router.register('entradas', EntradaDinheiroViewSet, basename='entradas')
 
 urlpatterns = [
+    path('async/despesas/', SaidaDinheiroAsyncView.as_view(), name='despesas-async'),
+    path('async/despesas/dashboard/', DashboardAsyncView.as_view(), name='despesas-dashboard-async'),
     path('', include(router.urls)),
 ]
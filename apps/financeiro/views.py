@@ -1,13 +1,22 @@
 from datetime import timedelta, date
 
 from django.db.models import Sum
-from django.db.models.functions import TruncDay
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, TruncYear
 
-from rest_framework.viewsets import ReadOnlyModelViewSet
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.decorators import action
 
+from apps.system.base.views import (
+    BaseMultiTenantReadOnlyViewSet,
+    ExportacaoMixin,
+    OtimizacaoConsultasMixin,
+    ReplicaLeituraMixin,
+    SerializacaoRapidaMixin,
+)
+from apps.system.core.cache import cache_resposta
+
+from .models import ResumoGastoDiario
 from .serializers import (
     SaidaDinheiro,
     SaidaDinheiroSerializer,
@@ -16,118 +25,222 @@ from .serializers import (
 )
 
 
-class EntradaDinheiroViewSet(ReadOnlyModelViewSet):
+class PeriodoMixin:
+    """Leitura e divisão dos períodos informados na query das consultas."""
+
+    def get_periodo_mes(self, request):
+        """
+        Retorna o primeiro e o último dia do mês informado na query
+        `data_gasto__month`, considerando o ano atual.
+        """
+        filtro_data_gasto = request.query_params.get("data_gasto__month")
+        if not filtro_data_gasto:
+            raise ValidationError({"data_gasto__month": "Essa query é obrigatória."})
+
+        try:
+            primeiro_dia = date.today().replace(day=1, month=int(filtro_data_gasto))
+        except ValueError:
+            raise ValidationError({"data_gasto__month": "Informe um mês válido."})
+
+        ultimo_dia = (primeiro_dia + timedelta(days=32)).replace(day=1) - timedelta(
+            days=1
+        )
+        return primeiro_dia, ultimo_dia
+
+    def get_data_query(self, request, nome):
+        valor = request.query_params.get(nome)
+        if not valor:
+            raise ValidationError({nome: "Essa query é obrigatória."})
+
+        try:
+            return date.fromisoformat(valor)
+        except ValueError:
+            raise ValidationError({nome: "Informe uma data no formato AAAA-MM-DD."})
+
+    def get_inicio_periodo(self, inicio, granularidade):
+        """Início do período de `inicio`, alinhado como as funções `Trunc*` do banco."""
+        if granularidade == "semana":
+            return inicio - timedelta(days=inicio.weekday())
+        if granularidade == "mes":
+            return inicio.replace(day=1)
+        if granularidade == "ano":
+            return inicio.replace(day=1, month=1)
+        return inicio
+
+    def contar_periodos(self, inicio, fim, granularidade):
+        """Quantidade de períodos entre `inicio` e `fim`, sem gerar as datas."""
+        if granularidade == "semana":
+            return (fim - self.get_inicio_periodo(inicio, granularidade)).days // 7 + 1
+        if granularidade == "mes":
+            return (fim.year - inicio.year) * 12 + fim.month - inicio.month + 1
+        if granularidade == "ano":
+            return fim.year - inicio.year + 1
+        return (fim - inicio).days + 1
+
+    def get_periodos(self, inicio, fim, granularidade):
+        """Lista o início de cada período entre `inicio` e `fim`."""
+        atual = self.get_inicio_periodo(inicio, granularidade)
+
+        periodos = []
+        while atual <= fim:
+            periodos.append(atual)
+            try:
+                if granularidade == "semana":
+                    atual += timedelta(days=7)
+                elif granularidade == "mes":
+                    atual = (atual + timedelta(days=32)).replace(day=1)
+                elif granularidade == "ano":
+                    atual = atual.replace(year=atual.year + 1)
+                else:
+                    atual += timedelta(days=1)
+            except (OverflowError, ValueError):
+                # o próximo período começaria depois de `date.max`
+                break
+
+        return periodos
+
+
+class EntradaDinheiroViewSet(
+    ReplicaLeituraMixin,
+    OtimizacaoConsultasMixin,
+    SerializacaoRapidaMixin,
+    ExportacaoMixin,
+    BaseMultiTenantReadOnlyViewSet,
+):
     queryset = EntradaDinheiro.objects.all()
     serializer_class = EntradaDinheiroSerializer
+    orcamento_consultas = 2
+    serializacao_rapida = True
 
     @action(methods=["get"], detail=True)
+    @cache_resposta("financeiro")
     def gastos(self, request, pk, *args, **kwargs):
         entrada = self.get_object()
-        gastos = entrada.saidas.all()
-
-        page = self.paginate_queryset(self.filter_queryset(gastos))
-        serializer = self.get_serializer(page, many=True)
-        return self.get_paginated_response(serializer.data)
+        gastos = self.otimizar_queryset(
+            entrada.saidas.from_user(request.user), SaidaDinheiroSerializer
+        )
+        return self.listar(self.filter_queryset(gastos), SaidaDinheiroSerializer)
 
 
-class SaidaDinheiroViewSet(ReadOnlyModelViewSet):
+class SaidaDinheiroViewSet(
+    PeriodoMixin,
+    ReplicaLeituraMixin,
+    OtimizacaoConsultasMixin,
+    SerializacaoRapidaMixin,
+    ExportacaoMixin,
+    BaseMultiTenantReadOnlyViewSet,
+):
     queryset = SaidaDinheiro.objects.all()
     serializer_class = SaidaDinheiroSerializer
+    orcamento_consultas = 2
+    serializacao_rapida = True
     filterset_fields = {
-        "data_gasto": ["month"],
+        "data_gasto": ["month", "gte", "lte"],
+    }
+    ordenacao_cursor = ("-data_gasto", "-id")
+
+    GRANULARIDADES = {
+        "dia": TruncDay,
+        "semana": TruncWeek,
+        "mes": TruncMonth,
+        "ano": TruncYear,
     }
 
+    MAXIMO_PONTOS_SERIE = 5000
+
     @action(methods=["get"], detail=False)
     def fixas(self, request):
-        queryset = self.filter_queryset(self.get_queryset()).filter(fixa=True)
-        page = self.paginate_queryset(queryset)
-        serializer = self.get_serializer(page, many=True)
-        return self.get_paginated_response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset()).filter(despesa=True)
+        return self.listar(queryset, self.get_serializer_class())
 
     @action(methods=["get"], detail=False)
+    @cache_resposta("financeiro")
     def total_gasto_por_dia(self, request):
-        # Obtenha o mês a partir da query string
-        filtro_data_gasto = request.query_params.get("data_gasto__month")
-        if not filtro_data_gasto:
-            raise ValidationError({"data_gasto__month": "Essa query é obrigatória."})
-
-        # Obtenha o primeiro e último dia do mês atual
-        primeiro_dia = date.today().replace(day=1, month=int(filtro_data_gasto))
-        ultimo_dia = (primeiro_dia + timedelta(days=32)).replace(day=1) - timedelta(
-            days=1
-        )
+        primeiro_dia, ultimo_dia = self.get_periodo_mes(request)
+        return Response({"resultados": self.get_serie(primeiro_dia, ultimo_dia, "dia")})
 
-        # Crie uma lista de todos os dias do mês
-        todos_dias = [
-            primeiro_dia + timedelta(days=i)
-            for i in range((ultimo_dia - primeiro_dia).days + 1)
-        ]
-
-        # Obtenha os totais de gastos por dia
-        queryset = self.filter_queryset(self.get_queryset())
-        gastos = list(
-            queryset.annotate(data=TruncDay("data_gasto"))
-            .values("data")
-            .annotate(total=Sum("valor_total"))
-            .order_by("data")
+    @action(methods=["get"], detail=False)
+    @cache_resposta("financeiro")
+    def serie_temporal(self, request):
+        inicio = self.get_data_query(request, "inicio")
+        fim = self.get_data_query(request, "fim")
+        if fim < inicio:
+            raise ValidationError({"fim": "A data final deve ser maior que a inicial."})
+
+        granularidade = request.query_params.get("granularidade", "dia")
+        if granularidade not in self.GRANULARIDADES:
+            raise ValidationError(
+                {"granularidade": f"Utilize uma das opções: {', '.join(self.GRANULARIDADES)}."}
+            )
+
+        if self.contar_periodos(inicio, fim, granularidade) > self.MAXIMO_PONTOS_SERIE:
+            raise ValidationError(
+                {"granularidade": "O intervalo possui pontos demais para essa granularidade."}
+            )
+
+        return Response(
+            {
+                "granularidade": granularidade,
+                "resultados": self.get_serie(inicio, fim, granularidade),
+            }
         )
 
-        # Combine a lista de todos os dias com os totais de gastos
-        resultados = []
-        for dia in todos_dias:
-            for gasto in gastos:
-                if gasto["data"] == dia:
-                    resultados.append(gasto)
-                    break
-            else:
-                resultados.append({"data": dia, "total": 0})
-
-        return Response({"resultados": resultados})
-
     @action(methods=["get"], detail=False)
+    @cache_resposta("financeiro")
     def total_gasto_por_categoria(self, request):
-        # Obtenha o mês a partir da query string
-        filtro_data_gasto = request.query_params.get("data_gasto__month")
-        if not filtro_data_gasto:
-            raise ValidationError({"data_gasto__month": "Essa query é obrigatória."})
-
-        # Obtenha o primeiro e último dia do mês atual
-        primeiro_dia = date.today().replace(day=1, month=int(filtro_data_gasto))
-        ultimo_dia = (primeiro_dia + timedelta(days=32)).replace(day=1) - timedelta(
-            days=1
-        )
+        primeiro_dia, ultimo_dia = self.get_periodo_mes(request)
 
-        # Obtenha os totais de gastos por categoria e também a porcentagem
-        queryset = self.filter_queryset(self.get_queryset())
+        # Obtenha os totais de gastos por destino
         gastos = list(
-            queryset.filter(data_gasto__range=[primeiro_dia, ultimo_dia])
-            .values("categoria__nome")
-            .annotate(total=Sum("valor_total"))
-            .order_by("categoria")
+            self.get_resumos(primeiro_dia, ultimo_dia)
+            .values("destino__nome")
+            .annotate(total=Sum("total"))
+            .order_by("destino")
         )
 
         return Response({"resultados": gastos})
 
     @action(methods=["get"], detail=False)
+    @cache_resposta("financeiro")
     def kpis(self, request):
-        # Obtenha o mês a partir da query string
-        filtro_data_gasto = request.query_params.get("data_gasto__month")
-        if not filtro_data_gasto:
-            raise ValidationError({"data_gasto__month": "Essa query é obrigatória."})
+        primeiro_dia, ultimo_dia = self.get_periodo_mes(request)
 
-        # Obtenha o primeiro e último dia do mês atual
-        primeiro_dia = date.today().replace(day=1, month=int(filtro_data_gasto))
-        ultimo_dia = (primeiro_dia + timedelta(days=32)).replace(day=1) - timedelta(
-            days=1
-        )
-
-        # Obtenha os totais de gastos por categoria e também a porcentagem
-        queryset = self.filter_queryset(self.get_queryset())
+        # Obtenha os totais e a quantidade de gastos por classe
         gastos = list(
-            queryset.filter(data_gasto__range=[primeiro_dia, ultimo_dia])
-            .values("origem")
-            .annotate(total=Sum("valor_total"))
-            .order_by("origem")
+            self.get_resumos(primeiro_dia, ultimo_dia)
+            .values("classe")
+            .annotate(total=Sum("total"), quantidade=Sum("quantidade"))
+            .order_by("classe")
         )
 
         return Response({"resultados": gastos})
+
+    def get_serie(self, inicio, fim, granularidade):
+        """
+        Série densa com o total gasto por período. Os totais vêm de uma única
+        consulta agrupada e os períodos sem gastos são preenchidos por busca
+        no dicionário, sem percorrer os resultados para cada período.
+        """
+        truncar = self.GRANULARIDADES[granularidade]
+        totais = {
+            linha["periodo"]: linha["total"]
+            for linha in self.get_resumos(inicio, fim)
+            .annotate(periodo=truncar("dia"))
+            .values("periodo")
+            .annotate(total=Sum("total"))
+            .order_by("periodo")
+        }
+
+        return [
+            {"data": periodo, "total": totais.get(periodo, 0)}
+            for periodo in self.get_periodos(inicio, fim, granularidade)
+        ]
+
+    def get_resumos(self, primeiro_dia, ultimo_dia):
+        """
+        Os resumos já estão agregados por dia, então o custo das consultas
+        depende apenas da quantidade de dias do período.
+        """
+        return ResumoGastoDiario.objects.filter(
+            criador_id=self.request.user.pk, dia__range=[primeiro_dia, ultimo_dia]
+        )
@@ -1,3 +1,77 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.http import HttpResponseRedirect
+from django.urls import reverse
 
-# Register your models here.
+from .models import Base
+
+
+class MultiTenantAdminMixin:
+    """
+    Mixin para os admins de models multi-tenant: usuários que não são
+    superusuários só enxergam e escolhem os próprios registros, e o usuário
+    logado é gravado como `criador` dos registros criados pelo admin.
+    """
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.user.is_superuser:
+            return queryset
+
+        return queryset.from_user(request.user)
+
+    def save_model(self, request, obj, form, change):
+        if not change and obj.criador_id is None:
+            obj.criador = request.user
+
+        super().save_model(request, obj, form, change)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        relacionado = db_field.related_model
+        if not request.user.is_superuser and issubclass(relacionado, Base):
+            kwargs["queryset"] = relacionado._default_manager.from_user(request.user)
+
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class ExportacaoEmTarefaAdminMixin:
+    """
+    Mixin para admins do import_export: a exportação vira uma tarefa de
+    segundo plano, que remonta a listagem com os mesmos filtros e grava o
+    arquivo no storage, em vez de gerá-lo dentro da requisição.
+    """
+
+    def export_action(self, request, *args, **kwargs):
+        from apps.system.core.tarefas import enfileirar
+
+        if request.method != "POST" or not self.has_export_permission(request):
+            return super().export_action(request, *args, **kwargs)
+
+        form = self.get_export_form_class()(
+            self.get_export_formats(),
+            request.POST,
+            resources=self.get_export_resource_classes(),
+        )
+        if not form.is_valid():
+            return super().export_action(request, *args, **kwargs)
+
+        tarefa = enfileirar(
+            "core.exportar_admin",
+            criador=request.user,
+            modelo=self.opts.label,
+            usuario_id=request.user.pk,
+            caminho=request.path,
+            parametros=dict(request.GET.lists()),
+            formato=int(form.cleaned_data["file_format"]),
+            recurso=self.get_resource_index(form),
+        )
+        messages.add_message(
+            request,
+            messages.INFO,
+            f"Exportação enfileirada na tarefa #{tarefa.pk}, o arquivo ficará disponível no resultado dela.",
+        )
+
+        url = reverse(f"admin:{self.opts.app_label}_{self.opts.model_name}_changelist")
+        if request.GET:
+            url = f"{url}?{request.GET.urlencode()}"
+
+        return HttpResponseRedirect(url)
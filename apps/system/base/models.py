@@ -1,20 +1,48 @@
-from django.db import models
+import copy
+
+from django.db import DatabaseError, models
+from django.db.models.base import Deferred, DEFERRED
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 
 # TODO colocar um warning que me fale quando eu não usei o self.get_queryset
 
+TIPOS_MUTAVEIS = (dict, list, set, bytearray)
+
 
-class MultitenantManager(models.Manager):
+def copiar_valor(valor):
     """
-    Manager que filtra os registros pelo tenant do usuário logado.
+    Cópia guardada como valor original de um campo. Os valores mutáveis,
+    como os de um JSONField, são copiados: alterados no lugar, continuariam
+    iguais ao original e a alteração não seria gravada.
+    """
+    if isinstance(valor, TIPOS_MUTAVEIS):
+        return copy.deepcopy(valor)
+
+    return valor
+
+
+class MultitenantQuerySet(models.QuerySet):
+    """
+    QuerySet dos models multi-tenant, onde o tenant é o `criador` do
+    registro.
     """
 
     def from_user(self, user):
         """
-        Filtra os registros pelo tenant do usuário logado.
+        Filtra os registros pelo tenant do usuário logado. Usuários anônimos
+        não enxergam nenhum registro.
         """
-        return self.get_queryset().filter(tenant=self.request.tenant)
+        if user is None or not user.is_authenticated:
+            return self.none()
+
+        return self.filter(criador_id=user.pk)
+
+
+class MultitenantManager(models.Manager.from_queryset(MultitenantQuerySet)):
+    """
+    Manager que filtra os registros pelo tenant do usuário logado.
+    """
 
 
 class Base(models.Model):
@@ -51,20 +79,189 @@ class Base(models.Model):
         help_text="Data e hora da última alteração",
     )
 
-    """
+    # Tenant do registro. Não possui índice próprio: cada model declara
+    # índices compostos começando por ele, que também atendem às buscas
+    # pela chave estrangeira.
     criador = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         verbose_name=_("criador do registro"),
         on_delete=models.PROTECT,
+        related_name="+",
+        null=True,
+        editable=False,
+        db_index=False,
         help_text="Usuário que criou o registro",
     )
-    """
 
     objects = MultitenantManager()
 
+    # Quando verdadeiro, o save de um registro carregado do banco grava
+    # somente as colunas alteradas e não grava nada se nada mudou.
+    salvar_somente_alterados = True
+
+    _valores_originais = None
+
     class Meta:
         abstract = True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+
+        # Uma única tupla alinhada com `_meta.concrete_fields`, que referencia
+        # os mesmos objetos já carregados no registro, exceto os mutáveis.
+        if len(values) == len(cls._meta.concrete_fields):
+            instance._valores_originais = tuple(map(copiar_valor, values))
+        else:
+            instance._valores_originais = instance._get_valores_atuais()
+
+        return instance
+
+    @property
+    def changed_fields(self):
+        """
+        Nomes dos campos alterados desde que o registro foi carregado ou
+        salvo. Para registros novos, todos os campos são considerados
+        alterados.
+        """
+        originais = self._valores_originais
+        campos = self._meta.concrete_fields
+        if originais is None:
+            return {campo.name for campo in campos}
+
+        alterados = set()
+        for campo, original in zip(campos, originais):
+            atual = self.__dict__.get(campo.attname, DEFERRED)
+            if isinstance(atual, Deferred):
+                continue
+
+            if isinstance(original, Deferred) or atual != original:
+                alterados.add(campo.name)
+
+        return alterados
+
+    def has_changed(self, nome):
+        campo = self._meta.get_field(nome)
+        return campo.name in self.changed_fields
+
+    def get_valores_originais(self, *nomes):
+        """
+        Retorna um dicionário com os valores carregados do banco para os
+        campos informados, ou `None` caso o registro seja novo ou algum deles
+        não tenha sido carregado.
+        """
+        originais = self._valores_originais
+        if originais is None:
+            return None
+
+        indices = {campo.name: i for i, campo in enumerate(self._meta.concrete_fields)}
+        valores = {}
+        for nome in nomes:
+            campo = self._meta.get_field(nome)
+            valor = originais[indices[campo.name]]
+            if isinstance(valor, Deferred):
+                return None
+
+            valores[nome] = valor
+
+        return valores
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None and len(args) > 3:
+            update_fields = args[3]
+
+        self._atualizar_valores_originais(update_fields)
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._atualizar_valores_originais(fields)
+
+    def _save_table(
+        self,
+        raw=False,
+        cls=None,
+        force_insert=False,
+        force_update=False,
+        using=None,
+        update_fields=None,
+    ):
+        # Executado depois dos sinais de pre_save, então as alterações feitas
+        # por eles também entram na lista de campos gravados. Somente quando a
+        # pk é a mesma que foi carregada: com a pk limpa ou trocada o save é
+        # o padrão do Django, que insere o registro.
+        if (
+            self.salvar_somente_alterados
+            and update_fields is None
+            and not raw
+            and not force_insert
+            and not self._state.adding
+            and self._valores_originais is not None
+            and using == self._state.db
+            and self.pk is not None
+            and self.pk == self._get_pk_original()
+        ):
+            alterados = self.changed_fields
+            if not alterados:
+                return True
+
+            campos = frozenset(
+                alterados.union(
+                    campo.name
+                    for campo in self._meta.concrete_fields
+                    if getattr(campo, "auto_now", False)
+                )
+            )
+
+            self._update_sem_linhas = False
+            try:
+                return super()._save_table(
+                    raw, cls, force_insert, force_update, using, campos
+                )
+            except DatabaseError:
+                # a linha foi apagada por outra conexão: como no save padrão,
+                # o UPDATE sem linhas vira um INSERT com todos os campos
+                if not self._update_sem_linhas or force_update:
+                    raise
+
+        return super()._save_table(
+            raw, cls, force_insert, force_update, using, update_fields
+        )
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        atualizado = super()._do_update(
+            base_qs, using, pk_val, values, update_fields, forced_update
+        )
+        self._update_sem_linhas = not atualizado
+        return atualizado
+
+    def _get_pk_original(self):
+        indice = list(self._meta.concrete_fields).index(self._meta.pk)
+        original = self._valores_originais[indice]
+        return None if isinstance(original, Deferred) else original
+
+    def _get_valores_atuais(self):
+        return tuple(
+            copiar_valor(self.__dict__.get(campo.attname, DEFERRED))
+            for campo in self._meta.concrete_fields
+        )
+
+    def _atualizar_valores_originais(self, campos=None):
+        if campos is None or self._valores_originais is None:
+            self._valores_originais = self._get_valores_atuais()
+            return
+
+        nomes = set(campos)
+        atuais = self._get_valores_atuais()
+        self._valores_originais = tuple(
+            atual if campo.name in nomes or campo.attname in nomes else original
+            for campo, atual, original in zip(
+                self._meta.concrete_fields, atuais, self._valores_originais
+            )
+        )
+
 
 zero_um = Base.ZERO_UM
 sim_nao = Base.SIM_NAO
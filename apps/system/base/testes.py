@@ -0,0 +1,210 @@
+import os
+import json
+import time
+
+from contextlib import ExitStack
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver
+
+from apps.system.core.routers import get_replica
+
+# limite = referência * (1 + tolerância) + margem, tudo em unidades de calibração
+TOLERANCIA_TEMPO = float(os.environ.get("DESEMPENHO_TOLERANCIA", "1.0"))
+MARGEM_TEMPO = 0.002
+
+# DESEMPENHO_ATUALIZAR=True grava as referências medidas nos arquivos de cada
+# app; DESEMPENHO_TEMPOS=False deixa somente os orçamentos de consultas
+ATUALIZAR_REFERENCIAS = os.environ.get("DESEMPENHO_ATUALIZAR") == "True"
+COMPARAR_TEMPOS = os.environ.get("DESEMPENHO_TEMPOS", "True") == "True"
+
+_unidade = None
+
+
+def get_unidade():
+    """
+    Tempo de uma carga fixa em Python puro nesta máquina. As referências são
+    gravadas como múltiplos dele, para valerem em máquinas mais lentas ou
+    mais rápidas do que a que as gravou.
+    """
+    global _unidade
+    if _unidade is None:
+        dados = [{"id": i, "nome": f"item {i}", "valor": i * 1.5} for i in range(2000)]
+
+        def carga():
+            inicio = time.perf_counter()
+            json.loads(json.dumps(dados))
+            sorted(dados, key=lambda item: -item["valor"])
+            return time.perf_counter() - inicio
+
+        _unidade = min(carga() for _ in range(15))
+
+    return _unidade
+
+
+def get_bancos():
+    """
+    Bancos liberados para os testes: o padrão e a réplica, quando há uma
+    configurada, para onde as views com `ReplicaLeituraMixin` e as views
+    assíncronas mandam as leituras.
+    """
+    replica = get_replica()
+    return {DEFAULT_DB_ALIAS, replica} if replica else {DEFAULT_DB_ALIAS}
+
+
+def get_nomes_rotas(urlconf):
+    """Nomes das rotas declaradas no módulo de urls, incluindo as dos routers."""
+    nomes = set()
+    pendentes = list(get_resolver(urlconf).url_patterns)
+    while pendentes:
+        padrao = pendentes.pop()
+        if isinstance(padrao, URLResolver):
+            pendentes.extend(padrao.url_patterns)
+        elif padrao.name and padrao.name != "api-root":
+            nomes.add(padrao.name)
+
+    return nomes
+
+
+def get_changelists(app_label):
+    """Nomes das urls das listagens do admin dos models registrados da app."""
+    return {
+        f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist"
+        for model in admin.site._registry
+        if model._meta.app_label == app_label
+    }
+
+
+class ReplicaTesteMixin:
+    """
+    Libera a réplica, quando configurada, para o TestCase. Durante os testes
+    o alias da réplica usa a própria conexão do banco padrão: o espelho de
+    teste é outra conexão, que não enxergaria os dados da transação aberta
+    pelo TestCase e ficaria bloqueada por ela. O roteamento das leituras
+    para a réplica é testado à parte, com um `TransactionTestCase`.
+    """
+
+    databases = get_bancos()
+
+    @classmethod
+    def setUpClass(cls):
+        cls._conexoes_replica = {}
+        for alias in cls.databases:
+            if alias != DEFAULT_DB_ALIAS:
+                cls._conexoes_replica[alias] = connections[alias]
+                connections[alias] = connections[DEFAULT_DB_ALIAS]
+
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias, conexao in cls._conexoes_replica.items():
+            connections[alias] = conexao
+
+
+class DesempenhoMixin(ReplicaTesteMixin):
+    """
+    Orçamento de consultas e referência de tempo para as rotas da API.
+
+    Cada TestCase declara em `orcamentos` o máximo de consultas de cada rota
+    (pelo nome da url) e em `arquivo_referencias` o JSON com os tempos de
+    referência. `medir_rota` falha quando a rota passa do orçamento ou fica
+    mais lenta do que a referência além da tolerância; rotas novas sem
+    orçamento fazem o `assertRotasComOrcamento` falhar.
+    """
+
+    orcamentos = {}
+    arquivo_referencias = None
+    repeticoes = 5
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.referencias = {}
+        if cls.arquivo_referencias and os.path.exists(cls.arquivo_referencias):
+            with open(cls.arquivo_referencias) as arquivo:
+                cls.referencias = json.load(arquivo)
+
+        cls.medidas = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        if ATUALIZAR_REFERENCIAS and cls.arquivo_referencias and cls.medidas:
+            referencias = {**cls.referencias, **cls.medidas}
+            with open(cls.arquivo_referencias, "w") as arquivo:
+                json.dump(dict(sorted(referencias.items())), arquivo, indent=4)
+                arquivo.write("\n")
+
+        super().tearDownClass()
+
+    def requisitar(self, cliente, url, dados=None, metodo="get"):
+        response = getattr(cliente, metodo)(url, dados, HTTP_HOST="localhost")
+        if response.streaming:
+            # as consultas das respostas em streaming rodam durante a leitura
+            b"".join(response.streaming_content)
+
+        return response
+
+    def medir_rota(self, nome, url, dados=None, cliente=None, metodo="get", status=200, chave=None):
+        """
+        Requisita a url com o cache vazio, confere o status e o orçamento de
+        consultas da rota `nome` e compara o melhor tempo das repetições com
+        a referência gravada em `chave` (padrão: o próprio nome).
+        """
+        cliente = cliente or self.client
+        chave = chave or nome
+
+        cache.clear()
+        with ExitStack() as pilha:
+            # somente os bancos liberados para o TestCase, e cada conexão uma
+            # vez, já que a réplica usa a do banco padrão
+            conexoes = {id(connections[alias]): connections[alias] for alias in self.databases}
+            capturas = [
+                pilha.enter_context(CaptureQueriesContext(conexao)) for conexao in conexoes.values()
+            ]
+            response = self.requisitar(cliente, url, dados, metodo)
+
+        self.assertEqual(response.status_code, status, getattr(response, "content", b"")[:500])
+
+        consultas = [consulta["sql"] for captura in capturas for consulta in captura.captured_queries]
+        orcamento = self.orcamentos[nome]
+        self.assertLessEqual(
+            len(consultas),
+            orcamento,
+            f"{chave} executou {len(consultas)} consultas, acima do orçamento de {orcamento}:\n"
+            + "\n".join(consultas),
+        )
+
+        tempos = []
+        for _ in range(self.repeticoes):
+            cache.clear()
+            inicio = time.perf_counter()
+            self.requisitar(cliente, url, dados, metodo)
+            tempos.append(time.perf_counter() - inicio)
+
+        medida = min(tempos) / get_unidade()
+        self.medidas[chave] = round(medida, 2)
+
+        referencia = self.referencias.get(chave)
+        if COMPARAR_TEMPOS and not ATUALIZAR_REFERENCIAS and referencia is not None:
+            limite = referencia * (1 + TOLERANCIA_TEMPO) + MARGEM_TEMPO / get_unidade()
+            self.assertLessEqual(
+                medida,
+                limite,
+                f"{chave} levou {min(tempos) * 1000:.1f} ms ({medida:.1f} unidades), "
+                f"acima da referência de {referencia:.1f} unidades com a tolerância",
+            )
+
+        return response
+
+    def assertRotasComOrcamento(self, urlconf, extras=()):
+        rotas = get_nomes_rotas(urlconf) | set(extras)
+        self.assertEqual(
+            rotas - set(self.orcamentos),
+            set(),
+            "rotas sem orçamento de consultas",
+        )
@@ -1,3 +1,176 @@
-from django.test import TestCase
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.financeiro.models import DestinoGasto, EntradaDinheiro, SaidaDinheiro
+from apps.financeiro.serializers import SaidaDinheiroSerializer
+from apps.system.core.models import Tarefa
+
+from .views import BaseMultiTenantReadOnlyViewSet, OtimizacaoConsultasMixin
+
+
+class EntradaComGastosSerializer(serializers.ModelSerializer):
+    saidas = SaidaDinheiroSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = EntradaDinheiro
+        fields = ("id", "valor", "saidas")
+
+
+class SaidaDinheiroOtimizadaViewSet(OtimizacaoConsultasMixin, BaseMultiTenantReadOnlyViewSet):
+    queryset = SaidaDinheiro.objects.all()
+    serializer_class = SaidaDinheiroSerializer
+    orcamento_consultas = 2
+
+
+class SalvarSomenteAlteradosTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(email="base@teste.com", nome="Base")
+        cls.destino = DestinoGasto.objects.create(nome="Mercado", criador=cls.usuario)
+
+    def test_grava_somente_os_campos_alterados(self):
+        destino = DestinoGasto.objects.get(pk=self.destino.pk)
+        destino.nome = "Feira"
+
+        with CaptureQueriesContext(connection) as consultas:
+            destino.save()
+
+        self.assertEqual(len(consultas), 1)
+        self.assertIn('"nome"', consultas[0]["sql"])
+        self.assertNotIn('"criador_id"', consultas[0]["sql"])
+        self.assertEqual(DestinoGasto.objects.get(pk=self.destino.pk).nome, "Feira")
+
+    def test_sem_alteracoes_nao_grava(self):
+        destino = DestinoGasto.objects.get(pk=self.destino.pk)
+
+        with CaptureQueriesContext(connection) as consultas:
+            destino.save()
+
+        self.assertEqual(len(consultas), 0)
+
+    def test_copia_limpando_a_pk(self):
+        copia = DestinoGasto.objects.get(pk=self.destino.pk)
+        copia.pk = None
+        copia.save()
+
+        self.assertNotEqual(copia.pk, self.destino.pk)
+        self.assertEqual(DestinoGasto.objects.filter(nome="Mercado").count(), 2)
+        self.assertEqual(DestinoGasto.objects.get(pk=copia.pk).criador_id, self.usuario.pk)
+
+    def test_registro_apagado_por_outra_conexao_e_inserido(self):
+        destino = DestinoGasto.objects.get(pk=self.destino.pk)
+        DestinoGasto.objects.filter(pk=self.destino.pk).delete()
+
+        destino.nome = "Padaria"
+        destino.save()
+
+        recriado = DestinoGasto.objects.get(pk=self.destino.pk)
+        self.assertEqual(recriado.nome, "Padaria")
+        self.assertEqual(recriado.criador_id, self.usuario.pk)
+
+    def test_alteracao_no_lugar_de_campo_mutavel(self):
+        Tarefa.objects.create(
+            nome="core.enviar_email", argumentos={"titulo": "Aviso"}, executar_em=timezone.now()
+        )
+        tarefa = Tarefa.objects.get()
+
+        tarefa.argumentos["x"] = 1
+        tarefa.save()
+        self.assertEqual(Tarefa.objects.get().argumentos, {"titulo": "Aviso", "x": 1})
+
+        # o original é atualizado com uma cópia, então a próxima alteração
+        # no lugar também é percebida
+        tarefa.argumentos["x"] = 2
+        self.assertEqual(tarefa.changed_fields, {"argumentos"})
+        tarefa.save()
+        self.assertEqual(Tarefa.objects.get().argumentos["x"], 2)
+
+
+class OtimizacaoConsultasTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(email="otimizacao@teste.com", nome="Otimização")
+        cls.destinos = DestinoGasto.objects.bulk_create(
+            DestinoGasto(nome=f"Destino {i}", criador=cls.usuario) for i in range(5)
+        )
+        cls.entradas = EntradaDinheiro.objects.bulk_create(
+            EntradaDinheiro(valor=1000, data_entrada=date(2023, mes, 5), criador=cls.usuario)
+            for mes in range(1, 5)
+        )
+        SaidaDinheiro.objects.bulk_create(
+            SaidaDinheiro(
+                descricao=f"Gasto {i}",
+                valor_total=10 + i,
+                classe="DES",
+                entrada=cls.entradas[i % len(cls.entradas)],
+                destino=cls.destinos[i % len(cls.destinos)],
+                data_gasto=date(2023, 1, 1 + i % 28),
+                criador=cls.usuario,
+            )
+            for i in range(40)
+        )
+
+    def otimizar(self, queryset, serializer_class):
+        return OtimizacaoConsultasMixin().otimizar_queryset(queryset, serializer_class)
+
+    def contar_consultas(self, queryset, serializer_class):
+        with CaptureQueriesContext(connection) as consultas:
+            serializer_class(queryset, many=True).data
+
+        return len(consultas)
+
+    def test_plano_das_chaves_estrangeiras(self):
+        queryset = self.otimizar(SaidaDinheiro.objects.all(), SaidaDinheiroSerializer)
+
+        # depth = 1: as chaves estrangeiras aninhadas vão para o mesmo JOIN
+        self.assertEqual(
+            set(queryset.query.select_related), {"entrada", "destino", "saida"}
+        )
+        self.assertEqual(queryset._prefetch_related_lookups, ())
+
+    def test_plano_da_relacao_multipla(self):
+        queryset = self.otimizar(EntradaDinheiro.objects.all(), EntradaComGastosSerializer)
+
+        # abaixo da relação múltipla as chaves estrangeiras também são prefetch
+        self.assertFalse(queryset.query.select_related)
+        self.assertEqual(
+            set(queryset._prefetch_related_lookups),
+            {"saidas", "saidas__entrada", "saidas__destino", "saidas__saida"},
+        )
+
+    def test_consultas_constantes_com_mais_linhas(self):
+        for serializer_class, queryset in (
+            (SaidaDinheiroSerializer, SaidaDinheiro.objects.order_by("id")),
+            (EntradaComGastosSerializer, EntradaDinheiro.objects.order_by("id")),
+        ):
+            with self.subTest(serializer_class.__name__):
+                otimizado = self.otimizar(queryset, serializer_class)
+                poucas = self.contar_consultas(otimizado[:2], serializer_class)
+                muitas = self.contar_consultas(otimizado, serializer_class)
+
+                self.assertEqual(poucas, muitas)
+                # sem o plano, as relações são buscadas linha a linha
+                self.assertGreater(self.contar_consultas(queryset, serializer_class), muitas)
+
+    @override_settings(DEBUG=True)
+    def test_listagem_acima_do_orcamento(self):
+        view = SaidaDinheiroOtimizadaViewSet.as_view({"get": "list"})
+
+        def listar():
+            request = APIRequestFactory().get("/", HTTP_HOST="localhost")
+            force_authenticate(request, self.usuario)
+            return view(request)
+
+        self.assertEqual(listar().status_code, 200)
+
+        with mock.patch.object(SaidaDinheiroOtimizadaViewSet, "orcamento_consultas", 0):
+            with self.assertRaisesMessage(AssertionError, "acima do orçamento de 0"):
+                listar()
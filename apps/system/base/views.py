@@ -1,10 +1,434 @@
-from rest_framework.viewsets import ModelViewSet
+import csv
 
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import StreamingHttpResponse
+from django.test.utils import CaptureQueriesContext
+from rest_framework import fields as drf_fields
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer, ListSerializer
+from rest_framework.settings import api_settings
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-class BaseMultiTenantViewSet(ModelViewSet):
+from apps.system.core.instrumentacao import medir
+from apps.system.core.routers import banco_leitura, get_banco_leitura
+
+
+class MultiTenantMixin:
+    """
+    Restringe a viewset aos registros do usuário autenticado e grava o
+    usuário como `criador` dos registros criados por ela.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return super().get_queryset().from_user(self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(criador_id=self.request.user.pk)
+
+
+class BaseMultiTenantViewSet(MultiTenantMixin, ModelViewSet):
     """
     Classe base para todas as viewsets multi-tenant
     """
 
+
+class BaseMultiTenantReadOnlyViewSet(MultiTenantMixin, ReadOnlyModelViewSet):
+    """
+    Classe base para as viewsets multi-tenant somente leitura
+    """
+
+
+class ReplicaLeituraMixin:
+    """
+    Leituras (GET, HEAD e OPTIONS) da viewset vão para a réplica, quando há
+    uma configurada, exceto para o usuário fixado no primário depois de uma
+    escrita. Use somente em viewsets que aceitam dados alguns segundos
+    atrasados.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        token = banco_leitura.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            banco_leitura.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            banco_leitura.set(get_banco_leitura(request.user))
+
+
+class OtimizacaoConsultasMixin:
+    """
+    Aplica `select_related`/`prefetch_related` no queryset da viewset de
+    acordo com os campos aninhados do serializer (inclusive os gerados por
+    `depth`), para que a listagem rode sempre na mesma quantidade de
+    consultas, independente do tamanho da página.
+
+    Com `DEBUG` ativo e `orcamento_consultas` definido, a listagem falha com
+    `AssertionError` caso execute mais consultas do que o orçamento.
+    """
+
+    orcamento_consultas = None
+
+    _planos_consulta = {}
+
     def get_queryset(self):
-        return super().get_queryset().filter(criador=self.request.user)
+        return self.otimizar_queryset(super().get_queryset(), self.get_serializer_class())
+
+    def list(self, request, *args, **kwargs):
+        orcamento = self.get_orcamento_consultas()
+        if orcamento is None:
+            return super().list(request, *args, **kwargs)
+
+        conexao = connections[self.get_queryset().db]
+        with CaptureQueriesContext(conexao) as consultas:
+            response = super().list(request, *args, **kwargs)
+
+        assert len(consultas) <= orcamento, (
+            f"{self.__class__.__name__}.list executou {len(consultas)} consultas, "
+            f"acima do orçamento de {orcamento}:\n"
+            + "\n".join(consulta["sql"] for consulta in consultas.captured_queries)
+        )
+        return response
+
+    def get_orcamento_consultas(self):
+        if not settings.DEBUG:
+            return None
+
+        return self.orcamento_consultas
+
+    def otimizar_queryset(self, queryset, serializer_class):
+        chave = (serializer_class, queryset.model)
+        plano = self._planos_consulta.get(chave)
+        if plano is None:
+            select, prefetch = [], []
+            self.planejar_relacoes(
+                serializer_class(), queryset.model, "", False, select, prefetch
+            )
+            plano = self._planos_consulta[chave] = (tuple(select), tuple(prefetch))
+
+        select, prefetch = plano
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+
+        return queryset
+
+    def planejar_relacoes(self, serializer, model, prefixo, em_prefetch, select, prefetch):
+        """
+        Percorre os campos do serializer montando os caminhos de relações.
+        Chaves estrangeiras entram no `select_related`, exceto quando estão
+        abaixo de uma relação múltipla, que precisa de `prefetch_related`.
+        """
+        for campo in serializer.fields.values():
+            if campo.write_only or campo.source == "*" or "." in campo.source:
+                continue
+
+            try:
+                campo_model = model._meta.get_field(campo.source)
+            except FieldDoesNotExist:
+                continue
+
+            if not campo_model.is_relation:
+                continue
+
+            if isinstance(campo, PrimaryKeyRelatedField):
+                # o id já está na própria tabela para chaves estrangeiras
+                if campo_model.many_to_one or campo_model.one_to_one:
+                    continue
+            elif not isinstance(campo, (BaseSerializer, ManyRelatedField, RelatedField)):
+                continue
+
+            caminho = prefixo + campo.source
+            multiplo = campo_model.many_to_many or campo_model.one_to_many
+            if isinstance(campo, ManyRelatedField) and not multiplo:
+                continue
+
+            if em_prefetch or multiplo:
+                prefetch.append(caminho)
+            else:
+                select.append(caminho)
+
+            filho = campo.child if isinstance(campo, ListSerializer) else campo
+            if isinstance(filho, BaseSerializer) and hasattr(filho, "fields"):
+                self.planejar_relacoes(
+                    filho,
+                    campo_model.related_model,
+                    caminho + "__",
+                    em_prefetch or multiplo,
+                    select,
+                    prefetch,
+                )
+
+
+class SerializacaoRapidaMixin:
+    """
+    Caminho rápido opcional para listagens: as linhas vêm de `.values()` e
+    são convertidas por funções montadas uma única vez a partir dos campos do
+    serializer, sem instanciar models nem chamar o `to_representation` de
+    cada campo. A saída é idêntica à do serializer; quando ele possui algum
+    campo que esse caminho não sabe reproduzir, a listagem usa o serializer.
+    """
+
+    serializacao_rapida = False
+
+    _planos_serializacao = {}
+
+    def list(self, request, *args, **kwargs):
+        if not self.serializacao_rapida:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.listar(queryset, self.get_serializer_class())
+
+    def listar(self, queryset, serializer_class):
+        """
+        Pagina e serializa o queryset, usando o caminho rápido quando ele
+        estiver ativo e for suportado pelo serializer.
+        """
+        plano = None
+        if self.serializacao_rapida:
+            plano = self.get_plano_serializacao(serializer_class, queryset.model)
+
+        if plano is None:
+            page = self.paginate_queryset(queryset)
+            serializer = serializer_class(
+                page if page is not None else queryset,
+                many=True,
+                context=self.get_serializer_context(),
+            )
+            with medir("serializacao"):
+                dados = serializer.data
+
+            if page is not None:
+                return self.get_paginated_response(dados)
+            return Response(dados)
+
+        nos, caminhos = plano
+        linhas = queryset.prefetch_related(None).values(*caminhos)
+
+        page = self.paginate_queryset(linhas)
+        montar = self.get_montador(nos)
+        with medir("serializacao"):
+            dados = [montar(linha) for linha in (page if page is not None else linhas)]
+
+        if page is not None:
+            return self.get_paginated_response(dados)
+        return Response(dados)
+
+    def get_plano_serializacao(self, serializer_class, model):
+        chave = (serializer_class, model)
+        if chave not in self._planos_serializacao:
+            caminhos = []
+            nos = self.planejar_serializacao(serializer_class(), model, "", caminhos)
+            self._planos_serializacao[chave] = (
+                None if nos is None else (nos, tuple(dict.fromkeys(caminhos)))
+            )
+
+        return self._planos_serializacao[chave]
+
+    def planejar_serializacao(self, serializer, model, prefixo, caminhos):
+        nos = []
+        for campo in serializer.fields.values():
+            if campo.write_only:
+                continue
+
+            if campo.source == "*" or "." in campo.source:
+                return None
+
+            try:
+                campo_model = model._meta.get_field(campo.source)
+            except FieldDoesNotExist:
+                return None
+
+            caminho = prefixo + campo.source
+
+            if isinstance(campo, BaseSerializer):
+                if isinstance(campo, ListSerializer) or not (
+                    campo_model.many_to_one or campo_model.one_to_one
+                ):
+                    return None
+
+                relacionado = campo_model.related_model
+                caminho_pk = f"{caminho}__{relacionado._meta.pk.name}"
+                caminhos.append(caminho_pk)
+
+                filhos = self.planejar_serializacao(
+                    campo, relacionado, caminho + "__", caminhos
+                )
+                if filhos is None:
+                    return None
+
+                nos.append((campo.field_name, caminho_pk, filhos))
+                continue
+
+            if isinstance(campo, PrimaryKeyRelatedField):
+                if campo.pk_field is not None or not (
+                    campo_model.many_to_one or campo_model.one_to_one
+                ):
+                    return None
+            elif isinstance(campo, (RelatedField, ManyRelatedField)) or campo_model.is_relation:
+                return None
+
+            caminhos.append(caminho)
+            nos.append((campo.field_name, caminho, campo))
+
+        return nos
+
+    def get_montador(self, nos):
+        """
+        Transforma o plano em uma função que recebe a linha do `.values()` e
+        devolve o dicionário na mesma ordem de campos do serializer.
+        """
+        itens = []
+        for nome, caminho, campo in nos:
+            if isinstance(campo, list):
+                itens.append((nome, caminho, self.get_montador(campo), True))
+            else:
+                itens.append((nome, caminho, self.get_conversor(campo), False))
+
+        def montar(linha):
+            dados = {}
+            for nome, caminho, converter, aninhado in itens:
+                valor = linha[caminho]
+                if valor is None:
+                    dados[nome] = None
+                elif aninhado:
+                    dados[nome] = converter(linha)
+                else:
+                    dados[nome] = converter(valor)
+            return dados
+
+        return montar
+
+    def get_conversor(self, campo):
+        if isinstance(campo, PrimaryKeyRelatedField):
+            return lambda valor: valor
+
+        if isinstance(campo, drf_fields.DateTimeField):
+            formato = getattr(campo, "format", api_settings.DATETIME_FORMAT)
+            if formato is None or formato.lower() != drf_fields.ISO_8601:
+                return campo.to_representation
+
+            fuso = campo.timezone if hasattr(campo, "timezone") else campo.default_timezone()
+            if fuso is None:
+                return campo.to_representation
+
+            def converter_data_hora(valor):
+                if not valor or isinstance(valor, str):
+                    return campo.to_representation(valor)
+
+                valor = valor.astimezone(fuso).isoformat()
+                if valor.endswith("+00:00"):
+                    valor = valor[:-6] + "Z"
+                return valor
+
+            return converter_data_hora
+
+        if isinstance(campo, drf_fields.DateField):
+            formato = getattr(campo, "format", api_settings.DATE_FORMAT)
+            if formato is None or formato.lower() != drf_fields.ISO_8601:
+                return campo.to_representation
+
+            def converter_data(valor):
+                if not valor or isinstance(valor, str):
+                    return campo.to_representation(valor)
+                return valor.isoformat()
+
+            return converter_data
+
+        if isinstance(campo, drf_fields.ChoiceField):
+            opcoes = campo.choice_strings_to_values
+            return lambda valor: valor if valor == "" else opcoes.get(str(valor), valor)
+
+        if type(campo) is drf_fields.FloatField:
+            return float
+
+        if type(campo) is drf_fields.IntegerField:
+            return int
+
+        if type(campo) is drf_fields.BooleanField:
+            return campo.to_representation
+
+        if type(campo) is drf_fields.CharField:
+            return str
+
+        return campo.to_representation
+
+
+class LinhaCSV:
+    """Buffer falso para o `csv.writer` devolver a linha em vez de gravá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+class ExportacaoMixin:
+    """
+    Adiciona a action `exportar`, que devolve o queryset filtrado em NDJSON
+    ou CSV via `StreamingHttpResponse`. As linhas são lidas do banco em lotes
+    com `.values_list().iterator()`, então a memória usada não depende da
+    quantidade de registros.
+    """
+
+    campos_exportacao = None
+    tamanho_lote_exportacao = 2000
+    formatos_exportacao = ("ndjson", "csv")
+
+    @action(methods=["get"], detail=False)
+    def exportar(self, request, *args, **kwargs):
+        formato = request.query_params.get("formato", "ndjson")
+        if formato not in self.formatos_exportacao:
+            raise ValidationError(
+                {"formato": f"Utilize uma das opções: {', '.join(self.formatos_exportacao)}."}
+            )
+
+        # o banco é fixado agora, as linhas são lidas depois do fim da view
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        queryset = queryset.using(queryset.db)
+        campos = self.get_campos_exportacao(queryset.model)
+        linhas = queryset.values_list(*campos).iterator(
+            chunk_size=self.tamanho_lote_exportacao
+        )
+
+        if formato == "csv":
+            conteudo = self.gerar_csv(campos, linhas)
+            content_type = "text/csv; charset=utf-8"
+        else:
+            conteudo = self.gerar_ndjson(campos, linhas)
+            content_type = "application/x-ndjson; charset=utf-8"
+
+        response = StreamingHttpResponse(conteudo, content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="{queryset.model._meta.db_table}.{formato}"'
+        )
+        return response
+
+    def get_campos_exportacao(self, model):
+        if self.campos_exportacao is not None:
+            return list(self.campos_exportacao)
+
+        return [campo.attname for campo in model._meta.concrete_fields]
+
+    def gerar_csv(self, campos, linhas):
+        escritor = csv.writer(LinhaCSV())
+        yield escritor.writerow(campos)
+        for linha in linhas:
+            yield escritor.writerow(linha)
+
+    def gerar_ndjson(self, campos, linhas):
+        encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        for linha in linhas:
+            yield encoder.encode(dict(zip(campos, linha))) + "\n"
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('conf', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='configuracao',
+            name='criador',
+            field=models.ForeignKey(db_index=False, editable=False, help_text='Usuário que criou o registro', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='criador do registro'),
+        ),
+        migrations.AddIndex(
+            model_name='configuracao',
+            index=models.Index(fields=['criador'], name='configuracao_criador_idx'),
+        ),
+    ]
@@ -1,6 +1,107 @@
-from django.db import models
+import time
+import threading
+
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
-from apps.system.base.models import Base
+
+from apps.system.base.models import Base, MultitenantManager
+from apps.system.core.cache import get_versao, invalidar_apos_commit
+
+
+VERDADEIROS = frozenset(("s", "sim", "1", "true", "t", "y", "yes", "on"))
+FALSOS = frozenset(("n", "nao", "não", "0", "false", "f", "no", "off", ""))
+
+
+class ConfiguracaoManager(MultitenantManager):
+    """
+    Manager com leitores tipados das configurações ativas. Os valores ficam
+    em um dicionário do processo e, abaixo dele, no cache compartilhado,
+    ambos ligados à versão do namespace `configuracao`. Cada processo só
+    confere essa versão depois de `CONFIGURACAO_INTERVALO_VERIFICACAO`
+    segundos, então as leituras não fazem consultas e alterações feitas em
+    outro worker chegam a todos dentro desse intervalo.
+    """
+
+    namespace = "configuracao"
+
+    _valores = None
+    _versao = None
+    _verificado_em = 0.0
+    _lock = threading.Lock()
+
+    def get_valores(self):
+        cls = ConfiguracaoManager
+        intervalo = getattr(settings, "CONFIGURACAO_INTERVALO_VERIFICACAO", 5)
+
+        valores = cls._valores
+        if valores is not None and time.monotonic() - cls._verificado_em < intervalo:
+            return valores
+
+        with cls._lock:
+            # a versão é lida antes do banco: uma alteração confirmada no meio
+            # da leitura incrementa a versão de novo e a cópia é descartada
+            versao = get_versao(self.namespace)
+            if cls._valores is None or versao != cls._versao:
+                chave = f"configuracoes:{versao}"
+                valores = cache.get(chave)
+                if valores is None:
+                    valores = dict(
+                        self.get_queryset().filter(ativo=True).values_list("codigo", "valor")
+                    )
+                    cache.set(chave, valores, 60 * 60 * 24)
+
+                cls._valores = valores
+                cls._versao = versao
+
+            cls._verificado_em = time.monotonic()
+            return cls._valores
+
+    @classmethod
+    def limpar_cache_local(cls):
+        with cls._lock:
+            cls._valores = None
+            cls._versao = None
+
+    def get_valor(self, codigo, default=None):
+        return self.get_valores().get(codigo, default)
+
+    def get_int(self, codigo, default=None):
+        valor = self.get_valor(codigo)
+        if valor is None:
+            return default
+
+        try:
+            return int(valor.strip())
+        except ValueError:
+            return default
+
+    def get_bool(self, codigo, default=None):
+        valor = self.get_valor(codigo)
+        if valor is None:
+            return default
+
+        valor = valor.strip().lower()
+        if valor in VERDADEIROS:
+            return True
+        if valor in FALSOS:
+            return False
+        return default
+
+    def get_decimal(self, codigo, default=None):
+        valor = self.get_valor(codigo)
+        if valor is None:
+            return default
+
+        try:
+            return Decimal(valor.strip().replace(",", "."))
+        except InvalidOperation:
+            return default
 
 
 class Configuracao(Base):
@@ -16,11 +117,23 @@ class Configuracao(Base):
         _("valor"), max_length=50, help_text="Valor da configuração"
     )
 
+    objects = ConfiguracaoManager()
+
     class Meta:
         db_table = "configuracao"
         ordering = ["-id"]
         verbose_name = _("Configuração")
         verbose_name_plural = _("Configurações")
+        indexes = [
+            models.Index(fields=["criador"], name="configuracao_criador_idx"),
+        ]
 
     def __str__(self):
         return self.codigo
+
+
+@receiver(post_save, sender=Configuracao)
+@receiver(post_delete, sender=Configuracao)
+def invalidar_cache_configuracao(sender, instance, **kwargs):
+    invalidar_apos_commit(ConfiguracaoManager.namespace)
+    transaction.on_commit(ConfiguracaoManager.limpar_cache_local)
@@ -1,3 +1,137 @@
-from django.test import TestCase
+import os
 
-# Create your tests here.
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.system.base.testes import DesempenhoMixin, get_changelists
+from apps.system.core.cache import invalidar
+
+from .models import Configuracao, ConfiguracaoManager
+
+
+class ConfDesempenhoTestCase(DesempenhoMixin, TestCase):
+    """Orçamento de consultas e tempo de referência do admin das configurações."""
+
+    arquivo_referencias = os.path.join(os.path.dirname(__file__), "desempenho.json")
+
+    # inclui as consultas da sessão e do usuário
+    orcamentos = {
+        "admin:conf_configuracao_changelist": 7,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(
+            email="conf@teste.com", nome="Conf", is_staff=True, is_superuser=True
+        )
+        Configuracao.objects.bulk_create(
+            Configuracao(
+                codigo=f"CONFIGURACAO_{i}",
+                descricao=f"Configuração {i}",
+                valor=str(i),
+                criador=cls.usuario,
+            )
+            for i in range(200)
+        )
+
+    def test_rotas_com_orcamento(self):
+        self.assertRotasComOrcamento("apps.system.conf.urls", get_changelists("conf"))
+
+    @skipIf(settings.SOMENTE_API, "admin desativado no modo somente API")
+    def test_admin_listagens(self):
+        cliente = APIClient()
+        cliente.force_login(self.usuario)
+        for nome in sorted(get_changelists("conf")):
+            with self.subTest(nome):
+                self.medir_rota(nome, reverse(nome), cliente=cliente)
+
+
+@override_settings(CONFIGURACAO_INTERVALO_VERIFICACAO=5)
+class ConfiguracaoManagerTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(email="valores@teste.com", nome="Valores")
+        valores = {
+            "TEXTO": "logix",
+            "INTEIRO": " 42 ",
+            "INTEIRO_INVALIDO": "quarenta",
+            "BOOLEANO": "Sim",
+            "BOOLEANO_FALSO": "off",
+            "BOOLEANO_INVALIDO": "talvez",
+            "DECIMAL": "1,50",
+            "DECIMAL_INVALIDO": "um e meio",
+        }
+        Configuracao.objects.bulk_create(
+            Configuracao(codigo=codigo, descricao=codigo, valor=valor, criador=cls.usuario)
+            for codigo, valor in valores.items()
+        )
+        Configuracao.objects.create(
+            codigo="INATIVA", descricao="Inativa", valor="1", ativo=False, criador=cls.usuario
+        )
+
+    def setUp(self):
+        cache.clear()
+        ConfiguracaoManager.limpar_cache_local()
+        self.addCleanup(ConfiguracaoManager.limpar_cache_local)
+
+    def test_leitores_tipados(self):
+        configuracoes = Configuracao.objects
+
+        self.assertEqual(configuracoes.get_valor("TEXTO"), "logix")
+        self.assertEqual(configuracoes.get_int("INTEIRO"), 42)
+        self.assertIs(configuracoes.get_bool("BOOLEANO"), True)
+        self.assertIs(configuracoes.get_bool("BOOLEANO_FALSO"), False)
+        self.assertEqual(configuracoes.get_decimal("DECIMAL"), Decimal("1.50"))
+
+    def test_default_para_valor_ausente_ou_invalido(self):
+        configuracoes = Configuracao.objects
+
+        self.assertEqual(configuracoes.get_valor("AUSENTE", "padrao"), "padrao")
+        self.assertIsNone(configuracoes.get_valor("INATIVA"))
+        self.assertEqual(configuracoes.get_int("INTEIRO_INVALIDO", 7), 7)
+        self.assertEqual(configuracoes.get_int("AUSENTE", 7), 7)
+        self.assertIsNone(configuracoes.get_bool("BOOLEANO_INVALIDO"))
+        self.assertIs(configuracoes.get_bool("AUSENTE", True), True)
+        self.assertEqual(configuracoes.get_decimal("DECIMAL_INVALIDO", Decimal(0)), Decimal(0))
+
+    def test_leituras_sem_consultas(self):
+        Configuracao.objects.get_valor("TEXTO")
+
+        with self.assertNumQueries(0):
+            Configuracao.objects.get_int("INTEIRO")
+            Configuracao.objects.get_bool("BOOLEANO")
+
+    def test_alteracao_vale_no_mesmo_processo(self):
+        self.assertEqual(Configuracao.objects.get_int("INTEIRO"), 42)
+
+        configuracao = Configuracao.objects.get(codigo="INTEIRO")
+        configuracao.valor = "43"
+        with self.captureOnCommitCallbacks(execute=True):
+            configuracao.save()
+
+        # sem esperar o intervalo de verificação
+        self.assertEqual(Configuracao.objects.get_int("INTEIRO"), 43)
+
+    @mock.patch("apps.system.conf.models.time.monotonic")
+    def test_alteracao_de_outro_processo_depois_do_intervalo(self, monotonic):
+        monotonic.return_value = 1000.0
+        self.assertEqual(Configuracao.objects.get_valor("TEXTO"), "logix")
+
+        # outro processo altera o banco e incrementa a versão no cache
+        # compartilhado; os sinais deste processo não são disparados
+        Configuracao.objects.filter(codigo="TEXTO").update(valor="outro")
+        invalidar(ConfiguracaoManager.namespace)
+
+        monotonic.return_value = 1004.0
+        with self.assertNumQueries(0):
+            self.assertEqual(Configuracao.objects.get_valor("TEXTO"), "logix")
+
+        monotonic.return_value = 1006.0
+        self.assertEqual(Configuracao.objects.get_valor("TEXTO"), "outro")
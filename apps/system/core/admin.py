@@ -1 +1,32 @@
 from django.contrib import admin
+
+from unfold.admin import ModelAdmin
+
+from apps.system.base.admin import MultiTenantAdminMixin
+
+from .models import Tarefa
+
+
+@admin.register(Tarefa)
+class TarefaAdmin(MultiTenantAdminMixin, ModelAdmin):
+    list_display = ("id", "nome", "status", "tentativas", "executar_em", "finalizada_em")
+    list_filter = ("status", "nome")
+    search_fields = ("nome",)
+    ordering = ("-id",)
+    readonly_fields = (
+        "nome",
+        "argumentos",
+        "status",
+        "tentativas",
+        "maximo_tentativas",
+        "executar_em",
+        "iniciada_em",
+        "batimento_em",
+        "finalizada_em",
+        "resultado",
+        "erro",
+    )
+    exclude = ("data_hora_criacao", "data_hora_atualizacao", "ativo")
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,92 @@
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import translation
+
+from apps.system.base.views import OtimizacaoConsultasMixin, SerializacaoRapidaMixin
+
+TEMPLATES_API = ("rest_framework/api.html",)
+
+TEMPLATES_ADMIN = (
+    "admin/login.html",
+    "admin/index.html",
+    "admin/change_list.html",
+    "admin/change_form.html",
+)
+
+
+def aquecer():
+    """
+    Carrega no processo atual o que cada worker montaria na primeira
+    requisição: as rotas, os metadados dos models, os planos de consulta e
+    de serialização das viewsets, os templates e as traduções. Chamada no
+    master do gunicorn com `preload_app`, antes do fork, para que tudo isso
+    fique na memória compartilhada entre os workers.
+    """
+    inicio = time.perf_counter()
+
+    for model in apps.get_models():
+        model._meta.get_fields()
+
+    viewsets = set()
+    for padrao in get_padroes(get_resolver()):
+        classe = getattr(padrao.callback, "cls", None)
+        if classe is not None:
+            viewsets.add(classe)
+
+    for viewset in viewsets:
+        aquecer_viewset(viewset)
+
+    templates = list(TEMPLATES_API)
+    if apps.is_installed("django.contrib.admin"):
+        templates.extend(TEMPLATES_ADMIN)
+
+    for nome in templates:
+        try:
+            get_template(nome)
+        except TemplateDoesNotExist:
+            pass
+
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.gettext("")
+    translation.deactivate()
+
+    # registros preenchidos pelo autodiscover dos apps
+    from .tarefas import get_tarefas
+
+    get_tarefas()
+
+    return {
+        "viewsets": len(viewsets),
+        "templates": len(templates),
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def get_padroes(resolver):
+    """Percorre as rotas, populando os caches de `reverse` de cada resolver."""
+    resolver.reverse_dict
+    for padrao in resolver.url_patterns:
+        if isinstance(padrao, URLResolver):
+            yield from get_padroes(padrao)
+        elif isinstance(padrao, URLPattern):
+            yield padrao
+
+
+def aquecer_viewset(viewset):
+    serializer_class = getattr(viewset, "serializer_class", None)
+    queryset = getattr(viewset, "queryset", None)
+    if serializer_class is None or queryset is None:
+        return
+
+    serializer_class().fields
+
+    view = viewset()
+    if issubclass(viewset, OtimizacaoConsultasMixin):
+        view.otimizar_queryset(queryset.all(), serializer_class)
+    if issubclass(viewset, SerializacaoRapidaMixin):
+        view.get_plano_serializacao(serializer_class, queryset.model)
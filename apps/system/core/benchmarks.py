@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import tempfile
+import tracemalloc
+
+from django.utils.module_loading import autodiscover_modules
+
+_benchmarks = {}
+
+
+def benchmark(nome):
+    """
+    Registra uma função de benchmark, executada pelo comando `benchmark`.
+    A função recebe o comando, para escrever o resultado, e roda dentro de
+    uma transação desfeita ao final, então pode criar os dados que precisar.
+    """
+
+    def decorator(funcao):
+        _benchmarks[nome] = funcao
+        return funcao
+
+    return decorator
+
+
+def get_benchmarks():
+    autodiscover_modules("benchmarks")
+    return dict(_benchmarks)
+
+
+def medir(funcao, repeticoes=5):
+    """Retorna o menor tempo, em segundos, entre as execuções da função."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    return min(tempos)
+
+
+def medir_memoria(funcao):
+    """Retorna o resultado da função e o pico de memória alocada, em bytes."""
+    tracemalloc.start()
+    try:
+        resultado = funcao()
+        return resultado, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@benchmark("config_json")
+def benchmark_config_json(comando, tamanhos=(100, 5000, 20000), instancias=20):
+    """
+    Compara a leitura de arquivos de configuração pelo `JSONDinamicAttrs`,
+    que interpreta o arquivo uma vez por versão, com a leitura antiga, que
+    interpretava o arquivo e criava todos os atributos a cada instância.
+    """
+    from . import classes
+    from .classes import DinamicAttrs, JSONDinamicAttrs
+
+    def antigo(path):
+        with open(path) as arquivo:
+            return DinamicAttrs(json.load(arquivo))
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for tamanho in tamanhos:
+            path = os.path.join(pasta, f"config_{tamanho}.json")
+            with open(path, "w") as arquivo:
+                json.dump(
+                    {
+                        f"chave_{i}": {"valor": i, "ativo": i % 2 == 0, "itens": [{"id": i}]}
+                        for i in range(tamanho)
+                    },
+                    arquivo,
+                )
+
+            def carregar(classe):
+                for _ in range(instancias):
+                    configuracao = classe(path)
+                return configuracao.chave_0.itens[0].id if classe is JSONDinamicAttrs else None
+
+            repeticoes = 3 if tamanho > 1000 else 10
+            eager = medir(lambda: carregar(antigo), repeticoes)
+            lazy = medir(lambda: carregar(JSONDinamicAttrs), repeticoes)
+
+            _, memoria_eager = medir_memoria(lambda: [antigo(path) for _ in range(instancias)])
+            # a memória do novo inclui a primeira leitura do arquivo
+            classes._jsons.pop(os.path.abspath(path), None)
+            _, memoria_lazy = medir_memoria(lambda: [JSONDinamicAttrs(path) for _ in range(instancias)])
+
+            print(
+                f"[x] {tamanho:>6} chaves x {instancias} instâncias: antigo {eager * 1000:8.2f} ms "
+                f"{memoria_eager / 1024:9.0f} KiB | novo {lazy * 1000:8.2f} ms "
+                f"{memoria_lazy / 1024:9.0f} KiB | {eager / lazy:7.1f}x"
+            )
+
+
+@benchmark("sqlite")
+def benchmark_sqlite(comando, leitores=4, escritores=2, segundos=3, linhas=50000):
+    """
+    Leitores agregando gastos por dia e escritores gravando uma linha por
+    transação, ao mesmo tempo, em um arquivo SQLite temporário com a
+    configuração padrão e com o perfil de `apps.system.core.sqlite`.
+    """
+    import sqlite3
+    import threading
+
+    from .sqlite import aplicar_pragmas, get_pragmas
+
+    def conectar(path, pragmas):
+        conexao = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        if pragmas:
+            aplicar_pragmas(conexao.cursor(), pragmas)
+        return conexao
+
+    for perfil, pragmas in (("padrão", None), ("otimizado", get_pragmas())):
+        with tempfile.TemporaryDirectory() as pasta:
+            path = os.path.join(pasta, "benchmark.sqlite3")
+            conexao = conectar(path, pragmas)
+            conexao.execute(
+                "CREATE TABLE saida (id INTEGER PRIMARY KEY, criador_id INTEGER, dia TEXT, "
+                "classe TEXT, valor REAL)"
+            )
+            conexao.execute("CREATE INDEX saida_criador_dia ON saida (criador_id, dia)")
+            conexao.execute("BEGIN")
+            conexao.executemany(
+                "INSERT INTO saida (criador_id, dia, classe, valor) VALUES (?, ?, ?, ?)",
+                (
+                    (i % 10, f"2023-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "GF", i % 100)
+                    for i in range(linhas)
+                ),
+            )
+            conexao.execute("COMMIT")
+            conexao.close()
+
+            fim = time.perf_counter() + segundos
+            contagem = {"leituras": 0, "escritas": 0, "erros": 0}
+            latencias = []
+            lock = threading.Lock()
+
+            def ler(indice):
+                conexao = conectar(path, pragmas)
+                while time.perf_counter() < fim:
+                    inicio = time.perf_counter()
+                    try:
+                        conexao.execute(
+                            "SELECT dia, SUM(valor) FROM saida WHERE criador_id = ? "
+                            "AND dia BETWEEN '2023-01-01' AND '2023-03-31' GROUP BY dia",
+                            (indice % 10,),
+                        ).fetchall()
+                    except sqlite3.OperationalError:
+                        with lock:
+                            contagem["erros"] += 1
+                        continue
+
+                    with lock:
+                        contagem["leituras"] += 1
+                        latencias.append(time.perf_counter() - inicio)
+                conexao.close()
+
+            def escrever(indice):
+                conexao = conectar(path, pragmas)
+                while time.perf_counter() < fim:
+                    try:
+                        conexao.execute("BEGIN IMMEDIATE")
+                        conexao.execute(
+                            "INSERT INTO saida (criador_id, dia, classe, valor) VALUES (?, ?, ?, ?)",
+                            (indice % 10, "2023-02-10", "GV", 10),
+                        )
+                        conexao.execute("COMMIT")
+                    except sqlite3.OperationalError:
+                        if conexao.in_transaction:
+                            conexao.execute("ROLLBACK")
+                        with lock:
+                            contagem["erros"] += 1
+                        continue
+
+                    with lock:
+                        contagem["escritas"] += 1
+                conexao.close()
+
+            threads = [threading.Thread(target=ler, args=(i,)) for i in range(leitores)]
+            threads += [threading.Thread(target=escrever, args=(i,)) for i in range(escritores)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            latencias.sort()
+            p95 = latencias[int(len(latencias) * 0.95)] * 1000 if latencias else 0
+            print(
+                f"[x] {perfil:<10}: {contagem['leituras'] / segundos:8.1f} leituras/s | "
+                f"{contagem['escritas'] / segundos:8.1f} escritas/s | leitura p95 {p95:7.2f} ms | "
+                f"{contagem['erros']} erro(s) de bloqueio"
+            )
+
+
+@benchmark("smtp")
+def benchmark_smtp(comando, quantidade=200):
+    """
+    Vazão do envio de emails para um servidor SMTP local (aiosmtpd), com uma
+    conexão por email e com todos pela conexão compartilhada do
+    `Email.enviar_varios`.
+    """
+    import socket
+
+    from django.test.utils import override_settings
+
+    from .classes import Email
+
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        print(f"[!] aiosmtpd não está instalado, pulando...")
+        return
+
+    class Servidor:
+        async def handle_DATA(self, server, session, envelope):
+            return "250 OK"
+
+    with socket.socket() as livre:
+        livre.bind(("127.0.0.1", 0))
+        porta = livre.getsockname()[1]
+
+    controller = Controller(Servidor(), hostname="127.0.0.1", port=porta)
+    controller.start()
+    try:
+        with override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=porta,
+            EMAIL_USE_TLS=False,
+            EMAIL_USE_SSL=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+        ):
+            emails = [
+                Email("Aviso", "texto", from_email="logix@teste.com").add_destinatario(f"{i}@teste.com")
+                for i in range(quantidade)
+            ]
+
+            def enviar_separadas():
+                for email in emails:
+                    email.enviar_agora()
+
+            separadas = quantidade / medir(enviar_separadas, 3)
+            compartilhada = quantidade / medir(lambda: Email.enviar_varios(emails), 3)
+    finally:
+        controller.stop()
+
+    print(
+        f"[x] {quantidade} emails: {separadas:8.0f} msg/s com uma conexão por email | "
+        f"{compartilhada:8.0f} msg/s com a conexão compartilhada | {compartilhada / separadas:5.1f}x"
+    )
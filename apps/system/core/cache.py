@@ -0,0 +1,96 @@
+import time
+import hashlib
+
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+
+def get_versao(namespace):
+    """
+    Retorna a versão atual de um namespace de cache. A versão inicial é
+    baseada no horário para que, caso a chave seja descartada pelo backend,
+    as entradas antigas não voltem a ser consideradas válidas.
+    """
+    chave = f"versao:{namespace}"
+    versao = cache.get(chave)
+    if versao is None:
+        cache.add(chave, int(time.time() * 1000), timeout=None)
+        versao = cache.get(chave)
+
+    return versao
+
+
+def invalidar(namespace):
+    """Invalida todas as entradas de um namespace incrementando sua versão."""
+    chave = f"versao:{namespace}"
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, int(time.time() * 1000), timeout=None)
+
+
+def invalidar_apos_commit(namespace):
+    """
+    Agenda a invalidação para depois do commit, evitando que uma leitura
+    concorrente guarde no cache dados que ainda não foram confirmados.
+    """
+    transaction.on_commit(lambda: invalidar(namespace))
+
+
+def get_namespace_usuario(namespace, usuario_id):
+    """
+    Namespace separado por tenant, para que a alteração dos dados de um
+    usuário não invalide o cache dos demais.
+    """
+    return f"{namespace}:{usuario_id}"
+
+
+def get_chave_resposta(namespace, request, view):
+    usuario = request.user.pk if request.user.is_authenticated else "anonimo"
+    namespace = get_namespace_usuario(namespace, usuario)
+
+    parametros = sorted(
+        (chave, request.query_params.getlist(chave)) for chave in request.query_params
+    )
+    assinatura = repr(
+        (
+            request.get_host(),
+            view.basename,
+            view.action,
+            sorted(view.kwargs.items()),
+            parametros,
+        )
+    )
+    resumo = hashlib.md5(assinatura.encode()).hexdigest()
+
+    return f"resposta:{namespace}:{get_versao(namespace)}:{resumo}"
+
+
+def cache_resposta(namespace, timeout=60 * 60):
+    """
+    Decorator para actions de viewsets que guarda o `response.data` no cache,
+    separado por usuário e pelos parâmetros da query. As entradas deixam de
+    ser usadas quando o namespace do usuário é invalidado.
+    """
+
+    def decorator(metodo):
+        @wraps(metodo)
+        def wrapper(self, request, *args, **kwargs):
+            chave = get_chave_resposta(namespace, request, self)
+
+            dados = cache.get(chave)
+            if dados is not None:
+                return Response(dados)
+
+            response = metodo(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(chave, response.data, timeout)
+
+            return response
+
+        return wrapper
+
+    return decorator
@@ -1,10 +1,15 @@
+import io
 import os
 import json
+import mmap
+import threading
 
 from io import TextIOWrapper
+from collections import OrderedDict
 
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.serializers.json import DjangoJSONEncoder
 from django.template.loader import get_template
 from django.core.signing import Signer, BadSignature
 
@@ -33,71 +38,442 @@ class DinamicAttrs:
             setattr(self, chave, valor)
 
 
-class JSONDinamicAttrs(DinamicAttrs):
-    """Adaptação da classe `DinamicAttrs` para utilizar um arquivo JSON"""
+class AtributosJSON:
+    """Acesso via `.` a um dicionário carregado de JSON. Os objetos
+    aninhados só viram `AtributosJSON` quando são acessados, e os dados
+    não são copiados: são compartilhados com quem mais carregou o arquivo,
+    por isso devem ser tratados como somente leitura.
+    """
+
+    __slots__ = ("_dados", "_filhos")
+
+    def __init__(self, dados: dict):
+        self._dados = dados
+        self._filhos = None
+
+    @property
+    def raw(self):
+        return self._dados
+
+    def __getattr__(self, nome):
+        try:
+            valor = self._dados[nome]
+        except KeyError:
+            raise AttributeError(nome) from None
+
+        if not isinstance(valor, (dict, list)):
+            return valor
+
+        if self._filhos is None:
+            self._filhos = {}
+        if nome not in self._filhos:
+            self._filhos[nome] = envolver_json(valor)
+
+        return self._filhos[nome]
+
+    def __getitem__(self, chave):
+        return envolver_json(self._dados[chave])
+
+    def __contains__(self, chave):
+        return chave in self._dados
+
+    def __iter__(self):
+        return iter(self._dados)
+
+    def __len__(self):
+        return len(self._dados)
+
+    def __dir__(self):
+        return list(self._dados)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {list(self._dados)}>"
+
+
+class ListaJSON:
+    """Lista carregada de JSON cujos objetos viram `AtributosJSON` no acesso."""
+
+    __slots__ = ("_dados",)
+
+    def __init__(self, dados: list):
+        self._dados = dados
+
+    @property
+    def raw(self):
+        return self._dados
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return ListaJSON(self._dados[indice])
+
+        return envolver_json(self._dados[indice])
+
+    def __iter__(self):
+        return (envolver_json(valor) for valor in self._dados)
+
+    def __len__(self):
+        return len(self._dados)
+
+    def __repr__(self):
+        return f"<ListaJSON {len(self._dados)} itens>"
+
+
+def envolver_json(valor):
+    if isinstance(valor, dict):
+        return AtributosJSON(valor)
+    if isinstance(valor, list):
+        return ListaJSON(valor)
+
+    return valor
+
+
+_jsons = {}
+_jsons_lock = threading.Lock()
+
+
+def carregar_json(path):
+    """
+    Retorna o conteúdo do arquivo JSON, que só é lido e interpretado de novo
+    quando o `st_mtime` ou o tamanho do arquivo mudam. O resultado é o mesmo
+    objeto para todos que carregarem o arquivo.
+    """
+    path = os.path.abspath(path)
+    estado = os.stat(path)
+    versao = (estado.st_mtime_ns, estado.st_size)
+
+    registro = _jsons.get(path)
+    if registro is not None and registro[0] == versao:
+        return registro[1]
+
+    with _jsons_lock:
+        registro = _jsons.get(path)
+        if registro is None or registro[0] != versao:
+            with open(path, "rb") as arquivo:
+                registro = _jsons[path] = (versao, json.load(arquivo))
+
+    return registro[1]
+
+
+class JSONDinamicAttrs(AtributosJSON):
+    """Adaptação da classe `AtributosJSON` para utilizar um arquivo JSON"""
+
+    __slots__ = ()
 
     def __init__(self, path):
-        dados = json.loads(open(path).read())
-        super().__init__(dados)
+        super().__init__(carregar_json(path))
 
 
-class CachedFile:
-    """Singleton para cachear um arquivo. Sempre que for necessário
-    abrir um arquivo, se o seu path já tiver sido utilizado, irá
-    retornar uma instância no cache em vez de abrir o arquivo novamente.
+class LeitorMemoria(io.RawIOBase):
+    """Leitura de um buffer em memória com a posição própria do leitor.
+    Os dados são copiados direto do buffer para o destino do `readinto`,
+    sem cópias intermediárias, mesmo quando o buffer é um `mmap`.
     """
 
-    __files = {}
+    def __init__(self, buffer):
+        self._buffer = memoryview(buffer)
+        self._posicao = 0
 
-    def __new__(cls, *args, **kwargs) -> TextIOWrapper:
-        path, mode = kwargs.get("path"), kwargs.get("mode", "r")
-        if cls.__files.get(path, None) is None:
-            instance = open(path, mode)
-            cls.__files[path] = instance
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, destino):
+        fim = min(self._posicao + len(destino), len(self._buffer))
+        lidos = fim - self._posicao
+        destino[:lidos] = self._buffer[self._posicao : fim]
+        self._posicao = fim
+        return lidos
+
+    def seek(self, posicao, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            posicao += self._posicao
+        elif whence == io.SEEK_END:
+            posicao += len(self._buffer)
+
+        self._posicao = max(posicao, 0)
+        return self._posicao
 
-        return cls.__files[path]
+    def tell(self):
+        return self._posicao
+
+    def close(self):
+        if not self.closed:
+            self._buffer.release()
+
+        super().close()
+
+
+class CacheArquivos:
+    """Cache LRU do conteúdo de arquivos, limitado pela quantidade de
+    arquivos e pelo total de bytes.
+
+    A cada acesso o `st_mtime_ns` e o tamanho do arquivo são comparados com
+    os da leitura em cache, então alterações no disco são percebidas na
+    próxima leitura. Arquivos a partir de `limite_mmap` bytes são mapeados
+    com `mmap` em vez de lidos para a memória. Cada `abrir` retorna um
+    leitor independente, e o cache pode ser usado por várias threads.
+    """
+
+    def __init__(self, maximo_arquivos=128, maximo_bytes=64 * 1024 * 1024, limite_mmap=1024 * 1024):
+        self.maximo_arquivos = maximo_arquivos
+        self.maximo_bytes = maximo_bytes
+        self.limite_mmap = limite_mmap
+
+        self._arquivos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+
+    def ler(self, path):
+        """Retorna um `memoryview` somente leitura com o conteúdo do arquivo."""
+        return memoryview(self._get_conteudo(path)).toreadonly()
+
+    def abrir(self, path, mode="r", encoding="utf-8"):
+        if any(flag in mode for flag in "wax+"):
+            raise ValueError(f"O cache de arquivos é somente leitura: {mode}")
+
+        leitor = io.BufferedReader(LeitorMemoria(self._get_conteudo(path)))
+        if "b" in mode:
+            return leitor
+
+        return io.TextIOWrapper(leitor, encoding=encoding)
+
+    def invalidar(self, path=None):
+        with self._lock:
+            if path is None:
+                self._arquivos.clear()
+                self._bytes = 0
+            else:
+                self._remover(os.path.abspath(path))
+
+    def get_estatisticas(self):
+        with self._lock:
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "descartes": self.descartes,
+                "arquivos": len(self._arquivos),
+                "bytes": self._bytes,
+            }
+
+    def _get_conteudo(self, path):
+        path = os.path.abspath(path)
+        estado = os.stat(path)
+        versao = (estado.st_mtime_ns, estado.st_size)
+
+        with self._lock:
+            registro = self._arquivos.get(path)
+            if registro is not None and registro[0] == versao:
+                self._arquivos.move_to_end(path)
+                self.acertos += 1
+                return registro[1]
+
+            self.falhas += 1
+
+        # a leitura acontece fora do lock para não bloquear os outros arquivos
+        conteudo = self._carregar(path, estado.st_size)
+
+        with self._lock:
+            self._remover(path)
+            if len(conteudo) <= self.maximo_bytes:
+                self._arquivos[path] = (versao, conteudo)
+                self._bytes += len(conteudo)
+                self._limitar()
+
+        return conteudo
+
+    def _carregar(self, path, tamanho):
+        with open(path, "rb") as arquivo:
+            if tamanho >= self.limite_mmap:
+                return mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+            return arquivo.read()
+
+    def _remover(self, path):
+        # o mmap não é fechado aqui: leitores abertos ainda podem usá-lo, e
+        # ele é liberado quando a última referência deixar de existir
+        registro = self._arquivos.pop(path, None)
+        if registro is not None:
+            self._bytes -= len(registro[1])
+
+    def _limitar(self):
+        while len(self._arquivos) > self.maximo_arquivos or self._bytes > self.maximo_bytes:
+            _, (_, conteudo) = self._arquivos.popitem(last=False)
+            self._bytes -= len(conteudo)
+            self.descartes += 1
+
+
+cache_arquivos = CacheArquivos(
+    maximo_arquivos=getattr(settings, "CACHE_ARQUIVOS_MAXIMO", 128),
+    maximo_bytes=getattr(settings, "CACHE_ARQUIVOS_MAXIMO_BYTES", 64 * 1024 * 1024),
+)
+
+
+class CachedFile:
+    """Abre um arquivo a partir do `cache_arquivos`. Cada chamada retorna um
+    leitor independente, com a própria posição de leitura, e alterações no
+    arquivo são percebidas pelo `st_mtime` e pelo tamanho.
+    """
+
+    def __new__(cls, *args, **kwargs) -> TextIOWrapper:
+        path = kwargs.get("path", args[0] if args else None)
+        return cache_arquivos.abrir(path, kwargs.get("mode", "r"))
 
 
 class Email:
-    """Classe construção e envio de email."""
+    """Classe construção e envio de email.
+
+    O template é renderizado uma única vez para cada contexto distinto e os
+    destinatários com o mesmo contexto são divididos em mensagens de até
+    `destinatarios_por_mensagem`, em cópia oculta para que um não veja o
+    endereço dos outros. Todas as mensagens, inclusive as de vários
+    emails em `Email.enviar_varios`, saem pela mesma conexão SMTP.
+    """
+
+    destinatarios_por_mensagem = 50
 
     def __init__(self, titulo, mensagem="", from_email=settings.EMAIL_HOST_USER):
         self._titulo = titulo
         self._mensagem = mensagem
-        self._destinatarios = []
+        self._destinatarios = {}
 
         self._template = None
+        self._contexto = {}
+        self._html = None
         self._from_email = from_email
 
     def add_template(self, path, **context):
-        if self._template is not None:
+        if self._template is not None or self._html is not None:
+            raise Exception("Um template já foi adicionado")
+
+        self._template = path
+        self._contexto = context
+        return self
+
+    def add_html(self, html):
+        if self._template is not None or self._html is not None:
             raise Exception("Um template já foi adicionado")
 
-        self._template = get_template(path)
-        self._template.render(context)
+        self._html = html
         return self
 
-    def add_destinatario(self, destinatario):
+    def add_destinatario(self, destinatario, **context):
+        """
+        Adiciona um destinatário. O contexto informado é somado ao do
+        template somente para as mensagens desse destinatário.
+        """
         if destinatario in self._destinatarios:
             raise Exception("Destinatário já foi adicionado")
 
-        if len(self._destinatarios) == 500:
-            raise Exception("Número máximo de destinatários atingido")
+        self._destinatarios[destinatario] = context
+        return self
+
+    def add_destinatarios(self, destinatarios):
+        for destinatario in destinatarios:
+            self.add_destinatario(destinatario)
 
-        self._destinatarios.append(destinatario)
         return self
 
-    def enviar(self):
+    def enviar(self, criador=None):
+        """
+        Enfileira o envio para o worker e retorna a `Tarefa` criada, sem
+        esperar pela conexão com o servidor SMTP. Os contextos são gravados
+        na tarefa como JSON: datas, decimais e UUIDs chegam ao template como
+        texto, e objetos como instâncias de models não são aceitos.
+        """
+        from .tarefas import enfileirar
+
         if len(self._destinatarios) == 0:
             raise Exception("Informe ao menos um destinatário")
 
-        email = EmailMultiAlternatives(
-            self._titulo, self._mensagem, self._from_email, self._destinatarios
+        return enfileirar(
+            "core.enviar_email",
+            criador=criador,
+            titulo=self._titulo,
+            mensagem=self._mensagem,
+            destinatarios=[
+                (destinatario, self.serializar_contexto(contexto, destinatario))
+                for destinatario, contexto in self._destinatarios.items()
+            ],
+            from_email=self._from_email,
+            template=self._template,
+            contexto=self.serializar_contexto(self._contexto),
+            html=self._html,
         )
-        if self._template is not None:
-            email.attach_alternative(self._template, "text/html")
 
-        email.send(fail_silently=False)
+    @staticmethod
+    def serializar_contexto(contexto, destinatario=None):
+        try:
+            return json.loads(json.dumps(contexto, cls=DjangoJSONEncoder))
+        except TypeError as erro:
+            origem = f"do destinatário {destinatario}" if destinatario else "do template"
+            raise ValueError(
+                f"O contexto {origem} precisa ser serializável em JSON para o envio "
+                f"em segundo plano ({erro}). Informe os valores em vez dos objetos "
+                "ou use `enviar_agora`."
+            ) from None
+
+    def enviar_agora(self, connection=None):
+        return self.enviar_varios([self], connection=connection)
+
+    @staticmethod
+    def enviar_varios(emails, connection=None):
+        """
+        Envia vários emails por uma única conexão, compartilhando entre eles
+        os templates já renderizados. Retorna a quantidade de mensagens
+        enviadas.
+        """
+        renderizados = {}
+        mensagens = []
+        for email in emails:
+            mensagens.extend(email.get_mensagens(renderizados))
+
+        if connection is None:
+            connection = get_connection(fail_silently=False)
+
+        return connection.send_messages(mensagens) or 0
+
+    def get_mensagens(self, renderizados=None):
+        if len(self._destinatarios) == 0:
+            raise Exception("Informe ao menos um destinatário")
+
+        if renderizados is None:
+            renderizados = {}
+
+        grupos = {}
+        for destinatario, contexto in self._destinatarios.items():
+            contexto = {**self._contexto, **contexto}
+            chave = json.dumps(contexto, sort_keys=True, default=str)
+            grupos.setdefault(chave, (contexto, []))[1].append(destinatario)
+
+        mensagens = []
+        for chave, (contexto, destinatarios) in grupos.items():
+            html = self._html
+            if self._template is not None:
+                renderizado = (self._template, chave)
+                if renderizado not in renderizados:
+                    renderizados[renderizado] = get_template(self._template).render(contexto)
+                html = renderizados[renderizado]
+
+            for inicio in range(0, len(destinatarios), self.destinatarios_por_mensagem):
+                email = EmailMultiAlternatives(
+                    self._titulo,
+                    self._mensagem,
+                    self._from_email,
+                    [self._from_email] if self._from_email else [],
+                    bcc=destinatarios[inicio : inicio + self.destinatarios_por_mensagem],
+                )
+                if html is not None:
+                    email.attach_alternative(html, "text/html")
+
+                mensagens.append(email)
+
+        return mensagens
 
 
 class Encryptor(metaclass=SingletonMeta):
@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.utils.module_loading import autodiscover_modules
+
+from apps.system.base.admin import MultiTenantAdminMixin
+
+_consultas = {}
+
+
+def consulta_critica(nome):
+    """
+    Registra uma função que monta o queryset de uma consulta crítica do
+    sistema, analisada pelo comando `indexadvisor`.
+    """
+
+    def decorator(funcao):
+        _consultas[nome] = funcao
+        return funcao
+
+    return decorator
+
+
+def get_usuario_exemplo():
+    """
+    Usuário usado para montar as consultas por tenant: o primeiro cadastrado
+    ou, com o banco vazio, um usuário qualquer que não precisa existir.
+    """
+    Usuario = get_user_model()
+    pk = Usuario._default_manager.order_by("pk").values_list("pk", flat=True).first()
+    return Usuario(pk=pk or 1)
+
+
+def get_consultas():
+    autodiscover_modules("consultas")
+    consultas = dict(_consultas)
+    consultas.update(get_consultas_admin())
+    return consultas
+
+
+def get_consultas_admin():
+    """
+    Monta as consultas da listagem do admin para cada filtro simples dos
+    models dos apps do sistema, com a mesma ordenação e o mesmo tamanho de
+    página da listagem. Admins multi-tenant são consultados como um usuário
+    que não é superusuário, ou seja, filtrando pelo tenant.
+    """
+    consultas = {}
+    for model, model_admin in admin.site._registry.items():
+        if model._meta.app_config.name not in settings.LOGIX_APPS:
+            continue
+
+        ordenacao = model_admin.get_ordering(None) or model._meta.ordering
+        multi_tenant = isinstance(model_admin, MultiTenantAdminMixin)
+        for filtro in model_admin.list_filter:
+            if not isinstance(filtro, str) or "__" in filtro:
+                continue
+
+            nome = f"admin.{model._meta.model_name}.{filtro}"
+            consultas[nome] = _get_consulta_filtro(
+                model, filtro, ordenacao, model_admin.list_per_page, multi_tenant
+            )
+
+    return consultas
+
+
+def _get_consulta_filtro(model, filtro, ordenacao, tamanho_pagina, multi_tenant):
+    def consulta():
+        campo = model._meta.get_field(filtro)
+        valor = model._default_manager.values_list(campo.attname, flat=True).first()
+        if valor is None:
+            valor = _get_valor_exemplo(campo)
+
+        queryset = model._default_manager.filter(**{campo.attname: valor})
+        if multi_tenant:
+            queryset = queryset.from_user(get_usuario_exemplo())
+
+        return queryset.order_by(*ordenacao)[:tamanho_pagina]
+
+    return consulta
+
+
+def _get_valor_exemplo(campo):
+    tipo = campo.get_internal_type()
+    if tipo == "BooleanField":
+        return True
+    if campo.choices:
+        return campo.choices[0][0]
+    if campo.is_relation or "Integer" in tipo or "AutoField" in tipo:
+        return 1
+    return ""
@@ -0,0 +1,177 @@
+import time
+import hashlib
+import threading
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+# limites superiores, em ms, das faixas dos histogramas de latência
+LIMITES_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+medicao_atual = ContextVar("medicao_atual", default=None)
+
+
+class Medicao:
+    """Tempos e consultas de uma requisição amostrada."""
+
+    __slots__ = ("inicio", "consultas", "tempo_banco", "tempos")
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tempo_banco = 0.0
+        self.tempos = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        """Usada com `connection.execute_wrapper` para medir as consultas."""
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.tempo_banco += time.perf_counter() - inicio
+
+
+def medir_consulta(execute, sql, params, many, context):
+    """
+    Instalado em todas as conexões pelo sinal `connection_created`. Mede a
+    consulta quando a requisição atual foi amostrada, inclusive quando o ORM
+    roda na thread do `sync_to_async`, que herda o contexto da requisição.
+    """
+    medicao = medicao_atual.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+
+    return medicao(execute, sql, params, many, context)
+
+
+@contextmanager
+def medir(nome):
+    """
+    Soma o tempo do bloco na etapa `nome` da requisição atual, quando ela
+    foi amostrada. Sem medição ativa o custo é só o da leitura do contexto.
+    """
+    medicao = medicao_atual.get()
+    if medicao is None:
+        yield
+        return
+
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicao.tempos[nome] = medicao.tempos.get(nome, 0.0) + time.perf_counter() - inicio
+
+
+class Histogramas:
+    """
+    Histogramas de latência por endpoint. Cada processo acumula as amostras
+    em memória e a cada `INSTRUMENTACAO_INTERVALO` segundos soma o que
+    acumulou nos contadores do cache compartilhado, que juntam os workers.
+    """
+
+    def __init__(self):
+        self._pendentes = {}
+        self._lock = threading.Lock()
+        self._ultimo_envio = time.monotonic()
+
+    def registrar(self, endpoint, duracao, medicao):
+        faixa = self.get_faixa(duracao * 1000)
+        with self._lock:
+            pendente = self._pendentes.get(endpoint)
+            if pendente is None:
+                pendente = self._pendentes[endpoint] = [0] * (len(LIMITES_MS) + 4)
+
+            pendente[faixa] += 1
+            # soma dos tempos em microssegundos, o `incr` do cache só aceita inteiros
+            pendente[-3] += int(duracao * 1_000_000)
+            pendente[-2] += medicao.consultas
+            pendente[-1] += int(medicao.tempo_banco * 1_000_000)
+
+            if time.monotonic() - self._ultimo_envio < getattr(settings, "INSTRUMENTACAO_INTERVALO", 10):
+                return
+
+            pendentes, self._pendentes = self._pendentes, {}
+            self._ultimo_envio = time.monotonic()
+
+        self.enviar(pendentes)
+
+    def get_faixa(self, milissegundos):
+        for indice, limite in enumerate(LIMITES_MS):
+            if milissegundos <= limite:
+                return indice
+
+        return len(LIMITES_MS)
+
+    def enviar(self, pendentes):
+        endpoints = cache.get("instrumentacao:endpoints", {})
+        novos = {get_chave_endpoint(endpoint): endpoint for endpoint in pendentes}
+        if not novos.keys() <= endpoints.keys():
+            cache.set("instrumentacao:endpoints", {**endpoints, **novos}, timeout=None)
+
+        for endpoint, valores in pendentes.items():
+            chave = get_chave_endpoint(endpoint)
+            for indice, valor in enumerate(valores):
+                if not valor:
+                    continue
+
+                contador = f"instrumentacao:{chave}:{indice}"
+                if not cache.add(contador, valor, timeout=None):
+                    cache.incr(contador, valor)
+
+    def descarregar(self):
+        """Envia ao cache as amostras pendentes do processo."""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+            self._ultimo_envio = time.monotonic()
+
+        self.enviar(pendentes)
+
+    def get_resumo(self):
+        """Histograma, percentis estimados pelas faixas e médias de cada endpoint."""
+        resumo = {}
+        for chave, endpoint in cache.get("instrumentacao:endpoints", {}).items():
+            quantidade = len(LIMITES_MS) + 4
+            contadores = cache.get_many([f"instrumentacao:{chave}:{i}" for i in range(quantidade)])
+            valores = [contadores.get(f"instrumentacao:{chave}:{i}", 0) for i in range(quantidade)]
+
+            faixas = valores[:-3]
+            total = sum(faixas)
+            if not total:
+                continue
+
+            resumo[endpoint] = {
+                "requisicoes": total,
+                "media_ms": valores[-3] / total / 1000,
+                "consultas_media": valores[-2] / total,
+                "banco_media_ms": valores[-1] / total / 1000,
+                "p50_ms": self.get_percentil(faixas, total, 0.5),
+                "p95_ms": self.get_percentil(faixas, total, 0.95),
+                "p99_ms": self.get_percentil(faixas, total, 0.99),
+                "histograma": {
+                    (f"<={limite}" if indice < len(LIMITES_MS) else f">{LIMITES_MS[-1]}"): contagem
+                    for indice, (limite, contagem) in enumerate(zip(LIMITES_MS + (None,), faixas))
+                },
+            }
+
+        return resumo
+
+    def get_percentil(self, faixas, total, percentil):
+        """Limite superior da faixa onde está o percentil, ou `None` acima da última."""
+        acumulado = 0
+        for limite, contagem in zip(LIMITES_MS, faixas):
+            acumulado += contagem
+            if acumulado >= total * percentil:
+                return limite
+
+        return None
+
+
+def get_chave_endpoint(endpoint):
+    return hashlib.md5(endpoint.encode()).hexdigest()[:16]
+
+
+histogramas = Histogramas()
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.system.core.benchmarks import get_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Executa os benchmarks registrados nos módulos benchmarks.py dos apps'
+
+    def add_arguments(self, parser):
+        parser.add_argument('nomes', nargs='*', help='Benchmarks a executar (padrão: todos)')
+        parser.add_argument('--listar', action='store_true', help='Lista os benchmarks disponíveis')
+
+    def handle(self, *args, **options):
+        benchmarks = get_benchmarks()
+
+        if options['listar']:
+            for nome in sorted(benchmarks):
+                print(f'[ ] {nome}')
+            return
+
+        nomes = options['nomes'] or sorted(benchmarks)
+        for nome in nomes:
+            if nome not in benchmarks:
+                raise CommandError(f'Benchmark "{nome}" não encontrado')
+
+        for nome in nomes:
+            print(f'[x] Running benchmark "{nome}"...')
+
+            # os dados criados pelos benchmarks nunca são gravados
+            with transaction.atomic():
+                benchmarks[nome](self)
+                transaction.set_rollback(True)
+
+        print(f'[x] Process finished...')
@@ -0,0 +1,89 @@
+import re
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from apps.system.core.consultas import get_consultas
+
+
+class Command(BaseCommand):
+    help = 'Executa EXPLAIN nas consultas críticas registradas e aponta as varreduras completas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('nomes', nargs='*', help='Prefixos das consultas a analisar (padrão: todas)')
+        parser.add_argument('--plano', action='store_true', help='Exibe o plano completo de cada consulta')
+        parser.add_argument('--falhar', action='store_true', help='Termina com erro se houver varreduras completas')
+
+    def handle(self, *args, **options):
+        consultas = get_consultas()
+        nomes = sorted(
+            nome for nome in consultas
+            if not options['nomes'] or any(nome.startswith(prefixo) for prefixo in options['nomes'])
+        )
+
+        self.indices_parciais = {
+            indice.name
+            for model in apps.get_models()
+            for indice in model._meta.indexes
+            if indice.condition is not None
+        }
+
+        varreduras = 0
+        for nome in nomes:
+            queryset = consultas[nome]()
+            vendor = connections[queryset.db].vendor
+            plano = queryset.explain()
+
+            # consultas sem filtro e com LIMIT podem ler só o início do índice
+            paginada = queryset.query.high_mark is not None and not queryset.query.where
+            problemas = self.analisar_plano(vendor, plano, paginada)
+            if problemas:
+                varreduras += 1
+                print(f'[!] {nome}: {"; ".join(problemas)}')
+            else:
+                print(f'[x] {nome}')
+
+            if options['plano'] or problemas:
+                for linha in plano.splitlines():
+                    print(f'      {linha}')
+
+        print(f'[x] {len(nomes)} queries analyzed, {varreduras} with full scans...')
+        if options['falhar'] and varreduras:
+            raise CommandError('Foram encontradas consultas com varreduras completas')
+
+    def analisar_plano(self, vendor, plano, paginada):
+        """
+        Retorna as varreduras completas do plano. Uma varredura na ordem da
+        tabela ou de um índice, sem filtro, sem ordenação temporária e com
+        LIMIT lê apenas as linhas da página, então não é considerada um
+        problema. O mesmo vale para a varredura de um índice parcial, que só
+        contém as linhas da condição.
+        """
+        problemas = []
+
+        if vendor == 'sqlite':
+            ordenacao_temporaria = 'USE TEMP B-TREE' in plano
+            for linha in plano.splitlines():
+                encontrado = re.search(r'\bSCAN (\w+)(.*)', linha)
+                if not encontrado:
+                    continue
+
+                tabela, resto = encontrado.groups()
+                if paginada and not ordenacao_temporaria:
+                    continue
+
+                indice = re.search(r'USING (?:COVERING )?INDEX (\w+)', resto)
+                if indice and indice.group(1) in self.indices_parciais and not ordenacao_temporaria:
+                    continue
+
+                problemas.append(f'full scan on {tabela}')
+
+        elif vendor == 'postgresql':
+            if paginada and 'Sort' not in plano:
+                return problemas
+
+            for tabela in re.findall(r'Seq Scan on (\w+)', plano):
+                problemas.append(f'full scan on {tabela}')
+
+        return problemas
@@ -0,0 +1,220 @@
+import os
+import sys
+import json
+import time
+import socket
+import subprocess
+import http.client
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# processo novo que carrega o Django e as rotas, como um worker sem preload
+SCRIPT_CARGA = """
+import json, resource, time
+inicio = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+segundos = time.perf_counter() - inicio
+try:
+    # o ru_maxrss do Linux conserva o pico do processo pai depois do exec
+    with open("/proc/self/status") as status:
+        rss = next(int(linha.split()[1]) for linha in status if linha.startswith("VmRSS:"))
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"segundos": segundos, "rss": rss}))
+"""
+
+MODOS = {
+    'completo': 'False',
+    'api': 'True',
+}
+
+# (modo, preload) dos servidores medidos
+SERVIDORES = (
+    ('completo', False),
+    ('completo', True),
+    ('api', True),
+)
+
+
+class Command(BaseCommand):
+    help = 'Mede o tempo de inicialização, as importações mais lentas e a memória de cada worker do gunicorn'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=3, help='Inicializações medidas em cada modo')
+        parser.add_argument('--importacoes', type=int, default=15, help='Quantidade de pacotes mais lentos exibidos')
+        parser.add_argument('--workers', type=int, default=4, help='Workers do gunicorn nas medições de memória')
+        parser.add_argument('--sem-gunicorn', action='store_true', help='Não mede a memória dos workers')
+
+    def handle(self, *args, **options):
+        for modo in MODOS:
+            self.medir_carga(modo, options['repeticoes'], options['importacoes'])
+
+        if options['sem_gunicorn']:
+            print(f'[x] Process finished...')
+            return
+
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            print(f'[!] /proc/<pid>/smaps_rollup unavailable, skipping worker memory...')
+            print(f'[x] Process finished...')
+            return
+
+        for modo, preload in SERVIDORES:
+            self.medir_servidor(modo, preload, options['workers'])
+
+        print(f'[x] Process finished...')
+
+    def get_ambiente(self, modo, **extras):
+        ambiente = dict(os.environ, LOGIX_SOMENTE_API=MODOS[modo], **extras)
+        ambiente.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+        return ambiente
+
+    def medir_carga(self, modo, repeticoes, importacoes):
+        tempos, memorias = [], []
+        for _ in range(repeticoes):
+            resultado = json.loads(self.carregar(modo).stdout.strip().splitlines()[-1])
+            tempos.append(resultado['segundos'])
+            memorias.append(resultado['rss'])
+
+        print(
+            f'[x] Cold start "{modo}": {min(tempos) * 1000:.0f} ms (melhor de {repeticoes}), '
+            f'RSS {max(memorias) / 1024:.1f} MiB'
+        )
+
+        # o -X importtime atrasa a carga, por isso roda separado das medições
+        perfil = self.carregar(modo, '-X', 'importtime')
+        for pacote, cumulativo in self.get_importacoes(perfil.stderr)[:importacoes]:
+            print(f'      {cumulativo / 1000:8.1f} ms  {pacote}')
+
+    def carregar(self, modo, *opcoes):
+        return subprocess.run(
+            [sys.executable, *opcoes, '-c', SCRIPT_CARGA],
+            cwd=settings.BASE_DIR,
+            env=self.get_ambiente(modo),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+    def get_importacoes(self, saida):
+        """
+        Soma o tempo cumulativo dos pacotes de primeiro nível na saída do
+        `-X importtime`, do mais lento para o mais rápido.
+        """
+        pacotes = {}
+        for linha in saida.splitlines():
+            if not linha.startswith('import time:') or 'cumulative' in linha:
+                continue
+
+            _, cumulativo, nome = linha[len('import time:'):].split('|')
+            if nome.startswith('  '):
+                continue
+
+            pacote = nome.strip().split('.')[0]
+            pacotes[pacote] = pacotes.get(pacote, 0) + int(cumulativo)
+
+        return sorted(pacotes.items(), key=lambda item: item[1], reverse=True)
+
+    def medir_servidor(self, modo, preload, workers):
+        with socket.socket() as livre:
+            livre.bind(('127.0.0.1', 0))
+            porta = livre.getsockname()[1]
+
+        ambiente = self.get_ambiente(
+            modo,
+            GUNICORN_BIND=f'127.0.0.1:{porta}',
+            GUNICORN_WORKERS=str(workers),
+            GUNICORN_PRELOAD=str(preload),
+        )
+        inicio = time.perf_counter()
+        processo = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--log-level', 'warning'],
+            cwd=settings.BASE_DIR,
+            env=ambiente,
+        )
+        try:
+            if not self.aguardar_resposta(porta, processo):
+                print(f'[!] Server "{modo}" did not answer, skipping...')
+                return
+
+            pronto = time.perf_counter() - inicio
+
+            # cada worker atende algumas requisições antes da medição
+            for _ in range(workers * 10):
+                self.requisitar(porta)
+
+            memorias = [self.get_memoria(pid) for pid in self.get_filhos(processo.pid)]
+        finally:
+            processo.terminate()
+            processo.wait()
+
+        if not memorias:
+            print(f'[!] No workers found for "{modo}"...')
+            return
+
+        rss = sum(memoria['Rss'] for memoria in memorias) / len(memorias)
+        pss = sum(memoria['Pss'] for memoria in memorias) / len(memorias)
+        privada = sum(
+            memoria['Private_Clean'] + memoria['Private_Dirty'] for memoria in memorias
+        ) / len(memorias)
+
+        print(
+            f'[x] gunicorn "{modo}" {"com" if preload else "sem"} preload: primeira resposta em '
+            f'{pronto * 1000:.0f} ms | por worker: RSS {rss / 1024:.1f} MiB, '
+            f'PSS {pss / 1024:.1f} MiB, privada {privada / 1024:.1f} MiB'
+        )
+
+    def aguardar_resposta(self, porta, processo):
+        for _ in range(300):
+            if processo.poll() is not None:
+                return False
+
+            if self.requisitar(porta):
+                return True
+
+            time.sleep(0.05)
+
+        return False
+
+    def requisitar(self, porta):
+        conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=10)
+        try:
+            conexao.request('GET', '/api/v1/despesas/', headers={'Host': 'localhost'})
+            conexao.getresponse().read()
+            return True
+        except OSError:
+            return False
+        finally:
+            conexao.close()
+
+    def get_filhos(self, pid):
+        filhos = []
+        for nome in os.listdir('/proc'):
+            if not nome.isdigit():
+                continue
+
+            try:
+                with open(f'/proc/{nome}/stat') as arquivo:
+                    # o nome do processo pode ter espaços, os campos vêm depois do ")"
+                    campos = arquivo.read().rsplit(')', 1)[1].split()
+            except OSError:
+                continue
+
+            if int(campos[1]) == pid:
+                filhos.append(int(nome))
+
+        return filhos
+
+    def get_memoria(self, pid):
+        """Valores em KiB do `/proc/<pid>/smaps_rollup`."""
+        memoria = {}
+        with open(f'/proc/{pid}/smaps_rollup') as arquivo:
+            for linha in arquivo:
+                partes = linha.split()
+                if len(partes) == 3 and partes[2] == 'kB':
+                    memoria[partes[0].rstrip(':')] = int(partes[1])
+
+        return memoria
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.system.core.sqlite import get_estado
+
+
+class Command(BaseCommand):
+    help = 'Atualiza as estatísticas do planejador do SQLite (PRAGMA optimize ou ANALYZE); agende-o periodicamente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Alias do banco de dados')
+        parser.add_argument('--analyze', action='store_true', help='Executa o ANALYZE completo em vez do PRAGMA optimize')
+        parser.add_argument('--checkpoint', action='store_true', help='Transfere o WAL para o banco e trunca o arquivo')
+
+    def handle(self, *args, **options):
+        conexao = connections[options['database']]
+        if conexao.vendor != 'sqlite':
+            print(f'[!] Database "{options["database"]}" is {conexao.vendor}, nothing to do...')
+            return
+
+        with conexao.cursor() as cursor:
+            if options['analyze']:
+                print(f'[x] Running ANALYZE...')
+                cursor.execute('ANALYZE')
+            else:
+                # analisa somente as tabelas cujas estatísticas estão desatualizadas
+                print(f'[x] Running PRAGMA optimize...')
+                cursor.execute('PRAGMA optimize')
+
+            if options['checkpoint']:
+                cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                bloqueado, paginas, transferidas = cursor.fetchone()
+                print(f'[x] WAL checkpoint: {transferidas}/{paginas} pages, busy={bloqueado}...')
+
+            for nome, valor in get_estado(cursor).items():
+                print(f'[ ] {nome} = {valor}')
+
+        print(f'[x] Process finished...')
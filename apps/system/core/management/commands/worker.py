@@ -0,0 +1,74 @@
+import time
+import signal
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from apps.system.core.tarefas import (
+    executar,
+    get_proximas,
+    recuperar_travadas,
+    registrar_batimento,
+    reivindicar,
+)
+
+
+class Command(BaseCommand):
+    help = 'Executa as tarefas de segundo plano enfileiradas no banco de dados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Quantidade de tarefas executadas ao mesmo tempo')
+        parser.add_argument('--intervalo', type=float, default=1, help='Segundos de espera quando a fila está vazia')
+        parser.add_argument('--uma-vez', action='store_true', help='Executa as tarefas pendentes e termina')
+
+    def handle(self, *args, **options):
+        self.encerrar = False
+        signal.signal(signal.SIGTERM, self.parar)
+        signal.signal(signal.SIGINT, self.parar)
+
+        threads = options['threads']
+        print(f'[x] Worker started with {threads} threads...')
+
+        # {futuro: id da tarefa}
+        em_execucao = {}
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            while not self.encerrar:
+                close_old_connections()
+                em_execucao = {futuro: pk for futuro, pk in em_execucao.items() if not futuro.done()}
+                registrar_batimento(list(em_execucao.values()))
+
+                devolvidas, falharam = recuperar_travadas()
+                if devolvidas:
+                    print(f'[!] {devolvidas} stuck tasks returned to the queue...')
+                if falharam:
+                    print(f'[!] {falharam} stuck tasks failed after the last attempt...')
+
+                livres = threads - len(em_execucao)
+                iniciadas = 0
+                if livres > 0:
+                    for tarefa in get_proximas(livres):
+                        if reivindicar(tarefa):
+                            em_execucao[executor.submit(self.executar, tarefa)] = tarefa.pk
+                            iniciadas += 1
+
+                if options['uma_vez'] and not iniciadas and not em_execucao:
+                    break
+
+                if not iniciadas:
+                    time.sleep(options['intervalo'])
+
+        print(f'[x] Process finished...')
+
+    def executar(self, tarefa):
+        try:
+            executar(tarefa)
+            print(f'[x] {tarefa}: {tarefa.get_status_display()} (attempt {tarefa.tentativas})')
+        finally:
+            # cada thread possui as próprias conexões com o banco
+            connections.close_all()
+
+    def parar(self, *args):
+        print(f'[x] Waiting for running tasks before stopping...')
+        self.encerrar = True
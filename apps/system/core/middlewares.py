@@ -1,7 +1,139 @@
-class DevMiddleware:
+import time
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from .instrumentacao import Medicao, histogramas, medicao_atual
+from .routers import banco_leitura, fixar_no_primario
+
+
+class InstrumentacaoMiddleware:
+    """
+    Mede uma amostra das requisições (`INSTRUMENTACAO_AMOSTRAGEM`, de 0 a 1):
+    tempo total, consultas e tempo no banco e as etapas marcadas com
+    `medir`, como a serialização. As medições vão para o cabeçalho
+    `Server-Timing` e para os histogramas por endpoint; as requisições fora
+    da amostra só pagam o sorteio. Atende tanto o WSGI quanto o ASGI, sem
+    levar as views assíncronas para uma thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        response = self.get_response(request)
+        if self.async_mode:
+            return self.__acall__(request)
+
+        if not self.amostrar():
+            return self.get_response(request)
+
+        medicao = Medicao()
+        # as consultas são medidas pelo `medir_consulta` de cada conexão
+        token = medicao_atual.set(medicao)
+        try:
+            response = self.get_response(request)
+        finally:
+            medicao_atual.reset(token)
+
+        return self.finalizar(request, response, medicao)
+
+    async def __acall__(self, request):
+        if not self.amostrar():
+            return await self.get_response(request)
+
+        medicao = Medicao()
+        token = medicao_atual.set(medicao)
+        try:
+            response = await self.get_response(request)
+        finally:
+            medicao_atual.reset(token)
+
+        # o envio periódico dos histogramas usa o cache, que é síncrono
+        return await sync_to_async(self.finalizar)(request, response, medicao)
+
+    def amostrar(self):
+        amostragem = getattr(settings, "INSTRUMENTACAO_AMOSTRAGEM", 0)
+        return amostragem > 0 and random.random() < amostragem
+
+    def finalizar(self, request, response, medicao):
+        duracao = time.perf_counter() - medicao.inicio
+        histogramas.registrar(self.get_endpoint(request), duracao, medicao)
+
+        if getattr(settings, "INSTRUMENTACAO_SERVER_TIMING", True):
+            response["Server-Timing"] = self.get_server_timing(duracao, medicao)
+
         return response
+
+    def get_endpoint(self, request):
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return f"{request.method} nao_encontrado"
+
+        return f"{request.method} {match.view_name}"
+
+    def get_server_timing(self, duracao, medicao):
+        metricas = [
+            f"total;dur={duracao * 1000:.1f}",
+            f'db;dur={medicao.tempo_banco * 1000:.1f};desc="{medicao.consultas} consultas"',
+        ]
+        for nome, tempo in medicao.tempos.items():
+            metricas.append(f"{nome};dur={tempo * 1000:.1f}")
+
+        return ", ".join(metricas)
+
+
+class ReplicaMiddleware:
+    """
+    Fixa no banco primário as leituras do usuário que acabou de gravar algo,
+    pelo admin ou pela API, para que ele não leia da réplica atrasada. Cada
+    requisição começa lendo do primário; somente as views que aceitam a
+    réplica trocam o banco de leitura.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        token = banco_leitura.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            banco_leitura.reset(token)
+
+        if self.deve_fixar(request, response):
+            fixar_no_primario(getattr(request, "user", None))
+
+        return response
+
+    async def __acall__(self, request):
+        token = banco_leitura.set(None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            banco_leitura.reset(token)
+
+        if self.deve_fixar(request, response):
+            # o usuário da sessão é carregado do banco, fora do event loop
+            await sync_to_async(fixar_no_primario)(getattr(request, "user", None))
+
+        return response
+
+    def deve_fixar(self, request, response):
+        return request.method not in SAFE_METHODS and response.status_code < 400
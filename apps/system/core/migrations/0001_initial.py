@@ -0,0 +1,44 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ativo', models.BooleanField(default=True, help_text='Se o registro está ativo ou não', verbose_name='ativo')),
+                ('data_hora_criacao', models.DateTimeField(auto_now_add=True, help_text='Data e hora da criação do registro', verbose_name='data e hora de criação')),
+                ('data_hora_ultima_alteracao', models.DateTimeField(auto_now=True, help_text='Data e hora da última alteração', verbose_name='data e hora da última alteração')),
+                ('nome', models.CharField(help_text='Nome da tarefa registrada', max_length=100, verbose_name='nome')),
+                ('argumentos', models.JSONField(blank=True, default=dict, verbose_name='argumentos')),
+                ('status', models.CharField(choices=[('PEN', 'Pendente'), ('EXE', 'Executando'), ('CON', 'Concluída'), ('FAL', 'Falhou')], default='PEN', max_length=3, verbose_name='status')),
+                ('tentativas', models.PositiveIntegerField(default=0, verbose_name='tentativas')),
+                ('maximo_tentativas', models.PositiveIntegerField(default=3, verbose_name='máximo de tentativas')),
+                ('executar_em', models.DateTimeField(help_text='A tarefa não é executada antes desse horário', verbose_name='executar em')),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True, verbose_name='iniciada em')),
+                ('finalizada_em', models.DateTimeField(blank=True, null=True, verbose_name='finalizada em')),
+                ('resultado', models.JSONField(blank=True, null=True, verbose_name='resultado')),
+                ('erro', models.TextField(blank=True, verbose_name='erro')),
+                ('criador', models.ForeignKey(db_index=False, editable=False, help_text='Usuário que criou o registro', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='criador do registro')),
+            ],
+            options={
+                'verbose_name': 'Tarefa',
+                'verbose_name_plural': 'Tarefas',
+                'db_table': 'tarefa',
+                'ordering': ['-id'],
+                'indexes': [models.Index(condition=models.Q(('status', 'PEN')), fields=['executar_em', 'id'], name='tarefa_fila_idx'), models.Index(condition=models.Q(('status', 'EXE')), fields=['iniciada_em'], name='tarefa_executando_idx'), models.Index(fields=['criador', 'id'], name='tarefa_criador_idx')],
+            },
+        ),
+    ]
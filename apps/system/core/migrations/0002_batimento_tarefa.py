@@ -0,0 +1,34 @@
+# Generated by Django 4.2.3 on 2026-10-18 18:39
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def preencher_batimento(apps, schema_editor):
+    # as tarefas em execução durante a atualização contam desde o início
+    Tarefa = apps.get_model("core", "Tarefa")
+    Tarefa.objects.filter(status="EXE").update(batimento_em=F("iniciada_em"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tarefa',
+            name='tarefa_executando_idx',
+        ),
+        migrations.AddField(
+            model_name='tarefa',
+            name='batimento_em',
+            field=models.DateTimeField(blank=True, help_text='Atualizado pelo worker enquanto a tarefa está em execução', null=True, verbose_name='último sinal em'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(condition=models.Q(('status', 'EXE')), fields=['batimento_em'], name='tarefa_executando_idx'),
+        ),
+        migrations.RunPython(preencher_batimento, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,100 @@
+from django.conf import settings
 from django.db import models
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+from apps.system.base.models import Base
+
+
+class Tarefa(Base):
+    """
+    Tarefa executada em segundo plano pelo comando `worker`. O `nome` é a
+    chave da função registrada com `@tarefa` e os `argumentos` são passados
+    para ela como keyword arguments.
+    """
+
+    PENDENTE = "PEN"
+    EXECUTANDO = "EXE"
+    CONCLUIDA = "CON"
+    FALHOU = "FAL"
+
+    STATUS = (
+        (PENDENTE, "Pendente"),
+        (EXECUTANDO, "Executando"),
+        (CONCLUIDA, "Concluída"),
+        (FALHOU, "Falhou"),
+    )
+
+    nome = models.CharField(_("nome"), max_length=100, help_text="Nome da tarefa registrada")
+
+    argumentos = models.JSONField(_("argumentos"), default=dict, blank=True)
+
+    status = models.CharField(_("status"), max_length=3, choices=STATUS, default=PENDENTE)
+
+    tentativas = models.PositiveIntegerField(_("tentativas"), default=0)
+
+    maximo_tentativas = models.PositiveIntegerField(_("máximo de tentativas"), default=3)
+
+    executar_em = models.DateTimeField(
+        _("executar em"), help_text="A tarefa não é executada antes desse horário"
+    )
+
+    iniciada_em = models.DateTimeField(_("iniciada em"), null=True, blank=True)
+
+    batimento_em = models.DateTimeField(
+        _("último sinal em"),
+        null=True,
+        blank=True,
+        help_text="Atualizado pelo worker enquanto a tarefa está em execução",
+    )
+
+    finalizada_em = models.DateTimeField(_("finalizada em"), null=True, blank=True)
+
+    resultado = models.JSONField(_("resultado"), null=True, blank=True)
+
+    erro = models.TextField(_("erro"), blank=True)
+
+    def __str__(self):
+        return f"{self.nome} #{self.pk}"
+
+    class Meta:
+        db_table = "tarefa"
+        ordering = ["-id"]
+        verbose_name = _("Tarefa")
+        verbose_name_plural = _("Tarefas")
+        indexes = [
+            # fila do worker: somente as tarefas pendentes, pela ordem de execução
+            models.Index(
+                fields=["executar_em", "id"],
+                condition=models.Q(status="PEN"),
+                name="tarefa_fila_idx",
+            ),
+            models.Index(
+                fields=["batimento_em"],
+                condition=models.Q(status="EXE"),
+                name="tarefa_executando_idx",
+            ),
+            models.Index(fields=["criador", "id"], name="tarefa_criador_idx"),
+        ]
+
+
+@receiver(connection_created)
+def instrumentar_conexao(sender, connection, **kwargs):
+    """Mede as consultas das requisições amostradas pelo `InstrumentacaoMiddleware`."""
+    from .instrumentacao import medir_consulta
+
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+@receiver(connection_created)
+def aplicar_perfil_sqlite(sender, connection, **kwargs):
+    """Aplica os pragmas de `apps.system.core.sqlite` com `SQLITE_OTIMIZADO`."""
+    if connection.vendor != "sqlite" or not getattr(settings, "SQLITE_OTIMIZADO", False):
+        return
+
+    from .sqlite import aplicar_pragmas
+
+    with connection.cursor() as cursor:
+        aplicar_pragmas(cursor)
@@ -1,13 +1,50 @@
+import json
+
+from base64 import b64decode, b64encode
+from datetime import date, datetime
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination, _positive_int
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPagination(PageNumberPagination):
+    """
+    Paginação por número de página com um modo alternativo por cursor
+    (keyset). O modo cursor é escolhido pelo atributo `modo_paginacao` da
+    viewset ou pela query `paginacao=cursor` e ordena pelos campos de
+    `ordenacao_cursor` da viewset, ignorando a ordenação do `OrderingFilter`.
+    Nele o `total` só é calculado quando solicitado com `total=true`.
+    """
+
     page_size_query_param = 'size'
 
+    modo_query_param = 'paginacao'
+    cursor_query_param = 'cursor'
+    total_query_param = 'total'
+
+    ordenacao_cursor = ('-id',)
+    tamanho_maximo_cursor = 1000
+
+    modo = 'pagina'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.modo = self.get_modo(request, view)
+        if self.modo != 'cursor':
+            return super().paginate_queryset(queryset, request, view)
+
+        return self.paginate_queryset_cursor(queryset, request, view)
+
     def get_paginated_response(self, data):
+        if self.modo == 'cursor':
+            total = self.total
+        else:
+            total = self.page.paginator.count
+
         return Response({
-            'total': self.page.paginator.count,
+            'total': total,
             'links_paginas': {
                 'proxima': self.get_next_link(),
                 'anterior': self.get_previous_link()
@@ -20,6 +57,8 @@ class CustomPagination(PageNumberPagination):
             try:
                 request_page_size = request.query_params[self.page_size_query_param]
                 if request_page_size == 'all':
+                    if self.modo == 'cursor':
+                        return self.tamanho_maximo_cursor
                     return 7 ** 10
 
                 return _positive_int(
@@ -30,4 +69,165 @@ class CustomPagination(PageNumberPagination):
             except (KeyError, ValueError):
                 pass
 
-        return self.page_size
\ No newline at end of file
+        return self.page_size
+
+    def get_next_link(self):
+        if self.modo != 'cursor':
+            return super().get_next_link()
+
+        if not self.proxima_posicao:
+            return None
+
+        return self.get_cursor_link(self.proxima_posicao, reverso=False)
+
+    def get_previous_link(self):
+        if self.modo != 'cursor':
+            return super().get_previous_link()
+
+        if not self.posicao_anterior:
+            return None
+
+        return self.get_cursor_link(self.posicao_anterior, reverso=True)
+
+    def get_modo(self, request, view):
+        modo = request.query_params.get(self.modo_query_param)
+        if modo is None:
+            modo = getattr(view, 'modo_paginacao', 'pagina')
+
+        return 'cursor' if modo == 'cursor' else 'pagina'
+
+    def paginate_queryset_cursor(self, queryset, request, view):
+        self.request = request
+        self.ordenacao = [
+            (campo.lstrip('-'), campo.startswith('-'))
+            for campo in getattr(view, 'ordenacao_cursor', self.ordenacao_cursor)
+        ]
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.total = None
+        if request.query_params.get(self.total_query_param) in ('true', '1'):
+            self.total = queryset.count()
+
+        posicao, reverso = self.decode_cursor(request, queryset.model)
+
+        queryset = queryset.order_by(*self.get_ordem(reverso))
+        if posicao is not None:
+            filtro = self.get_filtro_posicao(queryset.model, posicao, reverso)
+            if filtro is not None:
+                queryset = queryset.filter(filtro)
+
+        resultados = list(queryset[:page_size + 1])
+        possui_mais = len(resultados) > page_size
+        resultados = resultados[:page_size]
+
+        if reverso:
+            resultados.reverse()
+
+        self.proxima_posicao = None
+        self.posicao_anterior = None
+        if resultados:
+            primeiro = self.get_posicao(resultados[0])
+            ultimo = self.get_posicao(resultados[-1])
+
+            if reverso:
+                self.proxima_posicao = ultimo
+                self.posicao_anterior = primeiro if possui_mais else None
+            else:
+                self.proxima_posicao = ultimo if possui_mais else None
+                self.posicao_anterior = primeiro if posicao is not None else None
+
+        return resultados
+
+    def get_ordem(self, reverso):
+        """
+        Nulos ficam sempre no fim da ordenação original, para que o filtro
+        por posição funcione igual em todos os bancos de dados.
+        """
+        nulos = {'nulls_first': True} if reverso else {'nulls_last': True}
+
+        ordem = []
+        for campo, decrescente in self.ordenacao:
+            if decrescente != reverso:
+                ordem.append(F(campo).desc(**nulos))
+            else:
+                ordem.append(F(campo).asc(**nulos))
+
+        return ordem
+
+    def get_filtro_posicao(self, model, posicao, reverso):
+        """
+        Monta `(a > x) OR (a = x AND b > y) ...` respeitando a direção de
+        cada campo, que é o que permite ao banco ir direto para a posição
+        pelo índice em vez de descartar linhas com OFFSET.
+        """
+        filtro = None
+        igualdade = Q()
+
+        for (campo, decrescente), valor in zip(self.ordenacao, posicao):
+            depois = self.get_filtro_depois(
+                model, campo, valor, decrescente != reverso, nulos_no_fim=not reverso
+            )
+            if depois is not None:
+                depois = igualdade & depois
+                filtro = depois if filtro is None else filtro | depois
+
+            if valor is None:
+                igualdade &= Q(**{f'{campo}__isnull': True})
+            else:
+                igualdade &= Q(**{campo: valor})
+
+        return filtro
+
+    def get_filtro_depois(self, model, campo, valor, decrescente, nulos_no_fim):
+        if valor is None:
+            if nulos_no_fim:
+                return None
+            return Q(**{f'{campo}__isnull': False})
+
+        filtro = Q(**{f'{campo}__{"lt" if decrescente else "gt"}': valor})
+        if nulos_no_fim and model._meta.get_field(campo).null:
+            filtro |= Q(**{f'{campo}__isnull': True})
+
+        return filtro
+
+    def get_posicao(self, instancia):
+        if isinstance(instancia, dict):
+            return [instancia[campo] for campo, _ in self.ordenacao]
+
+        return [getattr(instancia, campo) for campo, _ in self.ordenacao]
+
+    def decode_cursor(self, request, model):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+
+        try:
+            dados = json.loads(b64decode(cursor.encode('ascii')).decode('utf-8'))
+            if len(dados['p']) != len(self.ordenacao):
+                raise ValueError
+
+            posicao = [
+                None if valor is None else model._meta.get_field(campo).to_python(valor)
+                for (campo, _), valor in zip(self.ordenacao, dados['p'])
+            ]
+            return posicao, bool(dados.get('r'))
+        except Exception:
+            raise NotFound('Cursor inválido.')
+
+    def encode_cursor(self, posicao, reverso):
+        valores = [
+            valor.isoformat() if isinstance(valor, (date, datetime)) else valor
+            for valor in posicao
+        ]
+        dados = json.dumps({'p': valores, 'r': int(reverso)}, separators=(',', ':'))
+        return b64encode(dados.encode('utf-8')).decode('ascii')
+
+    def get_cursor_link(self, posicao, reverso):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(posicao, reverso)
+        )
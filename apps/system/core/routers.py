@@ -0,0 +1,83 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+# alias usado nas leituras do contexto atual, definido pelas views que podem
+# ler da réplica; fora delas (admin, tarefas, comandos) tudo vai ao primário
+banco_leitura = ContextVar("banco_leitura", default=None)
+
+
+def get_replica():
+    """Alias da réplica configurada em `BANCO_REPLICA`, ou `None`."""
+    replica = getattr(settings, "BANCO_REPLICA", None)
+    if replica is None or replica not in settings.DATABASES:
+        return None
+
+    return replica
+
+
+def get_chave_fixacao(usuario_id):
+    return f"replica:primario:{usuario_id}"
+
+
+def fixar_no_primario(usuario):
+    """
+    Depois de uma escrita, as leituras do usuário vão ao primário por
+    `REPLICA_FIXACAO` segundos, tempo para a réplica alcançá-lo, e ele
+    sempre lê o que acabou de gravar.
+    """
+    if get_replica() is None or usuario is None or not usuario.is_authenticated:
+        return
+
+    cache.set(get_chave_fixacao(usuario.pk), True, getattr(settings, "REPLICA_FIXACAO", 10))
+
+
+def get_banco_leitura(usuario):
+    if get_replica() is None:
+        return None
+
+    if usuario is not None and usuario.is_authenticated and cache.get(get_chave_fixacao(usuario.pk)):
+        return None
+
+    return get_replica()
+
+
+async def aget_banco_leitura(usuario):
+    if get_replica() is None:
+        return None
+
+    if usuario is not None and usuario.is_authenticated and await cache.aget(
+        get_chave_fixacao(usuario.pk)
+    ):
+        return None
+
+    return get_replica()
+
+
+class ReplicaRouter:
+    """
+    Leituras vão para o alias de `banco_leitura`, quando definido, e as
+    escritas e migrações sempre para o banco padrão. A réplica espelha o
+    banco padrão, então relações entre os dois são permitidas.
+    """
+
+    def db_for_read(self, model, **hints):
+        return banco_leitura.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bancos = {DEFAULT_DB_ALIAS, get_replica()}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == get_replica():
+            return False
+
+        return None
@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+from .models import Tarefa
+
+
+class TarefaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tarefa
+        exclude = ("criador", "argumentos")
@@ -0,0 +1,42 @@
+from django.conf import settings
+
+# Perfil para instalações de um único servidor: com o WAL os leitores não
+# esperam as escritas, e o synchronous=NORMAL só sincroniza o disco nos
+# checkpoints, sem risco de corromper o banco (apenas as últimas transações
+# podem ser perdidas se a máquina desligar)
+PRAGMAS_PADRAO = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    # valores negativos são em KiB: 64 MiB de cache por conexão
+    "cache_size": -64 * 1024,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+
+
+def get_pragmas():
+    """Pragmas do perfil, com os valores de `SQLITE_PRAGMAS` por cima."""
+    return {**PRAGMAS_PADRAO, **getattr(settings, "SQLITE_PRAGMAS", {})}
+
+
+def aplicar_pragmas(cursor, pragmas=None):
+    if pragmas is None:
+        pragmas = get_pragmas()
+
+    for nome, valor in pragmas.items():
+        cursor.execute(f"PRAGMA {nome} = {valor}")
+
+
+def get_estado(cursor):
+    """
+    Valor atual de cada pragma do perfil na conexão, ou `None` para os que
+    não retornam linha, como o `mmap_size` de um banco em memória.
+    """
+    estado = {}
+    for nome in get_pragmas():
+        cursor.execute(f"PRAGMA {nome}")
+        linha = cursor.fetchone()
+        estado[nome] = linha[0] if linha else None
+
+    return estado
@@ -0,0 +1,225 @@
+import uuid
+import traceback
+
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.test import RequestFactory
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Tarefa
+
+_tarefas = {}
+
+
+def tarefa(nome, tentativas=3):
+    """
+    Registra uma função como tarefa de segundo plano. Ela recebe os
+    argumentos do `enfileirar` e o valor retornado, que precisa ser
+    serializável em JSON, fica no `resultado` da tarefa.
+    """
+
+    def decorator(funcao):
+        _tarefas[nome] = (funcao, tentativas)
+        return funcao
+
+    return decorator
+
+
+def get_tarefas():
+    autodiscover_modules("tarefas")
+    return dict(_tarefas)
+
+
+def enfileirar(nome, criador=None, atraso=0, **argumentos):
+    """
+    Cria a tarefa e retorna imediatamente. Com `TAREFAS_BACKEND = "eager"`,
+    usado nos testes, a tarefa é executada na hora, inclusive as novas
+    tentativas, sem esperar o intervalo entre elas.
+    """
+    tarefas = get_tarefas()
+    if nome not in tarefas:
+        raise ValueError(f"Tarefa não registrada: {nome}")
+
+    registro = Tarefa.objects.create(
+        nome=nome,
+        argumentos=argumentos,
+        maximo_tentativas=tarefas[nome][1],
+        executar_em=timezone.now() + timedelta(seconds=atraso),
+        criador=criador,
+    )
+
+    if getattr(settings, "TAREFAS_BACKEND", "banco") == "eager":
+        while reivindicar(registro):
+            executar(registro)
+
+    return registro
+
+
+def reivindicar(registro):
+    """
+    Marca a tarefa como em execução com um UPDATE condicional, então apenas
+    um worker consegue reivindicá-la, em qualquer banco de dados.
+    """
+    agora = timezone.now()
+    reivindicada = Tarefa.objects.filter(pk=registro.pk, status=Tarefa.PENDENTE).update(
+        status=Tarefa.EXECUTANDO,
+        iniciada_em=agora,
+        batimento_em=agora,
+        tentativas=F("tentativas") + 1,
+        data_hora_ultima_alteracao=agora,
+    )
+    if reivindicada:
+        registro.refresh_from_db()
+
+    return bool(reivindicada)
+
+
+def executar(registro):
+    funcao, _ = get_tarefas().get(registro.nome, (None, None))
+
+    try:
+        if funcao is None:
+            raise ValueError(f"Tarefa não registrada: {registro.nome}")
+
+        resultado = funcao(**registro.argumentos)
+    except Exception:
+        registro.erro = traceback.format_exc()
+        if registro.tentativas < registro.maximo_tentativas:
+            registro.status = Tarefa.PENDENTE
+            registro.executar_em = timezone.now() + get_espera(registro.tentativas)
+        else:
+            registro.status = Tarefa.FALHOU
+            registro.finalizada_em = timezone.now()
+    else:
+        registro.status = Tarefa.CONCLUIDA
+        registro.resultado = resultado
+        registro.erro = ""
+        registro.finalizada_em = timezone.now()
+
+    registro.save()
+    return registro
+
+
+def get_espera(tentativas):
+    """Espera exponencial entre as tentativas, limitada a um máximo."""
+    base = getattr(settings, "TAREFAS_ESPERA_BASE", 10)
+    maxima = getattr(settings, "TAREFAS_ESPERA_MAXIMA", 60 * 60)
+    return timedelta(seconds=min(base * 2 ** (tentativas - 1), maxima))
+
+
+def get_proximas(limite):
+    return list(
+        Tarefa.objects.filter(status=Tarefa.PENDENTE, executar_em__lte=timezone.now())
+        .order_by("executar_em", "id")[:limite]
+    )
+
+
+def registrar_batimento(ids):
+    """
+    Sinaliza que o worker continua executando as tarefas `ids`. Chamado pelo
+    worker a cada volta do laço, inclusive enquanto as tarefas ainda rodam.
+    """
+    if not ids:
+        return 0
+
+    return Tarefa.objects.filter(pk__in=ids, status=Tarefa.EXECUTANDO).update(
+        batimento_em=timezone.now()
+    )
+
+
+def recuperar_travadas():
+    """
+    Recupera as tarefas em execução cujo worker não dá sinal há mais tempo
+    que o limite, provavelmente encerrado no meio da execução. A execução
+    interrompida conta como uma tentativa, já somada ao reivindicar: a
+    tarefa volta para a fila enquanto houver tentativas e falha depois
+    disso, para que uma tarefa que derruba o worker não seja repetida para
+    sempre. Retorna a quantidade devolvida para a fila e a que falhou.
+    """
+    agora = timezone.now()
+    limite = agora - timedelta(seconds=getattr(settings, "TAREFAS_TEMPO_LIMITE", 60))
+    travadas = Tarefa.objects.filter(status=Tarefa.EXECUTANDO, batimento_em__lt=limite)
+    erro = "Tarefa interrompida: o worker parou de sinalizar a execução"
+
+    devolvidas = travadas.filter(tentativas__lt=F("maximo_tentativas")).update(
+        status=Tarefa.PENDENTE,
+        executar_em=agora,
+        erro=erro,
+        data_hora_ultima_alteracao=agora,
+    )
+    falharam = travadas.filter(tentativas__gte=F("maximo_tentativas")).update(
+        status=Tarefa.FALHOU,
+        finalizada_em=agora,
+        erro=erro,
+        data_hora_ultima_alteracao=agora,
+    )
+    return devolvidas, falharam
+
+
+def salvar_arquivo(pasta, nome, conteudo):
+    """
+    Grava um arquivo usado ou gerado por uma tarefa no storage padrão. O
+    conteúdo pode ser texto, bytes ou um `File` do Django, como um upload,
+    que é copiado em pedaços.
+    """
+    if isinstance(conteudo, str):
+        conteudo = conteudo.encode("utf-8")
+    if isinstance(conteudo, bytes):
+        conteudo = ContentFile(conteudo)
+
+    caminho = default_storage.save(f"tarefas/{pasta}/{uuid.uuid4().hex}-{nome}", conteudo)
+    return {"arquivo": caminho, "url": default_storage.url(caminho)}
+
+
+@tarefa("core.enviar_email")
+def enviar_email(
+    titulo, mensagem, destinatarios, from_email=None, template=None, contexto=None, html=None
+):
+    from .classes import Email
+
+    email = Email(titulo, mensagem, from_email=from_email or settings.EMAIL_HOST_USER)
+    if template is not None:
+        email.add_template(template, **(contexto or {}))
+    elif html is not None:
+        email.add_html(html)
+
+    for destinatario, contexto_destinatario in destinatarios:
+        email.add_destinatario(destinatario, **contexto_destinatario)
+
+    return {"mensagens": email.enviar_agora(), "destinatarios": len(destinatarios)}
+
+
+@tarefa("core.exportar_admin")
+def exportar_admin(modelo, usuario_id, caminho, parametros, formato, recurso=0):
+    """
+    Refaz a exportação do admin do import_export fora da requisição: a
+    listagem é montada de novo com os mesmos filtros e o mesmo usuário.
+    """
+    from django.contrib import admin
+
+    model = apps.get_model(modelo)
+    model_admin = admin.site._registry[model]
+
+    request = RequestFactory().get(caminho, parametros)
+    request.user = apps.get_model(settings.AUTH_USER_MODEL)._default_manager.get(pk=usuario_id)
+
+    file_format = model_admin.get_export_formats()[formato]()
+    queryset = model_admin.get_export_queryset(request)
+    resource = model_admin.get_export_resource_classes()[recurso](
+        **model_admin.get_export_resource_kwargs(request)
+    )
+    dados = file_format.export_data(
+        resource.export(queryset=queryset),
+        escape_html=model_admin.should_escape_html,
+        escape_formulae=model_admin.should_escape_formulae,
+    )
+
+    return salvar_arquivo(
+        "exportacoes", model_admin.get_export_filename(request, queryset, file_format), dados
+    )
@@ -1,3 +1,692 @@
-from django.test import TestCase
+import os
+import json
+import socket
+import tempfile
+import threading
+import smtplib
+import sqlite3
 
-# Create your tests here.
+from datetime import date, timedelta
+from unittest import mock, skipIf, skipUnless
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.template.loader import get_template
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from apps.system.base.testes import DesempenhoMixin, ReplicaTesteMixin, get_changelists
+from apps.system.base.views import ReplicaLeituraMixin
+
+from .classes import AtributosJSON, CacheArquivos, Email, JSONDinamicAttrs, ListaJSON, carregar_json
+from .instrumentacao import histogramas
+from .middlewares import InstrumentacaoMiddleware, ReplicaMiddleware
+from .models import Tarefa
+from .routers import ReplicaRouter, banco_leitura, fixar_no_primario, get_replica
+from .sqlite import aplicar_pragmas, get_estado
+from .tarefas import recuperar_travadas, registrar_batimento, reivindicar
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+
+TEMPLATES_TESTE = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "OPTIONS": {
+            "loaders": [
+                (
+                    "django.template.loaders.locmem.Loader",
+                    {"email.html": "<p>Olá {{ nome }}, {{ assunto }}</p>"},
+                )
+            ]
+        },
+    }
+]
+
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    TEMPLATES=TEMPLATES_TESTE,
+    TAREFAS_BACKEND="eager",
+)
+class EmailTestCase(TestCase):
+    def test_divide_destinatarios_em_mensagens(self):
+        email = Email("Aviso", "texto", from_email="logix@teste.com").add_html("<p>aviso</p>")
+        email.add_destinatarios(f"usuario{i}@teste.com" for i in range(120))
+
+        self.assertEqual(Email.enviar_varios([email]), 3)
+        self.assertEqual([len(m.bcc) for m in mail.outbox], [50, 50, 20])
+        # os destinatários não veem os endereços uns dos outros
+        self.assertEqual([m.to for m in mail.outbox], [["logix@teste.com"]] * 3)
+        self.assertNotIn("usuario", mail.outbox[0].message().as_string())
+        self.assertEqual(mail.outbox[0].alternatives, [("<p>aviso</p>", "text/html")])
+
+    def test_renderiza_template_uma_vez_por_contexto(self):
+        email = Email("Aviso").add_template("email.html", assunto="fatura")
+        email.add_destinatario("a@teste.com", nome="Ana")
+        email.add_destinatario("b@teste.com", nome="Bruno")
+        email.add_destinatario("c@teste.com", nome="Ana")
+
+        with mock.patch("apps.system.core.classes.get_template", wraps=get_template) as carregar:
+            self.assertEqual(email.enviar_agora(), 2)
+
+        self.assertEqual(carregar.call_count, 2)
+        html = {tuple(m.bcc): m.alternatives[0][0] for m in mail.outbox}
+        self.assertEqual(html[("a@teste.com", "c@teste.com")], "<p>Olá Ana, fatura</p>")
+        self.assertEqual(html[("b@teste.com",)], "<p>Olá Bruno, fatura</p>")
+
+    def test_compartilha_renderizacao_entre_emails(self):
+        emails = [
+            Email("Aviso").add_template("email.html", nome="Ana").add_destinatario(f"{i}@teste.com")
+            for i in range(5)
+        ]
+
+        with mock.patch("apps.system.core.classes.get_template", wraps=get_template) as carregar:
+            Email.enviar_varios(emails)
+
+        self.assertEqual(carregar.call_count, 1)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_envia_por_uma_unica_conexao(self):
+        emails = [Email("Aviso", "texto").add_destinatario(f"{i}@teste.com") for i in range(10)]
+
+        connection = get_connection()
+        with mock.patch.object(connection, "send_messages", wraps=connection.send_messages) as send:
+            Email.enviar_varios(emails, connection=connection)
+
+        send.assert_called_once()
+        self.assertEqual(len(send.call_args.args[0]), 10)
+
+    def test_enviar_enfileira_tarefa(self):
+        email = Email("Aviso").add_template("email.html", assunto="fatura")
+        email.add_destinatario("a@teste.com", nome="Ana")
+
+        tarefa = email.enviar()
+
+        self.assertEqual(tarefa.status, Tarefa.CONCLUIDA)
+        self.assertEqual(tarefa.resultado, {"mensagens": 1, "destinatarios": 1})
+        self.assertEqual(mail.outbox[0].alternatives[0][0], "<p>Olá Ana, fatura</p>")
+
+    def test_enviar_com_data_no_contexto(self):
+        email = Email("Aviso").add_template("email.html", assunto=date(2023, 1, 5))
+        email.add_destinatario("a@teste.com", nome=date(2023, 2, 1))
+
+        tarefa = email.enviar()
+
+        self.assertEqual(tarefa.status, Tarefa.CONCLUIDA)
+        self.assertEqual(mail.outbox[0].alternatives[0][0], "<p>Olá 2023-02-01, 2023-01-05</p>")
+
+    def test_enviar_recusa_contexto_fora_do_json(self):
+        usuario = get_user_model().objects.create_user(email="contexto@teste.com", nome="Contexto")
+        email = Email("Aviso").add_template("email.html", nome=usuario)
+        email.add_destinatario("a@teste.com")
+
+        with self.assertRaisesMessage(ValueError, "serializável em JSON"):
+            email.enviar()
+        self.assertFalse(Tarefa.objects.exists())
+
+        # o envio direto não passa pela tarefa
+        self.assertEqual(email.enviar_agora(), 1)
+        self.assertEqual(mail.outbox[0].alternatives[0][0], "<p>Olá contexto@teste.com, </p>")
+
+    def test_destinatario_repetido(self):
+        email = Email("Aviso").add_destinatario("a@teste.com")
+
+        with self.assertRaises(Exception):
+            email.add_destinatario("a@teste.com")
+
+
+@override_settings(TAREFAS_TEMPO_LIMITE=60)
+class RecuperarTravadasTestCase(TestCase):
+    def criar(self, tentativas, maximo_tentativas=3, sem_sinal=120):
+        tarefa = Tarefa.objects.create(
+            nome="core.enviar_email",
+            executar_em=timezone.now(),
+            tentativas=tentativas - 1,
+            maximo_tentativas=maximo_tentativas,
+        )
+        self.assertTrue(reivindicar(tarefa))
+        Tarefa.objects.filter(pk=tarefa.pk).update(
+            batimento_em=timezone.now() - timedelta(seconds=sem_sinal)
+        )
+        return tarefa
+
+    def test_devolve_para_a_fila_pelo_ultimo_sinal(self):
+        tarefa = self.criar(tentativas=1)
+
+        self.assertEqual(recuperar_travadas(), (1, 0))
+
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, Tarefa.PENDENTE)
+        # a execução interrompida conta como tentativa
+        self.assertEqual(tarefa.tentativas, 1)
+        self.assertIn("interrompida", tarefa.erro)
+
+    def test_falha_depois_da_ultima_tentativa(self):
+        tarefa = self.criar(tentativas=3)
+
+        self.assertEqual(recuperar_travadas(), (0, 1))
+
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, Tarefa.FALHOU)
+        self.assertIsNotNone(tarefa.finalizada_em)
+
+    def test_execucao_longa_com_sinal_nao_e_recuperada(self):
+        tarefa = self.criar(tentativas=1)
+        # iniciada há muito tempo, mas o worker continua sinalizando
+        Tarefa.objects.filter(pk=tarefa.pk).update(iniciada_em=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(registrar_batimento([tarefa.pk]), 1)
+        self.assertEqual(recuperar_travadas(), (0, 0))
+
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, Tarefa.EXECUTANDO)
+
+
+class CacheArquivosTestCase(SimpleTestCase):
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(self.pasta.cleanup)
+
+    def criar(self, nome, conteudo):
+        path = os.path.join(self.pasta.name, nome)
+        with open(path, "wb") as arquivo:
+            arquivo.write(conteudo)
+
+        return path
+
+    def test_leitores_independentes(self):
+        cache = CacheArquivos()
+        path = self.criar("a.txt", b"primeira\nsegunda\n")
+
+        primeiro, segundo = cache.abrir(path), cache.abrir(path)
+
+        self.assertEqual(primeiro.readline(), "primeira\n")
+        self.assertEqual(segundo.read(), "primeira\nsegunda\n")
+        self.assertEqual(primeiro.read(), "segunda\n")
+        self.assertEqual(cache.get_estatisticas()["acertos"], 1)
+        self.assertEqual(cache.get_estatisticas()["falhas"], 1)
+
+    def test_invalida_quando_o_arquivo_muda(self):
+        cache = CacheArquivos()
+        path = self.criar("a.txt", b"antigo")
+        self.assertEqual(bytes(cache.ler(path)), b"antigo")
+
+        self.criar("a.txt", b"conteudo novo")
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+
+        self.assertEqual(bytes(cache.ler(path)), b"conteudo novo")
+        self.assertEqual(cache.get_estatisticas()["falhas"], 2)
+
+    def test_limites_lru(self):
+        cache = CacheArquivos(maximo_arquivos=2, maximo_bytes=10)
+        a, b, c = (self.criar(nome, b"12345") for nome in "abc")
+
+        cache.ler(a)
+        cache.ler(b)
+        cache.ler(a)
+        cache.ler(c)
+
+        estatisticas = cache.get_estatisticas()
+        self.assertEqual((estatisticas["arquivos"], estatisticas["bytes"]), (2, 10))
+        self.assertEqual(estatisticas["descartes"], 1)
+
+        cache.ler(a)
+        self.assertEqual(cache.get_estatisticas()["acertos"], 2)
+
+    def test_mmap_e_threads(self):
+        cache = CacheArquivos(limite_mmap=1024)
+        conteudo = os.urandom(64 * 1024)
+        path = self.criar("grande.bin", conteudo)
+
+        lidos = []
+
+        def ler():
+            with cache.abrir(path, "rb") as arquivo:
+                lidos.append(arquivo.read())
+
+        threads = [threading.Thread(target=ler) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(lidos, [conteudo] * 8)
+        self.assertEqual(len(cache.ler(path)), len(conteudo))
+
+    def test_somente_leitura(self):
+        with self.assertRaises(ValueError):
+            CacheArquivos().abrir(self.criar("a.txt", b""), "w")
+
+
+class CarregarJSONTestCase(SimpleTestCase):
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(self.pasta.cleanup)
+        self.path = os.path.join(self.pasta.name, "dados.json")
+
+    def escrever(self, dados, mtime_ns=None):
+        with open(self.path, "w") as arquivo:
+            json.dump(dados, arquivo)
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_mesmo_objeto_para_todos(self):
+        self.escrever({"a": 1})
+
+        with mock.patch("apps.system.core.classes.json.load", wraps=json.load) as load:
+            primeiro = carregar_json(self.path)
+            segundo = carregar_json(os.path.join(self.pasta.name, ".", "dados.json"))
+
+        self.assertIs(primeiro, segundo)
+        self.assertIs(JSONDinamicAttrs(self.path).raw, primeiro)
+        load.assert_called_once()
+
+    def test_interpreta_de_novo_quando_o_mtime_muda(self):
+        self.escrever({"a": 1}, mtime_ns=10**18)
+        self.assertEqual(carregar_json(self.path), {"a": 1})
+
+        # mesmo tamanho, outro mtime
+        self.escrever({"a": 2}, mtime_ns=10**18 + 1)
+        self.assertEqual(carregar_json(self.path), {"a": 2})
+
+    def test_interpreta_de_novo_quando_o_tamanho_muda(self):
+        self.escrever({"a": 1}, mtime_ns=10**18)
+        self.assertEqual(carregar_json(self.path), {"a": 1})
+
+        # mesmo mtime, outro tamanho
+        self.escrever({"a": 10}, mtime_ns=10**18)
+        self.assertEqual(carregar_json(self.path), {"a": 10})
+
+    def test_objetos_aninhados_envolvidos_no_acesso(self):
+        atributos = AtributosJSON({"banco": {"nome": "logix"}, "portas": [{"numero": 80}, 443]})
+
+        self.assertIsNone(atributos._filhos)
+
+        banco = atributos.banco
+        self.assertIsInstance(banco, AtributosJSON)
+        self.assertEqual(banco.nome, "logix")
+        self.assertIs(atributos.banco, banco)
+        self.assertEqual(list(atributos._filhos), ["banco"])
+
+        portas = atributos.portas
+        self.assertIsInstance(portas, ListaJSON)
+        self.assertIsInstance(portas[0], AtributosJSON)
+        self.assertEqual(portas[0].numero, 80)
+        self.assertEqual(portas[1], 443)
+        self.assertIsInstance(portas[:1], ListaJSON)
+        self.assertEqual([porta for porta in portas][1], 443)
+
+    def test_dados_compartilhados(self):
+        dados = {"banco": {"nome": "logix"}, "portas": [80]}
+        atributos = AtributosJSON(dados)
+
+        self.assertIs(atributos.raw, dados)
+        self.assertIs(atributos.banco.raw, dados["banco"])
+        self.assertIs(atributos.portas.raw, dados["portas"])
+
+    def test_chave_ausente(self):
+        atributos = AtributosJSON({"a": 1})
+
+        with self.assertRaises(AttributeError):
+            atributos.b
+        self.assertFalse(hasattr(atributos, "b"))
+        with self.assertRaises(KeyError):
+            atributos["b"]
+
+    def test_contains_e_len(self):
+        atributos = AtributosJSON({"a": 1, "b": {"c": 2}})
+
+        self.assertIn("a", atributos)
+        self.assertNotIn("c", atributos)
+        self.assertEqual(len(atributos), 2)
+        self.assertEqual(list(atributos), ["a", "b"])
+        self.assertEqual(atributos["b"]["c"], 2)
+        self.assertEqual(len(ListaJSON([1, 2, 3])), 3)
+
+
+class ServidorSMTP:
+    def __init__(self):
+        self.recebidas = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.recebidas += 1
+        return "250 OK"
+
+
+@skipUnless(Controller is not None, "aiosmtpd não está instalado")
+class SqliteTestCase(SimpleTestCase):
+    def conectar(self, path):
+        conexao = sqlite3.connect(path)
+        self.addCleanup(conexao.close)
+        return conexao.cursor()
+
+    def conectar_arquivo(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        return self.conectar(os.path.join(pasta.name, "banco.sqlite3"))
+
+    def test_aplicar_pragmas(self):
+        cursor = self.conectar_arquivo()
+        aplicar_pragmas(cursor)
+
+        self.assertEqual(
+            get_estado(cursor),
+            {
+                "journal_mode": "wal",
+                "synchronous": 1,
+                "mmap_size": 256 * 1024 * 1024,
+                "cache_size": -64 * 1024,
+                "temp_store": 2,
+                "busy_timeout": 5000,
+            },
+        )
+
+    @override_settings(SQLITE_PRAGMAS={"cache_size": -1024, "synchronous": "FULL"})
+    def test_pragmas_das_configuracoes(self):
+        cursor = self.conectar_arquivo()
+        aplicar_pragmas(cursor)
+
+        estado = get_estado(cursor)
+        self.assertEqual(estado["cache_size"], -1024)
+        self.assertEqual(estado["synchronous"], 2)
+        self.assertEqual(estado["journal_mode"], "wal")
+
+    def test_pragmas_informados(self):
+        cursor = self.conectar_arquivo()
+        padrao = get_estado(cursor)
+
+        aplicar_pragmas(cursor, {"busy_timeout": 100})
+        aplicar_pragmas(cursor, {})
+
+        self.assertEqual(get_estado(cursor), {**padrao, "busy_timeout": 100})
+
+    def test_estado_em_memoria(self):
+        cursor = self.conectar(":memory:")
+        aplicar_pragmas(cursor)
+
+        # o banco em memória não tem WAL nem mmap
+        estado = get_estado(cursor)
+        self.assertEqual(estado["journal_mode"], "memory")
+        self.assertIsNone(estado["mmap_size"])
+        self.assertEqual(estado["cache_size"], -64 * 1024)
+
+    @skipUnless(connections["default"].vendor == "sqlite", "somente no SQLite")
+    def test_perfil_aplicado_nas_conexoes(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        padrao = connections["default"]
+        configuracao = {**padrao.settings_dict, "NAME": os.path.join(pasta.name, "banco.sqlite3")}
+
+        for otimizado, esperado in ((False, "delete"), (True, "wal")):
+            with self.subTest(otimizado=otimizado), override_settings(SQLITE_OTIMIZADO=otimizado):
+                conexao = padrao.__class__(configuracao, alias="sqlite_teste")
+                try:
+                    with conexao.cursor() as cursor:
+                        self.assertEqual(get_estado(cursor)["journal_mode"], esperado)
+                finally:
+                    conexao.close()
+
+
+class EmailSMTPTestCase(TestCase):
+    quantidade = 200
+
+    def setUp(self):
+        with socket.socket() as livre:
+            livre.bind(("127.0.0.1", 0))
+            porta = livre.getsockname()[1]
+
+        self.servidor = ServidorSMTP()
+        self.controller = Controller(self.servidor, hostname="127.0.0.1", port=porta)
+        self.controller.start()
+        self.addCleanup(self.controller.stop)
+
+        self.configuracao = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=porta,
+            EMAIL_USE_TLS=False,
+            EMAIL_USE_SSL=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+        )
+        self.configuracao.enable()
+        self.addCleanup(self.configuracao.disable)
+
+    def get_emails(self):
+        return [
+            Email("Aviso", "texto", from_email="logix@teste.com").add_destinatario(f"{i}@teste.com")
+            for i in range(self.quantidade)
+        ]
+
+    def test_envia_todos_por_uma_conexao(self):
+        # a vazão de cada forma de envio é medida pelo benchmark "smtp"
+        emails = self.get_emails()
+
+        with mock.patch.object(smtplib.SMTP, "connect", autospec=True, side_effect=smtplib.SMTP.connect) as connect:
+            self.assertEqual(Email.enviar_varios(emails), self.quantidade)
+
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(self.servidor.recebidas, self.quantidade)
+
+
+class BancoLeituraView(ReplicaLeituraMixin, APIView):
+    def get(self, request):
+        return Response({"banco": banco_leitura.get()})
+
+    def post(self, request):
+        return Response({"banco": banco_leitura.get()})
+
+
+@mock.patch("apps.system.core.routers.get_replica", return_value="replica")
+class ReplicaRouterTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = get_user_model().objects.create_user(email="replica@teste.com", nome="Réplica")
+        self.fabrica = APIRequestFactory()
+
+    def requisitar(self, metodo):
+        request = getattr(self.fabrica, metodo)("/")
+        force_authenticate(request, user=self.usuario)
+        return BancoLeituraView.as_view()(request).data["banco"]
+
+    def test_leituras_na_replica(self, _):
+        self.assertEqual(self.requisitar("get"), "replica")
+        self.assertIsNone(banco_leitura.get())
+
+    def test_escritas_no_primario(self, _):
+        self.assertIsNone(self.requisitar("post"))
+
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_write(Tarefa), "default")
+        self.assertFalse(router.allow_migrate("replica", "core"))
+        self.assertIsNone(router.allow_migrate("default", "core"))
+
+    def test_fixado_no_primario_depois_de_escrever(self, _):
+        request = RequestFactory().post("/")
+        request.user = self.usuario
+        ReplicaMiddleware(lambda request: HttpResponse(status=201))(request)
+
+        self.assertIsNone(self.requisitar("get"))
+
+    def test_escrita_recusada_nao_fixa(self, _):
+        request = RequestFactory().post("/")
+        request.user = self.usuario
+        ReplicaMiddleware(lambda request: HttpResponse(status=400))(request)
+
+        self.assertEqual(self.requisitar("get"), "replica")
+
+    def test_middleware_assincrono(self, _):
+        async def get_response(request):
+            # a view roda lendo do primário, sem herdar o banco de leitura
+            self.assertIsNone(banco_leitura.get())
+            return HttpResponse(status=201)
+
+        middleware = ReplicaMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        request = RequestFactory().post("/")
+        request.user = self.usuario
+        token = banco_leitura.set("replica")
+        try:
+            async_to_sync(middleware)(request)
+            self.assertEqual(banco_leitura.get(), "replica")
+        finally:
+            banco_leitura.reset(token)
+
+        self.assertIsNone(self.requisitar("get"))
+
+
+class InstrumentacaoTestCase(ReplicaTesteMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        histogramas.descarregar()
+        cache.clear()
+        self.usuario = get_user_model().objects.create_user(
+            email="instrumentacao@teste.com", nome="Instrumentação", is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    @override_settings(INSTRUMENTACAO_AMOSTRAGEM=1)
+    def test_server_timing_e_histograma(self):
+        response = self.client.get("/api/v1/despesas/", HTTP_HOST="localhost")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("total;dur=", response["Server-Timing"])
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("serializacao;dur=", response["Server-Timing"])
+
+        resumo = self.client.get("/api/v1/instrumentacao/", HTTP_HOST="localhost").json()
+        self.assertEqual(resumo["GET despesas-list"]["requisicoes"], 1)
+        self.assertGreater(resumo["GET despesas-list"]["consultas_media"], 0)
+
+    @override_settings(INSTRUMENTACAO_AMOSTRAGEM=1)
+    async def test_view_assincrona_sem_thread(self):
+        await sync_to_async(self.client.force_login)(self.usuario)
+        cliente = AsyncClient()
+        cliente.cookies = self.client.cookies
+
+        response = await cliente.get("/api/v1/async/despesas/", HTTP_HOST="localhost")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'db;dur=[\d.]+;desc="[1-9]\d* consultas"')
+        self.assertTrue(iscoroutinefunction(InstrumentacaoMiddleware(cliente.handler.get_response_async)))
+
+    @override_settings(INSTRUMENTACAO_AMOSTRAGEM=0)
+    def test_sem_amostragem(self):
+        response = self.client.get("/api/v1/despesas/", HTTP_HOST="localhost")
+
+        self.assertFalse(response.has_header("Server-Timing"))
+        self.assertEqual(self.client.get("/api/v1/instrumentacao/", HTTP_HOST="localhost").json(), {})
+
+
+@skipUnless(get_replica(), "nenhuma réplica configurada (DATABASE_REPLICA_LOCAL ou POSTGRES_REPLICA_HOST)")
+class ReplicaIntegracaoTestCase(TransactionTestCase):
+    # a réplica é outra conexão, que não enxerga a transação do TestCase
+    databases = {"default", get_replica()} if get_replica() else {"default"}
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = get_user_model().objects.create_user(email="replica@teste.com", nome="Réplica")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def consultas(self, alias):
+        return CaptureQueriesContext(connections[alias])
+
+    def test_listagem_le_da_replica(self):
+        with self.consultas("default") as primario, self.consultas("replica") as replica:
+            response = self.client.get("/api/v1/despesas/", HTTP_HOST="localhost")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(replica), 0)
+        self.assertEqual(len(primario), 0)
+
+    def test_le_do_primario_depois_de_escrever(self):
+        fixar_no_primario(self.usuario)
+
+        with self.consultas("default") as primario, self.consultas("replica") as replica:
+            self.client.get("/api/v1/despesas/", HTTP_HOST="localhost")
+
+        self.assertGreater(len(primario), 0)
+        self.assertEqual(len(replica), 0)
+
+
+class CoreDesempenhoTestCase(DesempenhoMixin, TestCase):
+    """Orçamento de consultas e tempo de referência das rotas do core."""
+
+    arquivo_referencias = os.path.join(os.path.dirname(__file__), "desempenho.json")
+
+    # os histogramas ficam no cache; o admin inclui a sessão e o usuário
+    orcamentos = {
+        "tarefas-list": 2,
+        "tarefas-detail": 1,
+        "instrumentacao": 0,
+        "admin:core_tarefa_changelist": 6,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(
+            email="core@teste.com", nome="Core", is_staff=True, is_superuser=True
+        )
+        outro = get_user_model().objects.create_user(email="outro@teste.com", nome="Outro")
+        Tarefa.objects.bulk_create(
+            Tarefa(
+                nome="core.enviar_email",
+                argumentos={"titulo": f"E-mail {i}", "destinatarios": ["a@teste.com"]},
+                status=Tarefa.STATUS[i % len(Tarefa.STATUS)][0],
+                resultado={"enviados": i},
+                executar_em=timezone.now(),
+                criador=usuario,
+            )
+            for usuario in (cls.usuario, outro)
+            for i in range(300)
+        )
+        cls.tarefa = Tarefa.objects.from_user(cls.usuario).first()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_rotas_com_orcamento(self):
+        self.assertRotasComOrcamento("apps.system.core.urls", get_changelists("core"))
+
+    def test_tarefas_listagem(self):
+        self.medir_rota("tarefas-list", reverse("tarefas-list"), {"size": 200})
+
+    def test_tarefas_detalhe(self):
+        self.medir_rota("tarefas-detail", reverse("tarefas-detail", args=[self.tarefa.pk]))
+
+    def test_instrumentacao(self):
+        self.medir_rota("instrumentacao", reverse("instrumentacao"))
+
+    @skipIf(settings.SOMENTE_API, "admin desativado no modo somente API")
+    def test_admin_listagens(self):
+        cliente = APIClient()
+        cliente.force_login(self.usuario)
+        for nome in sorted(get_changelists("core")):
+            with self.subTest(nome):
+                self.medir_rota(nome, reverse(nome), cliente=cliente)
@@ -1,8 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .views import InstrumentacaoView, TarefaViewSet
 
 router = DefaultRouter()
+router.register('tarefas', TarefaViewSet, basename='tarefas')
 
 urlpatterns = [
+    path('instrumentacao/', InstrumentacaoView.as_view(), name='instrumentacao'),
     path('', include(router.urls)),
 ]
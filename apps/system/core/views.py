@@ -1,3 +1,27 @@
-from django.shortcuts import render
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from apps.system.base.views import BaseMultiTenantReadOnlyViewSet
+
+from .instrumentacao import histogramas
+from .serializers import Tarefa, TarefaSerializer
+
+
+class TarefaViewSet(BaseMultiTenantReadOnlyViewSet):
+    """Situação das tarefas de segundo plano do usuário."""
+
+    queryset = Tarefa.objects.all()
+    serializer_class = TarefaSerializer
+    filterset_fields = ["status", "nome"]
+
+
+class InstrumentacaoView(APIView):
+    """Histogramas de latência por endpoint, somados de todos os workers."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        # inclui as amostras deste processo que ainda não foram enviadas
+        histogramas.descarregar()
+        return Response(histogramas.get_resumo())
@@ -0,0 +1,149 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# campos do usuário guardados em cache, os únicos usados pela autenticação
+CAMPOS_CACHE = ("id", "email", "nome", "is_active", "is_staff", "is_superuser")
+
+# cache do processo: {id do usuário: (expira em, dados do usuário)}
+_usuarios = {}
+
+
+def get_chave_usuario(usuario_id):
+    return f"usuarios:{usuario_id}"
+
+
+def get_dados_usuario(usuario_id):
+    """
+    Busca os dados do usuário no cache do processo, depois no cache
+    compartilhado e só então no banco. O cache do processo dura
+    `AUTENTICACAO_CACHE_LOCAL` segundos, o limite para uma alteração feita em
+    outro processo chegar a este, e o compartilhado `AUTENTICACAO_CACHE_TTL`
+    segundos. Da senha só é guardado o md5 do hash, usado para revogar os
+    tokens emitidos antes da troca.
+    """
+    agora = time.monotonic()
+    registro = _usuarios.get(usuario_id)
+    if registro is None or registro[0] < agora:
+        dados = cache.get(get_chave_usuario(usuario_id))
+        if dados is None:
+            usuario = (
+                get_user_model()
+                ._default_manager.only(*CAMPOS_CACHE, "password")
+                .get(**{api_settings.USER_ID_FIELD: usuario_id})
+            )
+            dados = {campo: getattr(usuario, campo) for campo in CAMPOS_CACHE}
+            dados["hash_senha"] = get_md5_hash_password(usuario.password)
+            cache.set(
+                get_chave_usuario(usuario_id),
+                dados,
+                getattr(settings, "AUTENTICACAO_CACHE_TTL", 60 * 5),
+            )
+
+        registro = (agora + getattr(settings, "AUTENTICACAO_CACHE_LOCAL", 5), dados)
+        _usuarios[usuario_id] = registro
+
+    return registro[1]
+
+
+def get_usuario(usuario_id):
+    """
+    Usuário montado com os dados em cache. Os demais campos ficam adiados:
+    são lidos do banco se forem acessados e não são gravados pelo `save()`.
+    """
+    dados = get_dados_usuario(usuario_id)
+    Usuario = get_user_model()
+    # o `from_db` espera os valores na ordem dos campos do model
+    campos = [campo.attname for campo in Usuario._meta.concrete_fields if campo.attname in dados]
+    usuario = Usuario.from_db(
+        Usuario._default_manager.db, campos, [dados[campo] for campo in campos]
+    )
+    usuario.hash_senha = dados["hash_senha"]
+    return usuario
+
+
+def invalidar_usuario(usuario_id):
+    _usuarios.pop(usuario_id, None)
+    cache.delete(get_chave_usuario(usuario_id))
+
+
+class UsuarioToken(TokenUser):
+    """Usuário montado somente com as claims adicionadas no token."""
+
+    @cached_property
+    def email(self):
+        return self.token.get("email", "")
+
+    @cached_property
+    def nome(self):
+        return self.token.get("nome", "")
+
+    def __str__(self):
+        return self.email
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Autenticação JWT que resolve o usuário do token pelo `get_usuario`, sem
+    consultar o banco enquanto ele estiver em cache.
+
+    Com `JWT_USUARIO_SEM_ESTADO` o usuário é montado a partir das claims do
+    token, sem cache nem banco. Nesse modo alterações no usuário, inclusive
+    a desativação, só valem para os tokens emitidos depois delas.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            usuario_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if getattr(settings, "JWT_USUARIO_SEM_ESTADO", False) and "email" in validated_token:
+            return UsuarioToken(validated_token)
+
+        try:
+            usuario = get_usuario(usuario_id)
+        except get_user_model().DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not usuario.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != usuario.hash_senha:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return usuario
+
+
+async def autenticar_async(request):
+    """
+    Autenticação para views assíncronas, fora do DRF: usa o token JWT do
+    header e, sem ele, a sessão. A parte síncrona, com o cache e o banco,
+    roda pelo `sync_to_async`.
+    """
+
+    def autenticar():
+        resultado = CachedJWTAuthentication().authenticate(request)
+        if resultado is not None:
+            return resultado[0]
+
+        usuario = getattr(request, "user", None)
+        if usuario is not None and usuario.is_authenticated:
+            return usuario
+
+        return None
+
+    return await sync_to_async(autenticar)()
@@ -1,7 +1,9 @@
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.hashers import make_password
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 
 class UsuarioManager(UserManager):
@@ -51,3 +53,18 @@ class Usuario(AbstractUser):
         ordering = ["id"]
         verbose_name = "Usuário"
         verbose_name_plural = "Usuários"
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_cache_usuario(sender, instance, **kwargs):
+    """
+    Remove o usuário do cache da autenticação a cada alteração, o que inclui
+    a troca de senha e a desativação, feitas pelo `save()`. A remoção espera
+    o commit para que uma leitura concorrente não guarde no cache a linha
+    antiga, que valeria até o fim do `AUTENTICACAO_CACHE_TTL`.
+    """
+    from .authentication import invalidar_usuario
+
+    usuario_id = instance.pk
+    transaction.on_commit(lambda: invalidar_usuario(usuario_id))
@@ -15,7 +15,12 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token = super().get_token(user)
 
         # coloque aqui os dados que deseja retornar no token
-    
+        # (usados pelo `UsuarioToken` com `JWT_USUARIO_SEM_ESTADO`)
+        token["email"] = user.email
+        token["nome"] = user.nome
+        token["is_staff"] = user.is_staff
+        token["is_superuser"] = user.is_superuser
+
         return token
 
 
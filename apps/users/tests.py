@@ -1,3 +1,239 @@
-from django.test import TestCase
+import os
 
-# Create your tests here.
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.financeiro.models import DestinoGasto
+from apps.financeiro.serializers import DestinoGastoSerializer
+from apps.system.base.testes import DesempenhoMixin, get_changelists
+from apps.system.base.views import BaseMultiTenantViewSet
+
+from . import authentication
+from .authentication import CachedJWTAuthentication, UsuarioToken, get_chave_usuario, get_usuario
+from .serializers import CustomTokenObtainPairSerializer
+
+
+# o custo do hash da senha é configuração, não regressão das rotas de token
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class UsersDesempenhoTestCase(DesempenhoMixin, TestCase):
+    """Orçamento de consultas e tempo de referência das rotas de usuários e tokens."""
+
+    arquivo_referencias = os.path.join(os.path.dirname(__file__), "desempenho.json")
+
+    # o refresh e o verify não consultam o banco; o admin inclui a sessão e o usuário
+    orcamentos = {
+        "usuarios-list": 4,
+        "usuarios-detail": 3,
+        "token_obtain_pair": 1,
+        "token_refresh": 0,
+        "token_verify": 0,
+        "token_obtain": 1,
+        "admin:users_usuario_changelist": 6,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        grupos = Group.objects.bulk_create(Group(name=f"Grupo {i}") for i in range(5))
+        permissoes = list(Permission.objects.all()[:10])
+
+        Usuario = get_user_model()
+        Usuario.objects.bulk_create(
+            Usuario(email=f"usuario{i}@teste.com", nome=f"Usuário {i}") for i in range(100)
+        )
+        for i, usuario in enumerate(Usuario.objects.all()):
+            usuario.groups.set(grupos[: i % 3 + 1])
+            usuario.user_permissions.set(permissoes[: i % 4])
+
+        cls.usuario = Usuario.objects.create_user(
+            email="users@teste.com", nome="Users", password="senha", is_staff=True, is_superuser=True
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+        self.cliente_anonimo = APIClient()
+        self.tokens = self.cliente_anonimo.post(
+            reverse("token_obtain_pair"),
+            {"email": "users@teste.com", "password": "senha"},
+            HTTP_HOST="localhost",
+        ).json()
+
+    def test_rotas_com_orcamento(self):
+        self.assertRotasComOrcamento("apps.users.urls", get_changelists("users") | {"token_obtain"})
+
+    def test_usuarios_listagem(self):
+        self.medir_rota("usuarios-list", reverse("usuarios-list"), {"size": 100})
+
+    def test_usuarios_detalhe(self):
+        self.medir_rota("usuarios-detail", reverse("usuarios-detail", args=[self.usuario.pk]))
+
+    def test_token_obtain_pair(self):
+        credenciais = {"email": "users@teste.com", "password": "senha"}
+        self.medir_rota(
+            "token_obtain_pair", reverse("token_obtain_pair"), credenciais, self.cliente_anonimo, "post"
+        )
+        self.medir_rota("token_obtain", reverse("token_obtain"), credenciais, self.cliente_anonimo, "post")
+
+    def test_token_refresh(self):
+        self.medir_rota(
+            "token_refresh",
+            reverse("token_refresh"),
+            {"refresh": self.tokens["refresh"]},
+            self.cliente_anonimo,
+            "post",
+        )
+
+    def test_token_verify(self):
+        self.medir_rota(
+            "token_verify",
+            reverse("token_verify"),
+            {"token": self.tokens["access"]},
+            self.cliente_anonimo,
+            "post",
+        )
+
+    @skipIf(settings.SOMENTE_API, "admin desativado no modo somente API")
+    def test_admin_listagens(self):
+        cliente = APIClient()
+        cliente.force_login(self.usuario)
+        for nome in sorted(get_changelists("users")):
+            with self.subTest(nome):
+                self.medir_rota(nome, reverse(nome), cliente=cliente)
+
+
+class DestinoViewSet(BaseMultiTenantViewSet):
+    queryset = DestinoGasto.objects.all()
+    serializer_class = DestinoGastoSerializer
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class CachedJWTAuthenticationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(
+            email="jwt@teste.com", nome="JWT", password="senha"
+        )
+
+    def setUp(self):
+        cache.clear()
+        authentication._usuarios.clear()
+        self.fabrica = APIRequestFactory()
+
+    def autenticar(self, token=None):
+        token = token or str(RefreshToken.for_user(self.usuario).access_token)
+        request = self.fabrica.get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def salvar(self, usuario):
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario.save()
+
+    def test_sem_consultas_com_o_usuario_em_cache(self):
+        token = str(RefreshToken.for_user(self.usuario).access_token)
+        self.autenticar(token)
+
+        with self.assertNumQueries(0):
+            usuario = self.autenticar(token)
+
+        # também entre processos, somente com o cache compartilhado
+        authentication._usuarios.clear()
+        with self.assertNumQueries(0):
+            self.autenticar(token)
+
+        self.assertEqual((usuario.pk, usuario.email, usuario.nome), (self.usuario.pk, "jwt@teste.com", "JWT"))
+
+    def test_cache_sem_a_senha(self):
+        self.autenticar()
+
+        dados = cache.get(get_chave_usuario(self.usuario.pk))
+        self.assertNotIn("password", dados)
+        self.assertNotIn(self.usuario.password, dados.values())
+
+    def test_save_do_usuario_em_cache_nao_apaga_a_senha(self):
+        usuario = get_usuario(self.usuario.pk)
+        usuario.nome = "Outro nome"
+        usuario.save()
+
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.nome, "Outro nome")
+        self.assertTrue(self.usuario.check_password("senha"))
+
+    def test_alteracao_vale_na_proxima_requisicao(self):
+        self.autenticar()
+
+        self.usuario.nome = "Novo nome"
+        self.salvar(self.usuario)
+
+        self.assertEqual(self.autenticar().nome, "Novo nome")
+
+    def test_desativacao_vale_na_proxima_requisicao(self):
+        token = str(RefreshToken.for_user(self.usuario).access_token)
+        self.autenticar(token)
+
+        self.usuario.is_active = False
+        self.salvar(self.usuario)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.autenticar(token)
+
+    def test_troca_de_senha_vale_na_proxima_requisicao(self):
+        # o `override_settings` do SIMPLE_JWT não chega aos módulos que já importaram o `api_settings`
+        with mock.patch.object(api_settings, "CHECK_REVOKE_TOKEN", True):
+            token = str(RefreshToken.for_user(self.usuario).access_token)
+            self.autenticar(token)
+
+            self.usuario.set_password("nova senha")
+            self.salvar(self.usuario)
+
+            with self.assertRaises(AuthenticationFailed):
+                self.autenticar(token)
+
+    def test_invalidacao_espera_o_commit(self):
+        self.autenticar()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.usuario.save()
+            # até o commit uma leitura concorrente ainda veria a linha antiga
+            self.assertIsNotNone(cache.get(get_chave_usuario(self.usuario.pk)))
+
+        for callback in callbacks:
+            callback()
+
+        self.assertIsNone(cache.get(get_chave_usuario(self.usuario.pk)))
+
+    @override_settings(JWT_USUARIO_SEM_ESTADO=True)
+    def test_usuario_sem_estado_cria_registro_do_tenant(self):
+        token = str(CustomTokenObtainPairSerializer.get_token(self.usuario).access_token)
+        request = self.fabrica.post(
+            "/", {"nome": "Mercado"}, format="json", HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = DestinoViewSet.as_view({"post": "create"})(request)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse([consulta for consulta in consultas if '"usuario"' in consulta["sql"]])
+        self.assertEqual(DestinoGasto.objects.get(pk=response.data["id"]).criador_id, self.usuario.pk)
+
+    @override_settings(JWT_USUARIO_SEM_ESTADO=True)
+    def test_usuario_sem_estado_usa_as_claims_do_token(self):
+        token = str(CustomTokenObtainPairSerializer.get_token(self.usuario).access_token)
+
+        with self.assertNumQueries(0):
+            usuario = self.autenticar(token)
+
+        self.assertIsInstance(usuario, UsuarioToken)
+        self.assertEqual((usuario.pk, usuario.email, usuario.nome), (self.usuario.pk, "jwt@teste.com", "JWT"))
@@ -2,8 +2,8 @@ from rest_framework.viewsets import ModelViewSet, ViewSet
 from rest_framework.response import Response
 from rest_framework import status
 
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from .authentication import CachedJWTAuthentication
 from .permissions import AllowCreateWithoutAuth
 from .serializers import (
     Usuario,
@@ -14,12 +14,13 @@ from .serializers import (
 
 
 class UsuarioViewSet(ModelViewSet):
-    queryset = Usuario.objects.all()
+    # o serializer expõe os grupos e as permissões de cada usuário
+    queryset = Usuario.objects.prefetch_related("groups", "user_permissions")
     serializer_class = UsuarioSerializer
 
 
 class AuthViewSet(ViewSet):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [AllowCreateWithoutAuth]
 
     serializer_classes = {
@@ -0,0 +1,48 @@
+import gc
+import os
+import multiprocessing
+
+# Configuração do gunicorn: `gunicorn -c gunicorn.conf.py`
+
+wsgi_app = os.environ.get("GUNICORN_APP", "api.wsgi:application")
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+
+# Com o preload o Django é carregado e aquecido uma única vez no master, e
+# os workers recebem essa memória pelo fork em vez de importar tudo de novo
+preload_app = os.environ.get("GUNICORN_PRELOAD", "True") == "True"
+
+if preload_app:
+    # sem coletas no master, os objetos carregados não são tocados pelo gc
+    # antes do fork, o que mantém suas páginas compartilhadas
+    gc.disable()
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+
+    from apps.system.core.aquecimento import aquecer
+
+    resultado = aquecer()
+    server.log.info(
+        "App aquecido em %.2fs: %d viewsets, %d templates",
+        resultado["segundos"],
+        resultado["viewsets"],
+        resultado["templates"],
+    )
+
+    # os objetos do master saem do controle do gc, que nunca mais os
+    # percorre nos workers (o que causaria cópia das páginas)
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        gc.enable()